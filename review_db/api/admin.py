@@ -0,0 +1,119 @@
+import json
+from functools import cached_property, reduce
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.text import smart_split, unescape_string_literal
+
+SEARCH_LOOKUPS = {'^': 'istartswith', '=': 'iexact'}
+# Конфигурация полнотекстового поиска, та же, что в индексах моделей.
+SEARCH_CONFIG = 'russian'
+
+
+def estimated_count(queryset):
+    """
+    Оценка числа строк без COUNT(*): для списка без фильтров - сумма
+    pg_class.reltuples таблицы и её секций, для остальных - оценка
+    планировщика.
+    """
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            table = connection.ops.quote_name(queryset.model._meta.db_table)
+            cursor.execute(
+                'SELECT sum(greatest(reltuples, 0)) FROM pg_class '
+                "WHERE relkind = 'r' AND (oid = to_regclass(%s) OR oid IN "
+                '(SELECT inhrelid FROM pg_inherits '
+                'WHERE inhparent = to_regclass(%s)))', [table, table]
+            )
+            return int(cursor.fetchone()[0] or 0)
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Большие списки админки считаются по оценке: точный COUNT(*) по
+    миллионам строк дольше самой страницы. Меньше
+    ADMIN_EXACT_COUNT_LIMIT строк считается точно.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate < settings.ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Админка таблиц с миллионами строк: оценка числа строк вместо
+    COUNT(*) и поиск только по индексам.
+
+    Поля search_fields задаются с префиксом: '^' - поиск по началу
+    (индекс UPPER(поле) text_pattern_ops), '@' - полнотекстовый (GIN по
+    to_tsvector), '=' - точное совпадение. Стандартный поиск объединяет
+    поля через OR в одном запросе с JOIN, и индекс не используется ни для
+    одного поля, поэтому здесь каждое поле ищется отдельным запросом, а
+    найденные id объединяются через UNION.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def search_field(self, manager, field, bit):
+        if field.startswith('@'):
+            return manager.alias(
+                document=SearchVector(field[1:], config=SEARCH_CONFIG)
+            ).filter(document=SearchQuery(bit, config=SEARCH_CONFIG))
+        lookup = SEARCH_LOOKUPS.get(field[0], 'icontains')
+        return manager.filter(**{f'{field.lstrip("^=")}__{lookup}': bit})
+
+    def get_search_results(self, request, queryset, search_term):
+        fields = self.get_search_fields(request)
+        if not search_term or not fields:
+            return queryset, False
+        manager = queryset.model._default_manager
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            queryset = queryset.filter(pk__in=reduce(
+                lambda found, ids: found.union(ids),
+                (
+                    self.search_field(manager, field, bit)
+                    .order_by().values('pk')
+                    for field in fields
+                )
+            ))
+        return queryset, False
+
+
+class HideOnDeleteAdmin(admin.ModelAdmin):
+    """
+    Удаление через api.deletion: объект скрывается сразу, отзывы и
+    комментарии удаляются частями в фоне. Страница подтверждения не
+    перечисляет зависимые объекты, чтобы не загружать их все.
+    """
+    hide = None
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            set(),
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        self.hide(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.hide(obj)
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import checks, signals  # noqa: F401
+        from .warmup import warm_up_in_background
+
+        if settings.WARMUP_IN_BACKGROUND:
+            warm_up_in_background()
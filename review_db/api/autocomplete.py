@@ -0,0 +1,230 @@
+"""
+Подсказки по началу названия произведения без запросов к базе.
+
+Нормализованные названия (без учёта регистра, ё = е) лежат в памяти
+процесса отсортированным списком: двоичный поиск находит отрезок
+названий с нужным началом, а ранги популярности этого отрезка - массив
+numpy, из которого самые популярные выбираются через argpartition.
+
+Индекс строится при прогреве или в фоне при первом запросе; пока его
+нет, подсказки ищутся в базе. Запись произведения после фиксации
+транзакции сразу меняет индекс своего процесса и помечает индексы
+остальных воркеров устаревшими (суррогатный ключ title-names): они
+перестраиваются в фоне при проверке версии раз в
+AUTOCOMPLETE_CHECK_SECONDS. Популярность - число отзывов на момент
+построения, индекс обновляется не реже AUTOCOMPLETE_REBUILD_SECONDS.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from functools import partial
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Func, TextField, Value
+from django.db.models.functions import Lower, Trim
+
+from reviews.models import Title
+from .caching import versions
+
+logger = logging.getLogger('api.autocomplete')
+
+KEYS = ('title-names',)
+# Больше любого символа названия: верхняя граница отрезка с началом.
+LAST_CHAR = '\U0010ffff'
+CYRILLIC_UPPER = 'АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯЁё'
+CYRILLIC_LOWER = 'абвгдежзийклмнопрстуфхцчшщъыьэюяее'
+
+
+def normalize(text):
+    """Регистр, ё/е и пробелы не различаются."""
+    return ' '.join(text.casefold().replace('ё', 'е').split())
+
+
+class PrefixIndex:
+    """
+    Названия, отсортированные по нормализованному виду. Индекс не
+    меняется после создания: правки возвращают копию, поэтому потоки
+    читают его без блокировок.
+    """
+
+    def __init__(self, keys, ids, names, years, ranks, version):
+        self.keys = keys
+        self.ids = ids
+        self.names = names
+        self.years = years
+        self.ranks = ranks
+        self.version = version
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_rows(cls, rows, version):
+        """rows - тройки (id, название, год) от популярных к прочим."""
+        entries = sorted(
+            (normalize(name), rank, title_id, name, year)
+            for rank, (title_id, name, year) in enumerate(rows)
+        )
+        keys, ranks, ids, names, years = (
+            list(column) for column in zip(*entries)
+        ) if entries else ([], [], [], [], [])
+        return cls(
+            keys, np.array(ids, dtype=np.int64), names,
+            np.array(years, dtype=np.int64), np.array(ranks, dtype=np.int64),
+            version
+        )
+
+    def search(self, prefix, limit):
+        """limit самых популярных произведений, начинающихся с prefix."""
+        start = bisect_left(self.keys, prefix)
+        stop = bisect_left(self.keys, prefix + LAST_CHAR, start)
+        ranks = self.ranks[start:stop]
+        if len(ranks) > limit:
+            best = np.argpartition(ranks, limit - 1)[:limit]
+        else:
+            best = np.arange(len(ranks))
+        best = best[np.argsort(ranks[best])] + start
+        return [
+            {
+                'id': int(self.ids[i]),
+                'name': self.names[i],
+                'year': int(self.years[i]),
+            }
+            for i in best
+        ]
+
+    def without_title(self, title_id):
+        keep = np.flatnonzero(self.ids != title_id)
+        index = PrefixIndex(
+            [self.keys[i] for i in keep], self.ids[keep],
+            [self.names[i] for i in keep], self.years[keep],
+            self.ranks[keep], self.version
+        )
+        index.built_at = self.built_at
+        return index
+
+    def with_title(self, title_id, name, year):
+        """
+        Копия с добавленным или изменённым произведением. Изменённое
+        сохраняет свой ранг, новое - наименее популярное.
+        """
+        found = np.flatnonzero(self.ids == title_id)
+        if len(found):
+            rank = int(self.ranks[found[0]])
+        else:
+            rank = int(self.ranks.max()) + 1 if len(self.ranks) else 0
+        index = self.without_title(title_id)
+        key = normalize(name)
+        position = bisect_left(index.keys, key)
+        index.keys.insert(position, key)
+        index.names.insert(position, name)
+        index.ids = np.insert(index.ids, position, title_id)
+        index.years = np.insert(index.years, position, year)
+        index.ranks = np.insert(index.ranks, position, rank)
+        return index
+
+
+state = {'index': None, 'checked': 0.0, 'building': False}
+lock = threading.Lock()
+
+
+def build():
+    """Строит индекс одним запросом и делает его текущим."""
+    # Версия читается до запроса: запись во время построения
+    # вызовет ещё одно.
+    version = versions(KEYS)
+    rows = Title.objects.annotate(
+        popularity=Count('reviews')
+    ).order_by('-popularity', 'id').values_list('id', 'name', 'year')
+    index = PrefixIndex.from_rows(rows.iterator(), version)
+    state['index'] = index
+    return index
+
+
+def build_in_background():
+    with lock:
+        if state['building']:
+            return
+        state['building'] = True
+
+    def run():
+        try:
+            build()
+        except Exception:
+            logger.exception('Не удалось построить индекс подсказок')
+        finally:
+            state['building'] = False
+            connections.close_all()
+
+    threading.Thread(target=run, name='autocomplete', daemon=True).start()
+
+
+def current_index():
+    """
+    Индекс процесса или None, если он ещё строится. Версия в общем
+    кеше проверяется не чаще раза в AUTOCOMPLETE_CHECK_SECONDS.
+    """
+    index = state['index']
+    if index is None:
+        build_in_background()
+        return None
+    now = time.monotonic()
+    if now - state['checked'] >= settings.AUTOCOMPLETE_CHECK_SECONDS:
+        state['checked'] = now
+        if (versions(KEYS) != index.version
+                or now - index.built_at
+                >= settings.AUTOCOMPLETE_REBUILD_SECONDS):
+            build_in_background()
+    return index
+
+
+def search_database(prefix, limit):
+    """Запасной путь, пока индекса нет: тот же отбор запросом к базе."""
+    # lower() в базе с локалью C не меняет кириллицу, поэтому она
+    # переводится в строчные явно. Пробелы схлопываются, как в normalize.
+    folded = Trim(Func(
+        Func(
+            Lower('name'), Value(CYRILLIC_UPPER), Value(CYRILLIC_LOWER),
+            function='TRANSLATE', output_field=TextField()
+        ),
+        Value(r'\s+'), Value(' '), Value('g'),
+        function='REGEXP_REPLACE', output_field=TextField()
+    ))
+    return list(Title.objects.alias(folded=folded).filter(
+        folded__startswith=prefix
+    ).annotate(popularity=Count('reviews')).order_by(
+        '-popularity', 'id'
+    ).values('id', 'name', 'year')[:limit])
+
+
+def suggest(query, limit):
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    index = current_index()
+    if index is None:
+        return search_database(prefix, limit)
+    return index.search(prefix, limit)
+
+
+def apply(title_id, name=None, year=None):
+    with lock:
+        index = state['index']
+        if index is None:
+            return
+        if name is None:
+            state['index'] = index.without_title(title_id)
+        else:
+            state['index'] = index.with_title(title_id, name, year)
+
+
+def title_saved(title):
+    if title.deleted_at is not None:
+        title_deleted(title)
+        return
+    transaction.on_commit(partial(apply, title.pk, title.name, title.year))
+
+
+def title_deleted(title):
+    transaction.on_commit(partial(apply, title.pk))
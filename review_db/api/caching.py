@@ -0,0 +1,199 @@
+import http.client
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+
+logger = logging.getLogger('api.cache')
+
+REGISTRY_PREFIX = 'surrogate-key:'
+VERSION_PREFIX = 'surrogate-version:'
+LOCK_PREFIX = 'lock:'
+REFRESH_HEADER = 'X-Cache-Refresh'
+REFRESH_TIMEOUT = 5
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+# Снимает блокировку, только если в ней всё ещё значение владельца.
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-purge')
+local_locks = threading.Lock()
+
+
+def registry_key(key):
+    return f'{REGISTRY_PREFIX}{key}'
+
+
+def register(keys, path, media_type, encoding, timeout):
+    """
+    Запоминает, что ответ по адресу path в формате media_type
+    и кодировании encoding лежит в кеше nginx под суррогатными
+    ключами keys. Записи живут не дольше самого ответа в кеше,
+    поэтому реестр не разрастается.
+    """
+    now = time.time()
+    entries = cache.get_many([registry_key(key) for key in keys])
+    updated = {}
+    for key in keys:
+        paths = {
+            cached: expires
+            for cached, expires in entries.get(registry_key(key), {}).items()
+            if expires > now
+        }
+        paths[path, media_type, encoding] = now + timeout
+        updated[registry_key(key)] = paths
+    cache.set_many(updated, timeout)
+
+
+def pop_paths(keys):
+    """
+    Забирает из реестра варианты (адрес, формат, кодирование),
+    закешированные под ключами keys.
+    """
+    names = [registry_key(key) for key in keys]
+    entries = cache.get_many(names)
+    cache.delete_many(names)
+    now = time.time()
+    return sorted({
+        path
+        for paths in entries.values()
+        for path, expires in paths.items()
+        if expires > now
+    })
+
+
+def refresh_path(path, media_type, encoding):
+    """
+    Перезапрашивает адрес через nginx в обход кеша: nginx сохраняет
+    свежий ответ вместо устаревшего. HEAD не гоняет тело по сети,
+    nginx сам превращает его в GET к приложению.
+    """
+    url = urlsplit(settings.PROXY_CACHE_PURGE_URL)
+    connection = http.client.HTTPConnection(
+        url.hostname, url.port or 80, timeout=REFRESH_TIMEOUT
+    )
+    try:
+        connection.request('HEAD', path, headers={
+            REFRESH_HEADER: '1',
+            'Accept': media_type,
+            'Accept-Encoding': encoding,
+        })
+        connection.getresponse().read()
+    finally:
+        connection.close()
+
+
+def refresh(keys):
+    for path, media_type, encoding in pop_paths(keys):
+        try:
+            refresh_path(path, media_type, encoding)
+        except OSError as error:
+            logger.warning('Не удалось обновить кеш %s: %s', path, error)
+
+
+def versions(keys):
+    names = [f'{VERSION_PREFIX}{key}' for key in keys]
+    stored = cache.get_many(names)
+    return tuple(stored.get(name, 0) for name in names)
+
+
+def invalidate(keys):
+    for key in keys:
+        name = f'{VERSION_PREFIX}{key}'
+        cache.add(name, 0, timeout=None)
+        cache.incr(name)
+    if settings.PROXY_CACHE_PURGE_URL:
+        executor.submit(refresh, keys)
+
+
+def purge(*keys):
+    """
+    После фиксации транзакции помечает устаревшими ответы с ключами
+    keys в кеше приложения и сбрасывает их в nginx. Запросы к nginx
+    уходят в фоновом потоке и не задерживают запись.
+    """
+    if keys:
+        transaction.on_commit(partial(invalidate, keys))
+
+
+def acquire(lock, token, timeout):
+    """Берёт блокировку lock со значением token на timeout секунд."""
+    with local_locks:
+        return cache.add(lock, token, timeout)
+
+
+def release(lock, token):
+    """
+    Снимает блокировку lock, только если она всё ещё принадлежит token:
+    истёкшую и взятую другим воркером блокировку снимать нельзя. В Redis
+    сравнение и удаление выполняет один скрипт. Кеш в памяти виден
+    только потокам своего процесса, и для него сравнение и удаление
+    атомарны под той же блокировкой потоков, что и acquire.
+    """
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        backend._cache.get_client(write=True).eval(
+            RELEASE_SCRIPT, 1, backend.make_and_validate_key(lock),
+            backend._cache._serializer.dumps(token)
+        )
+        return
+    with local_locks:
+        if cache.get(lock) == token:
+            cache.delete(lock)
+
+
+def single_flight(key, compute, keys, fresh_for, stale_for):
+    """
+    Значение из общего кеша с вычислением не более чем в одном
+    воркере одновременно. Запись устаревает по времени fresh_for
+    или при смене версии любого из суррогатных ключей keys.
+    Устаревшее значение ещё stale_for секунд отдаётся всем, кроме
+    воркера, взявшего блокировку: он пересчитывает значение. При
+    пустом кеше остальные ждут его результата.
+    Возвращает значение и признак того, что оно свежее.
+    """
+    current = versions(keys)
+    entry = cache.get(key)
+    if (entry is not None and entry['versions'] == current
+            and entry['expires'] > time.time()):
+        return entry['value'], True
+
+    lock, token = f'{LOCK_PREFIX}{key}', uuid.uuid4().hex
+    if acquire(lock, token, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, {
+                'value': value,
+                'versions': current,
+                'expires': time.time() + fresh_for,
+            }, fresh_for + stale_for)
+            return value, True
+        finally:
+            release(lock, token)
+    if entry is not None:
+        return entry['value'], False
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value'], True
+        if cache.get(lock) is None:
+            break
+    # Вычислявший воркер упал или не успел: считаем сами.
+    return compute(), True
@@ -0,0 +1,54 @@
+"""
+Проверки схемы базы, которую не описывают модели, и настроек кеша.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.database)
+def partitioned_tables(app_configs, databases=None, **kwargs):
+    """
+    После partition_tables первичный ключ отзывов и комментариев -
+    (id, pub_date), а не id, как считают модели. Предупреждение
+    выводит migrate: миграции, которые меняют ключи этих таблиц,
+    пишутся вручную.
+    """
+    if not databases or 'default' not in databases:
+        return []
+    from reviews.models import Comment, Review
+    from .partitions import is_partitioned
+
+    return [
+        Warning(
+            f'{model._meta.db_table} секционирована: первичный ключ '
+            '(id, pub_date), ограничения без pub_date проверяют триггеры.',
+            hint='Миграции, меняющие ключи и ограничения этой таблицы, '
+                 'пишутся вручную (README, «Секционирование»).',
+            obj=model,
+            id='api.W001',
+        )
+        for model in (Review, Comment)
+        if is_partitioned(model._meta.db_table)
+    ]
+
+
+@register(Tags.caches)
+def shared_cache(app_configs, **kwargs):
+    """
+    Кеши ответов и профилей сбрасываются сменой версий ключей в кеше
+    по умолчанию. Кеш в памяти процесса у каждого воркера свой, и
+    сброс в одном воркере остальные не увидят.
+    """
+    if settings.CACHES['default']['BACKEND'] != LOCAL_CACHE:
+        return []
+    return [
+        Error(
+            f'{name} включён, а кеш по умолчанию - память процесса.',
+            hint=f'Задайте REDIS_URL или выключите кеш: {name}=0.',
+            id='api.E001',
+        )
+        for name in ('RESPONSE_CACHE_SECONDS', 'PROFILE_CACHE_SECONDS')
+        if getattr(settings, name)
+    ]
@@ -0,0 +1,58 @@
+import hashlib
+import re
+
+import brotli
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.text import compress_string
+
+BROTLI_QUALITY = 5
+CACHE_PREFIX = 'compressed:'
+ACCEPT_ENCODING = re.compile(r'([\w-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?')
+
+
+def accepted_encoding(request):
+    """
+    Лучшее из поддерживаемых кодирований по Accept-Encoding:
+    brotli, затем gzip, иначе None. Совпадает с $api_encoding в nginx.
+    """
+    accepted = {}
+    for name, quality in ACCEPT_ENCODING.findall(
+        request.META.get('HTTP_ACCEPT_ENCODING', '').lower()
+    ):
+        try:
+            accepted[name] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+    for encoding in ('br', 'gzip'):
+        if accepted.get(encoding, 0) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return compress_string(body)
+
+
+def cached_compress(body, encoding, content_type):
+    """
+    Сжимает тело, сохраняя результат в общем кеше: повторный ответ
+    с тем же телом берёт готовые байты. Ключ - хеш тела: он считается
+    быстрее сжатия, а ETag одинаков у разных адресов и не годится.
+    """
+    key = (
+        f'{CACHE_PREFIX}{encoding}:{content_type}:'
+        f'{hashlib.sha1(body).hexdigest()}'
+    )
+    compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        cache.set(
+            key,
+            compressed,
+            settings.RESPONSE_CACHE_SECONDS
+            + settings.RESPONSE_CACHE_STALE_SECONDS
+        )
+    return compressed
@@ -0,0 +1,167 @@
+"""
+Удаление произведений и пользователей с большим числом отзывов.
+
+Обычное delete() собирает в память все зависимые отзывы и комментарии
+ради каскада и сигналов и держит одну долгую транзакцию. Вместо этого
+объект сразу скрывается (deleted_at), а зависимые строки удаляются
+частями по DELETION_BATCH_SIZE: каждая часть - короткая транзакция
+без загрузки объектов и без посигнальных обновлений. Даты изменения
+затронутых отзывов и произведений и их кеши обновляются одним запросом
+на часть, после чего удаляется сам объект.
+
+Скрытые объекты дочищаются в фоновом потоке сразу после скрытия и
+командой purge_deleted (по расписанию): прерванное удаление
+продолжается с того места, где остановилось.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from reviews.models import Comment, GenreTitle, Review, SimilarTitle, Title
+from users.models import CustomUser
+from .caching import purge
+
+logger = logging.getLogger('api.deletion')
+
+running = threading.Lock()
+
+
+def delete_rows(queryset, batch_size, affected=None):
+    """
+    Удаляет строки queryset частями без загрузки объектов. affected -
+    функция, которой передаются значения второго столбца удалённых
+    строк (values_list(pk, поле)), чтобы обновить зависимые данные.
+    Возвращает число удалённых строк.
+    """
+    model = queryset.model
+    columns = ['pk'] if affected is None else ['pk', affected[0]]
+    deleted = 0
+    while True:
+        rows = list(queryset.order_by().values_list(*columns)[:batch_size])
+        if not rows:
+            return deleted
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'DELETE FROM {} WHERE {} = ANY(%s)'.format(
+                        connection.ops.quote_name(model._meta.db_table),
+                        connection.ops.quote_name(model._meta.pk.column)
+                    ),
+                    [[row[0] for row in rows]]
+                )
+                deleted += cursor.rowcount
+            if affected is not None:
+                affected[1]({row[1] for row in rows})
+
+
+def touch_reviews(review_ids):
+    Review.objects.filter(pk__in=review_ids).update(
+        updated_at=timezone.now()
+    )
+
+
+def touch_titles(title_ids):
+    Title.all_objects.filter(pk__in=title_ids).update(
+        updated_at=timezone.now()
+    )
+    purge('titles', *(f'title-{title_id}' for title_id in title_ids))
+
+
+def hide_title(title):
+    """Скрывает произведение и запускает удаление его отзывов."""
+    title.deleted_at = timezone.now()
+    title.save(update_fields=['deleted_at', 'updated_at'])
+    transaction.on_commit(purge_in_background)
+
+
+def hide_user(user):
+    """
+    Скрывает пользователя: вход и токены перестают действовать сразу,
+    его отзывы и комментарии удаляются в фоне.
+    """
+    user.deleted_at = timezone.now()
+    user.is_active = False
+    user.save(update_fields=['deleted_at', 'is_active'])
+    Token.objects.filter(user=user).delete()
+    # Его отзывы и комментарии пропадают из ответов и рейтингов сразу.
+    touch_titles(set(Review.objects.filter(author=user).values_list(
+        'title_id', flat=True
+    )))
+    touch_reviews(Comment.objects.filter(author=user).values('review_id'))
+    transaction.on_commit(purge_in_background)
+
+
+def purge_title(title_id, batch_size):
+    delete_rows(
+        Comment.objects.filter(review__title_id=title_id), batch_size
+    )
+    delete_rows(Review.objects.filter(title_id=title_id), batch_size)
+    delete_rows(GenreTitle.objects.filter(title_id=title_id), batch_size)
+    delete_rows(SimilarTitle.objects.filter(title_id=title_id), batch_size)
+    delete_rows(
+        SimilarTitle.objects.filter(similar_id=title_id), batch_size
+    )
+    # Зависимых строк не осталось: каскад delete() ничего не загрузит.
+    Title.all_objects.filter(pk=title_id).delete()
+
+
+def purge_user(user_id, batch_size):
+    delete_rows(
+        Comment.objects.filter(author_id=user_id), batch_size,
+        ('review_id', touch_reviews)
+    )
+    delete_rows(
+        Comment.objects.filter(review__author_id=user_id), batch_size
+    )
+    delete_rows(
+        Review.objects.filter(author_id=user_id), batch_size,
+        ('title_id', touch_titles)
+    )
+    CustomUser.objects.filter(pk=user_id).delete()
+
+
+def purge_deleted(batch_size=None):
+    """
+    Удаляет все скрытые произведения и пользователей. Возвращает
+    число удалённых произведений и пользователей.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    titles = list(Title.all_objects.filter(
+        deleted_at__isnull=False
+    ).values_list('pk', flat=True))
+    for title_id in titles:
+        purge_title(title_id, batch_size)
+    users = list(CustomUser.objects.filter(
+        deleted_at__isnull=False
+    ).values_list('pk', flat=True))
+    for user_id in users:
+        purge_user(user_id, batch_size)
+    return len(titles), len(users)
+
+
+def purge_in_background():
+    """
+    Удаление в отдельном потоке; пока поток работает, новые скрытые
+    объекты он подберёт сам при следующем проходе.
+    """
+    if not settings.DELETION_IN_BACKGROUND:
+        return
+
+    def run():
+        try:
+            while running.acquire(blocking=False):
+                try:
+                    if purge_deleted() == (0, 0):
+                        return
+                finally:
+                    running.release()
+        except Exception:
+            logger.exception('Не удалось удалить скрытые объекты')
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name='deletion', daemon=True).start()
@@ -1,12 +1,69 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
-from reviews.models import Title
+from reviews.models import GenreTitle, Review, Title
+
+
+def has_genres(slugs, match='any'):
+    """
+    Условия на жанры произведения подзапросами EXISTS по GenreTitle:
+    в отличие от соединения, они не размножают строки произведения
+    перед подсчётом рейтинга. match='any' - хотя бы один из жанров,
+    match='all' - все жанры, по подзапросу на каждый.
+    """
+    def exists(values):
+        return Exists(GenreTitle.objects.filter(
+            title_id=OuterRef('pk'), genre__slug__in=values
+        ))
+
+    if match == 'all':
+        return [exists([slug]) for slug in slugs]
+    return [exists(slugs)]
 
 
 class TitlesFilter(filters.FilterSet):
-    genre = filters.CharFilter(field_name="genre__slug")
+    """
+    genre - слаги через запятую; genre_match=any (по умолчанию) или all.
+    """
+    genre = filters.CharFilter(method='filter_genre')
+    genre_match = filters.ChoiceFilter(
+        choices=(('any', 'any'), ('all', 'all')),
+        method='filter_genre_match'
+    )
     category = filters.CharFilter(field_name="category__slug")
     name = filters.CharFilter(field_name="name", lookup_expr='icontains')
 
     class Meta:
         model = Title
-        fields = ('genre', 'category', 'name', 'year')
+        fields = ('genre', 'genre_match', 'category', 'name', 'year')
+
+    def filter_genre(self, queryset, name, value):
+        slugs = list(dict.fromkeys(
+            slug.strip() for slug in value.split(',') if slug.strip()
+        ))
+        if not slugs:
+            return queryset
+        match = self.form.cleaned_data.get('genre_match') or 'any'
+        return queryset.filter(*has_genres(slugs, match))
+
+    def filter_genre_match(self, queryset, name, value):
+        # Учитывается в filter_genre.
+        return queryset
+
+
+class RecentReviewsFilter(filters.FilterSet):
+    """
+    Жанр и категория произведения. Жанр проверяется подзапросом, а не
+    соединением: отзыв не дублируется, а лента читается по индексу
+    даты публикации.
+    """
+    genre = filters.CharFilter(method='filter_genre')
+    category = filters.CharFilter(field_name='title__category__slug')
+
+    class Meta:
+        model = Review
+        fields = ('genre', 'category')
+
+    def filter_genre(self, queryset, name, value):
+        return queryset.filter(
+            title__in=Title.objects.filter(*has_genres([value]))
+        )
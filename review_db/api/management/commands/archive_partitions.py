@@ -0,0 +1,54 @@
+import os
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone as django_timezone
+
+from api import deletion, partitions
+from reviews.models import Comment, Review
+
+# Что обновить при уходе строк из рейтингов и списков: произведения
+# убранных отзывов, отзывы убранных комментариев.
+AFFECTED = {
+    Review: ('title_id', deletion.touch_titles),
+    Comment: ('review_id', deletion.touch_reviews),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Убирает из отзывов и комментариев секции за месяцы раньше '
+        '--before: отсоединяет их в отдельные таблицы или, с --export, '
+        'выгружает в сжатые CSV-файлы и удаляет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', required=True,
+            help='Первый сохраняемый месяц, YYYY-MM.'
+        )
+        parser.add_argument(
+            '--export', metavar='DIR',
+            help='Каталог для файлов {секция}.csv.gz.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            before = datetime.strptime(options['before'], '%Y-%m').replace(
+                tzinfo=timezone.utc
+            )
+        except ValueError:
+            raise CommandError('--before задаётся как YYYY-MM')
+        if before > partitions.month_start(django_timezone.now()):
+            raise CommandError('Текущий месяц архивировать нельзя')
+        directory = options['export']
+        if directory is not None and not os.path.isdir(directory):
+            raise CommandError(f'Нет каталога {directory}')
+        for model in (Review, Comment):
+            archived = partitions.archive(
+                model, before, directory, AFFECTED[model]
+            )
+            self.stdout.write(
+                f'{model._meta.db_table}: '
+                f'{", ".join(archived) or "нет секций"}'
+            )
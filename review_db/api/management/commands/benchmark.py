@@ -0,0 +1,448 @@
+import http.client
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from unittest import mock
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from reviews.models import (
+    Category,
+    Genre,
+    Title,
+    Review,
+    Comment
+)
+from users.models import CustomUser
+
+BENCH_USERNAME = 'benchmark_user'
+BENCH_EMAIL = 'benchmark_user@example.com'
+SAMPLE_SIZE = 200
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class Throttled(Exception):
+    """Сервер ответил 429: замеры искажены троттлингом."""
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга для отсортированного списка."""
+    if not values:
+        return None
+    rank = max(int(round(percent / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            stderr=subprocess.DEVNULL,
+            text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sample_ids(model, rnd, *fields):
+    """
+    Случайная выборка существующих строк без ORDER BY random():
+    берутся случайные id из диапазона и проверяются одним запросом.
+    """
+    bounds = model.objects.order_by('id').values_list('id', flat=True)
+    first, last = bounds.first(), bounds.last()
+    if first is None:
+        return []
+    candidates = {rnd.randint(first, last) for _ in range(SAMPLE_SIZE * 4)}
+    rows = list(
+        model.objects.filter(id__in=candidates)
+        .order_by('id')
+        .values_list('id', *fields)[:SAMPLE_SIZE]
+    )
+    return rows or list(model.objects.values_list('id', *fields)[:1])
+
+
+def build_scenarios(rnd, writes):
+    """Набор запросов ко всем маршрутам api/urls.py."""
+    titles = sample_ids(Title, rnd, 'name')
+    title_ids = [row[0] for row in titles]
+    reviews = sample_ids(Review, rnd, 'title_id', 'author_id')
+    comments = sample_ids(
+        Comment, rnd, 'review__title_id', 'review_id', 'author_id'
+    )
+    genres = list(Genre.objects.values_list('slug', flat=True)[:50])
+    categories = list(Category.objects.values_list('slug', flat=True)[:50])
+
+    scenarios = {
+        'categories-list': lambda: ('get', '/api/v1/categories/', None),
+        'genres-list': lambda: ('get', '/api/v1/genres/', None),
+        'titles-list': lambda: ('get', '/api/v1/titles/', None),
+        'users-me': lambda: ('get', '/api/v1/users/me/', None),
+        'users-me-recommendations': lambda: (
+            'get', '/api/v1/users/me/recommendations/', None
+        ),
+        'reviews-recent': lambda: ('get', '/api/v1/reviews/recent/', None),
+    }
+    if genres:
+        scenarios['titles-list-genre'] = lambda: (
+            'get', f'/api/v1/titles/?genre={rnd.choice(genres)}', None
+        )
+    if len(genres) > 1:
+        def genres_list(match):
+            def scenario():
+                slugs = ','.join(rnd.sample(genres, min(len(genres), 3)))
+                return (
+                    'get',
+                    f'/api/v1/titles/?genre={slugs}&genre_match={match}',
+                    None
+                )
+            return scenario
+        scenarios['titles-list-genres-any'] = genres_list('any')
+        scenarios['titles-list-genres-all'] = genres_list('all')
+    if genres:
+        scenarios['reviews-recent-genre'] = lambda: (
+            'get', f'/api/v1/reviews/recent/?genre={rnd.choice(genres)}', None
+        )
+    if categories:
+        scenarios['titles-list-category'] = lambda: (
+            'get', f'/api/v1/titles/?category={rnd.choice(categories)}', None
+        )
+    if title_ids:
+        scenarios['titles-detail'] = lambda: (
+            'get', f'/api/v1/titles/{rnd.choice(title_ids)}/', None
+        )
+        scenarios['titles-similar'] = lambda: (
+            'get', f'/api/v1/titles/{rnd.choice(title_ids)}/similar/', None
+        )
+
+        def autocomplete():
+            # Префикс от одной до трёх букв названия: короткие префиксы
+            # дают больше всего совпадений.
+            prefix = rnd.choice(titles)[1][:rnd.randint(1, 3)]
+            return (
+                'get', f'/api/v1/titles/autocomplete/?q={quote(prefix)}', None
+            )
+        scenarios['titles-autocomplete'] = autocomplete
+    if reviews:
+        scenarios['reviews-list'] = lambda: (
+            'get', f'/api/v1/titles/{rnd.choice(reviews)[1]}/reviews/', None
+        )
+        scenarios['users-reviews'] = lambda: (
+            'get', f'/api/v1/users/{rnd.choice(reviews)[2]}/reviews/', None
+        )
+
+        def review_detail():
+            review_id, title_id, _ = rnd.choice(reviews)
+            return (
+                'get', f'/api/v1/titles/{title_id}/reviews/{review_id}/', None
+            )
+        scenarios['reviews-detail'] = review_detail
+
+        def comments_list():
+            review_id, title_id, _ = rnd.choice(reviews)
+            return (
+                'get',
+                f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+                None
+            )
+        scenarios['comments-list'] = comments_list
+        if writes:
+            def comment_create():
+                review_id, title_id, _ = rnd.choice(reviews)
+                return (
+                    'post',
+                    f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+                    {'text': 'Комментарий нагрузочного теста'}
+                )
+            scenarios['comments-create'] = comment_create
+    if comments:
+        def comment_detail():
+            comment_id, title_id, review_id, _ = rnd.choice(comments)
+            return (
+                'get',
+                f'/api/v1/titles/{title_id}/reviews/{review_id}'
+                f'/comments/{comment_id}/',
+                None
+            )
+        scenarios['comments-detail'] = comment_detail
+        scenarios['users-comments'] = lambda: (
+            'get', f'/api/v1/users/{rnd.choice(comments)[3]}/comments/', None
+        )
+    return scenarios
+
+
+class InProcessTransport:
+    """
+    Выполняет запросы через APIClient в текущем процессе
+    и считает SQL-запросы соединения потока.
+    """
+
+    def __init__(self, token):
+        host = next(
+            (h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'),
+            'localhost'
+        )
+        self.local = threading.local()
+        self.token = token
+        self.host = host
+
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            client = APIClient(HTTP_HOST=self.host)
+            client.credentials(HTTP_AUTHORIZATION='Token ' + self.token)
+            self.local.client = client
+        return self.local.client
+
+    def request(self, method, path, data):
+        queries = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        client = self.client()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data=data, format='json')
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, queries
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTransport:
+    """
+    Выполняет запросы к запущенному серверу по HTTP/1.1 с keep-alive.
+    Число SQL-запросов берётся из заголовка Server-Timing.
+    """
+
+    def __init__(self, token, base_url):
+        parts = urlsplit(base_url)
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.token = token
+        self.local = threading.local()
+
+    def connection(self):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = self.connection_class(
+                self.netloc, timeout=30
+            )
+        return self.local.connection
+
+    def request(self, method, path, data):
+        headers = {'Authorization': 'Token ' + self.token}
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        conn = self.connection()
+        started = time.perf_counter()
+        try:
+            conn.request(method.upper(), path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            del self.local.connection
+            return None, time.perf_counter() - started, None
+        elapsed = time.perf_counter() - started
+        if response.status == 429:
+            raise Throttled(path)
+        match = SERVER_TIMING_QUERIES.search(
+            response.getheader('Server-Timing', '')
+        )
+        return (
+            response.status, elapsed, int(match.group(1)) if match else None
+        )
+
+    def close(self):
+        pass
+
+
+def summarize(samples, duration):
+    latencies = sorted(sample[1] * 1000 for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    errors = sum(
+        1 for sample in samples if sample[0] is None or sample[0] >= 400
+    )
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / duration, 2) if duration else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        } if queries else None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест API: при необходимости заполняет базу '
+        'синтетическими данными, с заданной конкуренцией опрашивает '
+        'маршруты api/urls.py и сохраняет пропускную способность, '
+        'перцентили задержки и число SQL-запросов в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-data', action='store_true',
+                            help='Перед замером заполнить базу данными.')
+        parser.add_argument('--categories', type=int, default=8)
+        parser.add_argument('--genres', type=int, default=18)
+        parser.add_argument('--max-genres', type=int, default=3,
+                            help='Наибольшее число жанров произведения.')
+        parser.add_argument('--titles', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--reviews', type=int, default=10_000_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Число запросов на каждый маршрут.')
+        parser.add_argument('--endpoints', nargs='*',
+                            help='Ограничить замер указанными маршрутами.')
+        parser.add_argument('--writes', action='store_true',
+                            help='Включить пишущие запросы.')
+        parser.add_argument('--base-url',
+                            help='Адрес запущенного сервера с отключённым '
+                                 'троттлингом; по умолчанию запросы '
+                                 'выполняются в процессе.')
+        parser.add_argument('--output', default='benchmark.json')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('Число запросов и потоков должно быть больше 0')
+        rnd = random.Random(options['random_seed'])
+        if options['seed_data']:
+            call_command(
+                'generate_data',
+                categories=options['categories'],
+                genres=options['genres'],
+                max_genres=options['max_genres'],
+                titles=options['titles'],
+                users=options['users'],
+                reviews=options['reviews'],
+                comments=options['comments'],
+                seed=options['random_seed'],
+                stdout=self.stdout,
+            )
+
+        user, _ = CustomUser.objects.get_or_create(
+            username=BENCH_USERNAME,
+            defaults={'email': BENCH_EMAIL, 'password': make_password(None)}
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        scenarios = build_scenarios(rnd, options['writes'])
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные маршруты: {", ".join(sorted(unknown))}'
+                )
+            scenarios = {
+                name: scenarios[name] for name in options['endpoints']
+            }
+
+        if options['base_url']:
+            transport = HttpTransport(token.key, options['base_url'])
+        else:
+            transport = InProcessTransport(token.key)
+        connections.close_all()
+
+        results = {}
+        # Троттлинг отвечал бы 429 и искажал замеры. Подмена действует
+        # только в этом процессе: на сервере из --base-url троттлинг
+        # отключается настройками, а первый ответ 429 прерывает замер.
+        with mock.patch.object(APIView, 'throttle_classes', ()):
+            for name, scenario in scenarios.items():
+                try:
+                    results[name] = self.run_scenario(
+                        transport, scenario, options
+                    )
+                except Throttled as error:
+                    raise CommandError(
+                        f'{name}: сервер ответил 429 на {error}, отключите '
+                        'на нём троттлинг (DEFAULT_THROTTLE_CLASSES)'
+                    )
+                self.report(name, results[name])
+
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'concurrency': options['concurrency'],
+                'requests_per_endpoint': options['requests'],
+                'transport': 'http' if options['base_url'] else 'in-process',
+                'dataset': {
+                    'categories': Category.objects.count(),
+                    'genres': Genre.objects.count(),
+                    'titles': Title.objects.count(),
+                    'users': CustomUser.objects.count(),
+                    'reviews': Review.objects.count(),
+                    'comments': Comment.objects.count(),
+                },
+            },
+            'endpoints': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+    def run_scenario(self, transport, scenario, options):
+        # Запросы генерируются заранее, чтобы не делить Random между потоками.
+        requests = [scenario() for _ in range(options['requests'])]
+
+        def worker(chunk):
+            try:
+                return [transport.request(*request) for request in chunk]
+            finally:
+                transport.close()
+
+        workers = options['concurrency']
+        chunks = [requests[i::workers] for i in range(workers)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            samples = [
+                sample
+                for chunk_samples in executor.map(worker, chunks)
+                for sample in chunk_samples
+            ]
+        return summarize(samples, time.perf_counter() - started)
+
+    def report(self, name, result):
+        latency = result['latency_ms']
+        queries = result['queries']
+        self.stdout.write(
+            f'{name:<26} {result["throughput_rps"]:>9} rps  '
+            f'p50 {latency["p50"]:>8} ms  p95 {latency["p95"]:>8} ms  '
+            f'p99 {latency["p99"]:>8} ms  '
+            f'sql {queries["mean"] if queries else "-":>6}  '
+            f'errors {result["errors"]}'
+        )
@@ -0,0 +1,166 @@
+import io
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import MessagePackParser, ORJSONParser
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.serializers import ReviewSerializer, TitleSerializer
+from reviews.models import Category, Genre, Review, Title
+from users.models import CustomUser
+
+RENDERERS = {
+    'json': JSONRenderer,
+    'orjson': ORJSONRenderer,
+    'msgpack': MessagePackRenderer,
+}
+PARSERS = {
+    'json': JSONParser,
+    'orjson': ORJSONParser,
+    'msgpack': MessagePackParser,
+}
+WORDS = (
+    'фильм', 'книга', 'сюжет', 'герой', 'финал', 'автор', 'история',
+    'музыка', 'plot', 'ending', 'character', 'atmosphere', 'ёлка',
+)
+
+
+def sentence(rnd, words):
+    return ' '.join(rnd.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def title_items(rnd, count):
+    """Данные TitleSerializer для произведений в памяти, без базы."""
+    categories = [
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(8)
+    ]
+    genres = [Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(18)]
+    titles = []
+    for pk in range(1, count + 1):
+        title = Title(
+            pk=pk,
+            name=sentence(rnd, 3),
+            year=rnd.randint(1950, 2023),
+            description=sentence(rnd, 20),
+            category=rnd.choice(categories),
+        )
+        title.rating = rnd.choice((None, rnd.randint(1, 10)))
+        title._prefetched_objects_cache = {
+            'genre': rnd.sample(genres, rnd.randint(1, 3))
+        }
+        titles.append(title)
+    return TitleSerializer(titles, many=True).data
+
+
+def review_items(rnd, count):
+    """Данные ReviewSerializer для отзывов в памяти, без базы."""
+    started = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    reviews = [
+        Review(
+            pk=pk,
+            title=Title(pk=rnd.randint(1, 100_000)),
+            author=CustomUser(username=f'user_{rnd.randint(1, 10**6)}'),
+            text=sentence(rnd, 40),
+            score=rnd.randint(1, 10),
+            pub_date=started + timedelta(minutes=rnd.randint(0, 10**6)),
+        )
+        for pk in range(1, count + 1)
+    ]
+    return ReviewSerializer(reviews, many=True).data
+
+
+def measure(function, repeat):
+    """Медиана и минимум времени вызова в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Микробенчмарк рендереров и парсеров JSON и MessagePack '
+        'на списках TitleSerializer и ReviewSerializer: время, размер '
+        'ответа и проверка совпадения вывода с JSONRenderer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--output',
+                            help='Сохранить результаты в JSON-файл.')
+
+    def handle(self, *args, **options):
+        if options['items'] < 1 or options['repeat'] < 1:
+            raise CommandError('Число элементов и повторов должно быть больше 0')
+        rnd = random.Random(options['random_seed'])
+        datasets = {
+            'titles': title_items(rnd, options['items']),
+            'reviews': review_items(rnd, options['items']),
+        }
+        results = {}
+        for name, data in datasets.items():
+            self.stdout.write(f'{name}, {options["items"]} элементов:')
+            results[name] = self.run_dataset(data, options['repeat'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'items': options['items'],
+                    'repeat': options['repeat'],
+                    'datasets': results,
+                }, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+    def run_dataset(self, data, repeat):
+        baseline = JSONRenderer().render(data)
+        structure = json.loads(baseline)
+        result = {}
+        for name, renderer_class in RENDERERS.items():
+            renderer = renderer_class()
+            parser = PARSERS[name]()
+            body = renderer.render(data)
+            # JSON должен совпадать побайтно, MessagePack - по структуре.
+            if body != baseline and (
+                    parser.parse(io.BytesIO(body)) != structure
+                    or renderer.format == 'json'):
+                raise CommandError(f'Вывод {name} отличается от JSONRenderer')
+            result[name] = {
+                'bytes': len(body),
+                'render': measure(lambda: renderer.render(data), repeat),
+                'parse': measure(
+                    lambda: parser.parse(io.BytesIO(body)), repeat
+                ),
+            }
+        return self.report(result)
+
+    def report(self, result):
+        base = result['json']
+        for name, row in result.items():
+            row['render_speedup'] = round(
+                base['render']['median_ms'] / row['render']['median_ms'], 2
+            )
+            row['parse_speedup'] = round(
+                base['parse']['median_ms'] / row['parse']['median_ms'], 2
+            )
+            row['size_ratio'] = round(row['bytes'] / base['bytes'], 3)
+            self.stdout.write(
+                f'{name:<8} {row["bytes"]:>9} B ({row["size_ratio"]:.0%})  '
+                f'render {row["render"]["median_ms"]:>8} ms '
+                f'(x{row["render_speedup"]})  '
+                f'parse {row["parse"]["median_ms"]:>8} ms '
+                f'(x{row["parse_speedup"]})'
+            )
+        return result
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает таблицу похожих произведений для '
+        '/titles/{id}/similar/: косинус по разреженной матрице оценок '
+        'пользователь × произведение, для произведений без соседей по '
+        'оценкам - сходство жанров. Запускается по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbors', type=int, default=10,
+                            help='Соседей на произведение.')
+        parser.add_argument('--min-common', type=int, default=2,
+                            help='Минимум пользователей, оценивших оба '
+                                 'произведения.')
+        parser.add_argument('--block-size', type=int, default=2048,
+                            help='Строк матрицы сходства в одном блоке.')
+
+    def handle(self, *args, **options):
+        if min(options['neighbors'], options['min_common'],
+               options['block_size']) < 1:
+            raise CommandError('Параметры должны быть больше 0')
+        started = time.perf_counter()
+        title_ids = similarity.load_title_ids()
+        scores = similarity.load_scores()
+        genres = similarity.load_genres()
+        self.stdout.write(
+            f'Загружено {len(scores)} оценок, {len(title_ids)} произведений '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+        computed = time.perf_counter()
+        count = similarity.store(similarity.similar_titles(
+            scores, genres, title_ids,
+            k=options['neighbors'],
+            min_common=options['min_common'],
+            block_size=options['block_size'],
+        ))
+        self.stdout.write(
+            f'Записано {count} соседей за '
+            f'{time.perf_counter() - computed:.1f} с, всего '
+            f'{time.perf_counter() - started:.1f} с'
+        )
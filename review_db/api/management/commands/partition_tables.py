@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import partitions
+from reviews.models import Comment, Review
+
+
+class Command(BaseCommand):
+    help = (
+        'Переводит отзывы и комментарии в таблицы, секционированные по '
+        'месяцам pub_date, и заводит секции на --months-ahead месяцев '
+        'вперёд. Повторный запуск только добавляет секции, поэтому '
+        'команда запускается по расписанию раз в месяц.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int,
+            default=settings.PARTITION_MONTHS_AHEAD
+        )
+        parser.add_argument('--batch-size', type=int, default=50_000)
+        parser.add_argument(
+            '--drop-old', action='store_true',
+            help='Удалить прежнюю таблицу сразу после переключения.'
+        )
+
+    def handle(self, *args, **options):
+        if options['months_ahead'] < 0 or options['batch_size'] < 1:
+            raise CommandError('Неверные --months-ahead или --batch-size')
+        for model in (Review, Comment):
+            started = time.time()
+            partitions.convert(
+                model, options['months_ahead'], options['batch_size'],
+                options['drop_old'], log=self.stdout.write
+            )
+            created = partitions.extend(model, options['months_ahead'])
+            self.stdout.write(
+                f'{model._meta.db_table}: новых секций {len(created)} '
+                f'за {time.time() - started:.1f} с'
+            )
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import deletion
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет скрытые произведения и пользователей вместе с их '
+        'отзывами и комментариями частями по --batch-size строк. '
+        'Запускается по расписанию: дочищает то, что не успел удалить '
+        'фоновый поток воркера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.DELETION_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер части должен быть больше 0')
+        started = time.time()
+        titles, users = deletion.purge_deleted(options['batch_size'])
+        self.stdout.write(
+            f'Удалено произведений: {titles}, пользователей: {users} '
+            f'за {time.time() - started:.1f} с'
+        )
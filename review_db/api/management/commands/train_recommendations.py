@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from api import recommendations, similarity
+
+
+class Command(BaseCommand):
+    help = (
+        'Обучает модель рекомендаций /users/me/recommendations/ '
+        '(ALS по оценкам отзывов) и подменяет ею сохранённую. '
+        'Запускается по расписанию; новые оценки между запусками '
+        'учитываются подстановкой пользователя в модель при запросе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--factors', type=int, default=32)
+        parser.add_argument('--regularization', type=float, default=0.05)
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--cg-steps', type=int, default=3,
+                            help='Шагов сопряжённых градиентов на '
+                                 'половину итерации ALS.')
+        parser.add_argument('--random-seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if min(options['factors'], options['iterations'],
+               options['cg_steps']) < 1:
+            raise CommandError('Параметры должны быть больше 0')
+        # Отзывы после начала выборки модель не видела.
+        started = time.time()
+        title_ids = similarity.load_title_ids()
+        scores = similarity.load_scores()
+        scores = scores[np.isin(scores['title'], title_ids)]
+        if not len(scores):
+            raise CommandError('Нет оценок для обучения')
+        self.stdout.write(
+            f'Загружено {len(scores)} оценок за {time.time() - started:.1f} с'
+        )
+        trained = time.time()
+        model = recommendations.train(
+            scores, title_ids,
+            factors=options['factors'],
+            regularization=options['regularization'],
+            iterations=options['iterations'],
+            steps=options['cg_steps'],
+            seed=options['random_seed'],
+        )
+        model.trained_at = started
+        users = np.searchsorted(model.user_ids, scores['user'])
+        titles = np.searchsorted(model.title_ids, scores['title'])
+        predicted = np.einsum(
+            'ij,ij->i', model.user_factors[users], model.title_factors[titles]
+        ) + model.mean
+        rmse = np.sqrt(np.mean((predicted - scores['score']) ** 2))
+        recommendations.save(model)
+        self.stdout.write(
+            f'Обучено за {time.time() - trained:.1f} с: '
+            f'{len(model.user_ids)} пользователей, '
+            f'{len(model.title_ids)} произведений, RMSE {rmse:.3f}'
+        )
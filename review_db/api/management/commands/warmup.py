@@ -0,0 +1,19 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогрев: открывает соединения с базой, импортирует основные '
+        'модули, собирает маршруты и прогоняет основные маршруты API, '
+        'наполняя общий кеш. Воркеры gunicorn прогреваются сами '
+        '(gunicorn.conf.py), команда нужна для прогрева общего кеша '
+        'перед переключением трафика.'
+    )
+
+    def handle(self, *args, **options):
+        report = warm_up()
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,68 @@
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LABELS = ('view', 'method')
+TIME_BUCKETS = (
+    .001, .0025, .005, .01, .025, .05, .075, .1, .25, .5, .75, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+REQUEST_DURATION = Histogram(
+    'api_request_duration_seconds',
+    'Полное время обработки запроса.',
+    LABELS, buckets=TIME_BUCKETS
+)
+VIEW_DURATION = Histogram(
+    'api_view_duration_seconds',
+    'Время работы представления до рендеринга ответа.',
+    LABELS, buckets=TIME_BUCKETS
+)
+SERIALIZE_DURATION = Histogram(
+    'api_serialize_duration_seconds',
+    'Время рендеринга ответа в итоговый формат.',
+    LABELS, buckets=TIME_BUCKETS
+)
+DB_DURATION = Histogram(
+    'api_db_duration_seconds',
+    'Суммарное время SQL-запросов за запрос.',
+    LABELS, buckets=TIME_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'api_db_queries',
+    'Число SQL-запросов за запрос.',
+    LABELS, buckets=QUERY_BUCKETS
+)
+
+
+def observe(timing, method):
+    labels = (timing.view_name, method)
+    REQUEST_DURATION.labels(*labels).observe(timing.total)
+    DB_DURATION.labels(*labels).observe(timing.db)
+    DB_QUERIES.labels(*labels).observe(timing.queries)
+    if timing.view is not None:
+        VIEW_DURATION.labels(*labels).observe(timing.view)
+    if timing.serialize is not None:
+        SERIALIZE_DURATION.labels(*labels).observe(timing.serialize)
+
+
+def metrics_view(request):
+    """
+    Отдаёт гистограммы в формате Prometheus. При запуске нескольких
+    воркеров gunicorn метрики собираются из PROMETHEUS_MULTIPROC_DIR.
+    """
+    registry = REGISTRY
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,202 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+from .compression import accepted_encoding, cached_compress, compress
+from .metrics import observe
+from .profiling import profile_request, staff_user, store_profile
+from .queries import NPlusOneError, QueryInspector, should_sample
+from .warmup import is_warm_up
+
+
+def view_label(view_func, request):
+    """
+    Имя представления для меток метрик: для DRF это viewset и action
+    (TitlesViewSet.list), для остальных - имя маршрута.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        match = request.resolver_match
+        return match.view_name if match else 'unresolved'
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    if method == 'head':
+        method = 'get'
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+class RequestTiming:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.view_name = 'unresolved'
+        self.queries = 0
+        self.db = 0.0
+        self.view = None
+        self.serialize = None
+        self.total = None
+        self.view_started = None
+
+    def database(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self):
+        metrics = [
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"'
+        ]
+        if self.view is not None:
+            metrics.append(f'view;dur={self.view * 1000:.2f}')
+        if self.serialize is not None:
+            metrics.append(f'serialize;dur={self.serialize * 1000:.2f}')
+        metrics.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+class RequestTimingMiddleware:
+    """
+    Считает число и время SQL-запросов, время представления,
+    рендеринга ответа и полное время запроса. Результат уходит
+    в заголовок Server-Timing и в гистограммы Prometheus (кроме
+    запросов прогрева).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        request.timing = timing
+        started = perf_counter()
+        with connection.execute_wrapper(timing.database):
+            response = self.get_response(request)
+        finished = perf_counter()
+        timing.total = finished - started
+        if timing.view is None and timing.view_started is not None:
+            timing.view = finished - timing.view_started
+        response['Server-Timing'] = timing.server_timing()
+        if not is_warm_up(request):
+            observe(timing, request.method)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_name = view_label(view_func, request)
+        request.timing.view_started = perf_counter()
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после выхода из представления.
+        timing = request.timing
+        render_started = perf_counter()
+        timing.view = render_started - timing.view_started
+
+        def rendered(response):
+            timing.serialize = perf_counter() - render_started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class QueryInspectionMiddleware:
+    """
+    Пишет в лог медленные SQL-запросы и ищет N+1 в доле запросов,
+    заданной SQL_INSPECTION_SAMPLE_RATE. При SQL_N_PLUS_ONE_RAISE
+    найденный N+1 приводит к NPlusOneError (используется в тестах).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Прогрев идёт на холодных кешах, его запросы не показательны.
+        if is_warm_up(request):
+            return self.get_response(request)
+        inspector = QueryInspector(request.path, should_sample())
+        request.query_inspector = inspector
+        with connection.execute_wrapper(inspector):
+            response = self.get_response(request)
+        problems = inspector.report()
+        if problems and settings.SQL_N_PLUS_ONE_RAISE:
+            raise NPlusOneError('\n\n'.join(problems))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        inspector = getattr(request, 'query_inspector', None)
+        if inspector is not None:
+            inspector.endpoint = (
+                f'{view_label(view_func, request)} {request.path}'
+            )
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запрос сотрудника с параметром ?_profile=1
+    (или ?_profile=speedscope) либо заголовком X-Profile.
+    Вместо тела ответа возвращается профиль и SQL-трасса;
+    с ?_profile_store=1 или X-Profile-Store отчёт сохраняется
+    для последующего скачивания.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        output = request.GET.get('_profile') or request.headers.get('X-Profile')
+        if not output or staff_user(request) is None:
+            return self.get_response(request)
+        report = profile_request(self.get_response, request, output)
+        if (request.GET.get('_profile_store')
+                or request.headers.get('X-Profile-Store')):
+            profile_id = store_profile(report)
+            report['download'] = request.build_absolute_uri(
+                reverse('profile-download', args=[profile_id])
+            )
+        return JsonResponse(report)
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы API (JSON, MessagePack) длиннее COMPRESSION_MIN_BYTES
+    в brotli или gzip. Ответы, которые кешируются (с ETag или из кеша
+    представлений), сжимаются один раз: байты хранятся в общем кеше.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if (response.streaming
+                or content_type not in settings.COMPRESSION_CONTENT_TYPES
+                or response.has_header('Content-Encoding')):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = accepted_encoding(request)
+        if (encoding is None
+                or len(response.content) < settings.COMPRESSION_MIN_BYTES):
+            return response
+
+        etag = response.get('ETag')
+        if etag or getattr(response, 'cached', False):
+            content = cached_compress(
+                response.content, encoding, content_type
+            )
+        else:
+            content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        # Сжатое представление отличается побайтно, поэтому ETag слабый.
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,285 @@
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from .caching import (
+    LOCK_POLL_INTERVAL,
+    LOCK_PREFIX,
+    LOCK_TIMEOUT,
+    acquire,
+    register,
+    release,
+    single_flight,
+    versions,
+)
+from .compression import accepted_encoding
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET для list и retrieve. Дата изменения берётся одним
+    запросом по первичному ключу до выборки данных, и при совпадении
+    If-None-Match/If-Modified-Since возвращается 304 без запросов
+    к списку и без сериализации.
+
+    В ETag входят и версии суррогатных ключей version_keys: так
+    учитываются изменения, не отражённые в дате изменения строк.
+    """
+    version_keys = ()
+
+    def get_last_modified(self):
+        """Дата изменения ответа или None, если условный GET не нужен."""
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+    def conditional(self, handler, request, *args, **kwargs):
+        try:
+            last_modified = self.get_last_modified()
+        except (TypeError, ValueError, ValidationError):
+            last_modified = None
+        if last_modified is None:
+            return handler(request, *args, **kwargs)
+
+        # Адрес и тип содержимого входят в ETag: произведение и список
+        # его отзывов, страницы списка и представления в разных форматах
+        # меняются одновременно, но не должны совпадать.
+        etag = quote_etag(hashlib.sha1(
+            f'{request.get_full_path()}:{request.accepted_media_type}:'
+            f'{last_modified.isoformat()}:'
+            f'{versions(self.version_keys)}'.encode()
+        ).hexdigest())
+        timestamp = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        # Устаревшие данные из кеша не должны получить свежий валидатор.
+        if (response.status_code in (200, 304)
+                and not getattr(response, 'stale', False)):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+class SurrogateKeyMixin:
+    """
+    Разрешает nginx кешировать ответы анонимным пользователям
+    на PROXY_CACHE_SECONDS и помечает их суррогатными ключами,
+    по которым caching.purge сбрасывает кеш при изменениях.
+    """
+
+    def get_surrogate_keys(self):
+        return ()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        timeout = settings.PROXY_CACHE_SECONDS
+        keys = self.get_surrogate_keys()
+        if (not timeout or not keys or response.status_code != 200
+                or getattr(response, 'stale', False)
+                or request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return response
+        patch_cache_control(response, public=True, max_age=0, s_maxage=timeout)
+        response['X-Accel-Expires'] = timeout
+        response['Surrogate-Key'] = ' '.join(keys)
+        if settings.PROXY_CACHE_PURGE_URL:
+            register(
+                keys,
+                request.get_full_path(),
+                request.accepted_renderer.media_type,
+                accepted_encoding(request) or 'identity',
+                timeout
+            )
+        return response
+
+
+class CachedListMixin:
+    """
+    Кеширует данные ответов list в общем кеше под теми же
+    суррогатными ключами, что и SurrogateKeyMixin. Одновременные
+    промахи по одному адресу вычисляются одним воркером, остальные
+    получают устаревший ответ или ждут его результата.
+    """
+
+    def get_surrogate_keys(self):
+        return ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        keys = self.get_surrogate_keys()
+        if not settings.RESPONSE_CACHE_SECONDS or not keys:
+            return handler(request, *args, **kwargs)
+
+        def compute():
+            return handler(request, *args, **kwargs).data
+
+        data, fresh = single_flight(
+            f'response:{request.get_full_path()}',
+            compute,
+            keys,
+            settings.RESPONSE_CACHE_SECONDS,
+            settings.RESPONSE_CACHE_STALE_SECONDS
+        )
+        response = Response(data)
+        response.stale = not fresh
+        # Тело повторится у следующих запросов: CompressionMiddleware
+        # сохранит сжатые байты.
+        response.cached = True
+        return response
+
+
+class CachedResponseMixin(CachedListMixin):
+    """CachedListMixin, который кеширует и ответы retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class FastListMixin:
+    """
+    Действие list без сериализаторов: строки выбираются через
+    values_list(list_columns) и превращаются в словари функцией
+    list_rows(values) того же вида, что и у serializer_class.
+    """
+    list_columns = ()
+    list_rows = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        values = queryset.prefetch_related(None).values_list(
+            *self.list_columns
+        )
+        page = self.paginate_queryset(values)
+        if page is not None:
+            return self.get_paginated_response(self.list_rows(page))
+        return Response(self.list_rows(values))
+
+
+class FacetsMixin:
+    """
+    ?facets=a,b у списка: ответ {'results': [...], 'facets': {...}},
+    счётчики считает facet_counts(queryset, names) по тем же фильтрам,
+    что и список. Без параметра ответ списка не меняется.
+    """
+    facets = ()
+    facet_counts = None
+
+    def facet_queryset(self):
+        """Набор без аннотаций списка: фасетам нужны только фильтры."""
+        return self.get_queryset().model.objects.all()
+
+    def facet_names(self, request):
+        """Запрошенные фасеты; неизвестные отклоняются до запроса списка."""
+        param = request.query_params.get('facets')
+        if param is None:
+            return None
+        names = list(dict.fromkeys(
+            name.strip() for name in param.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.facets]
+        if unknown:
+            raise exceptions.ValidationError({
+                'facets': f'Неизвестные фасеты: {", ".join(unknown)}. '
+                          f'Доступны: {", ".join(self.facets)}.'
+            })
+        return names
+
+    def list(self, request, *args, **kwargs):
+        names = self.facet_names(request)
+        response = super().list(request, *args, **kwargs)
+        if names is None:
+            return response
+        counts = self.facet_counts(
+            self.filter_queryset(self.facet_queryset()), names
+        ) if names else {}
+        if isinstance(response.data, dict):
+            return Response({**response.data, 'facets': counts})
+        return Response({'results': response.data, 'facets': counts})
+
+
+class IdempotentCreateMixin:
+    """
+    Повтор create с тем же заголовком Idempotency-Key от того же
+    пользователя получает сохранённый ответ первого запроса
+    (Idempotent-Replayed: true) без валидации и записи в базу. Ответ
+    хранится IDEMPOTENCY_KEY_SECONDS; ответы 5xx не сохраняются, и
+    повтор выполняется заново. Пока первый запрос выполняется, повторы
+    ждут его ответа, а не дольше LOCK_TIMEOUT - получают 409. Ключ с
+    другим телом или адресом - 422.
+    """
+    idempotency_header = 'Idempotency-Key'
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        name = 'idempotency:{}:{}'.format(
+            request.user.pk, hashlib.sha256(key.encode()).hexdigest()
+        )
+        fingerprint = hashlib.sha256(json.dumps(
+            [request.path, request.data], sort_keys=True, default=str
+        ).encode()).hexdigest()
+
+        # Блокировка живёт дольше любого запроса и снимается только
+        # своим владельцем: если она всё же истекла и её взял повтор,
+        # первый запрос не снимет чужую.
+        lock, token = f'{LOCK_PREFIX}{name}', uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not acquire(lock, token, settings.IDEMPOTENCY_LOCK_SECONDS):
+            if time.monotonic() >= deadline:
+                return Response(
+                    {'detail': 'Запрос с этим ключом ещё выполняется.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            stored = cache.get(name)
+            if stored is not None:
+                return self.replay(stored, fingerprint)
+            try:
+                response = super().create(request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as error:
+                response = self.handle_exception(error)
+            if response.status_code < 500:
+                cache.set(name, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                }, settings.IDEMPOTENCY_KEY_SECONDS)
+            return response
+        finally:
+            release(lock, token)
+
+    def replay(self, stored, fingerprint):
+        if stored['fingerprint'] != fingerprint:
+            return Response(
+                {'detail': 'Ключ уже использован для другого запроса.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        return Response(
+            stored['data'], status=stored['status'],
+            headers={'Idempotent-Replayed': 'true'}
+        )
@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PubDateCursorPagination(CursorPagination):
+    """
+    Постраничный вывод курсором по pub_date: страница — это диапазон
+    индекса по дате публикации от позиции курсора, поэтому её стоимость
+    не растёт с глубиной ленты. Курсор DRF хранит только pub_date
+    последней строки и смещение среди строк с той же датой; id лишь
+    делает порядок таких строк устойчивым. Даты с микросекундами почти
+    не совпадают, и смещение остаётся малым.
+    """
+    ordering = ('-pub_date', '-id')
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
@@ -0,0 +1,483 @@
+"""
+Секционирование отзывов и комментариев по месяцам pub_date.
+
+Таблица переводится в секционированную (PARTITION BY RANGE) командой
+partition_tables: данные копируются в новую таблицу частями по id,
+пока старая доступна, а под коротким EXCLUSIVE-замком (чтение не
+блокируется) копия сверяется с таблицей по строкам целиком: строки,
+добавленные, изменённые и удалённые за время копирования, переносятся,
+и таблицы меняются именами. Имена индексов, первичного ключа и
+последовательности id остаются прежними.
+
+Ограничения PostgreSQL для секционированных таблиц:
+- первичный ключ включает ключ секционирования - (id, pub_date); если
+  модель объявляет такое ограничение, ключ получает его имя;
+- уникальность без pub_date (один отзыв пользователя на произведение)
+  проверяет триггер из миграции, он стоит на таблице и до перевода;
+- ссылки на таблицу - составные внешние ключи на (id, pub_date), как у
+  комментария на отзыв, и переносятся на новую таблицу.
+Триггеры и внешние ключи таблицы копируются, поэтому перевод не
+ослабляет проверок. Расхождение первичного ключа с моделью показывает
+проверка api.W001 (api.checks).
+
+Секции: помесячные {table}_pYYYYMM и {table}_pmax для дат после
+последнего месяца; первая помесячная принимает и все более ранние даты.
+Секции DEFAULT нет, поэтому запрос по убыванию pub_date с LIMIT
+(лента, история пользователя) читает секции по очереди от новой к
+старой и останавливается на первой же, где набрал строки.
+"""
+import gzip
+import os
+import re
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+from django.db.models import CASCADE, UniqueConstraint
+from django.utils import timezone as django_timezone
+
+MONTH_NAME = re.compile(r'_p(\d{6})$')
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def execute(sql, params=None):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall() if cursor.description else cursor.rowcount
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(month):
+    return month.replace(
+        year=month.year + month.month // 12, month=month.month % 12 + 1
+    )
+
+
+def add_months(month, count):
+    for _ in range(count):
+        month = next_month(month)
+    return month
+
+
+def literal(month):
+    # Границы секций не передаются параметрами: это DDL.
+    return f"'{month.isoformat()}'"
+
+
+def is_partitioned(table):
+    return execute(
+        'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+        'WHERE partrelid = to_regclass(%s))', [quote(table)]
+    )[0][0]
+
+
+def monthly_partitions(table):
+    """{начало месяца: имя секции} для помесячных секций table."""
+    rows = execute(
+        'SELECT c.relname FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid '
+        'WHERE i.inhparent = to_regclass(%s)', [quote(table)]
+    )
+    partitions = {}
+    for name, in rows:
+        match = MONTH_NAME.search(name)
+        if match and name == f'{table}_p{match[1]}':
+            month = datetime.strptime(match[1], '%Y%m').replace(
+                tzinfo=timezone.utc
+            )
+            partitions[month] = name
+    return partitions
+
+
+def create_partition(parent, table, month, first=False):
+    lower = 'MINVALUE' if first else literal(month)
+    execute(
+        f'CREATE TABLE {quote(f"{table}_p{month:%Y%m}")} '
+        f'PARTITION OF {quote(parent)} '
+        f'FOR VALUES FROM ({lower}) TO ({literal(next_month(month))})'
+    )
+
+
+def indexes(table):
+    """Имя и определение неуникальных индексов table."""
+    return execute(
+        'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x '
+        'JOIN pg_class i ON i.oid = x.indexrelid '
+        'WHERE x.indrelid = to_regclass(%s) AND NOT x.indisunique '
+        'ORDER BY i.relname', [quote(table)]
+    )
+
+
+def foreign_keys(table):
+    """
+    Внешние ключи table: имя, определение, таблица ссылки. Копии
+    ключа на секции таблицы ссылки PostgreSQL заводит сам.
+    """
+    return execute(
+        'SELECT conname, pg_get_constraintdef(oid), '
+        'confrelid::regclass::text FROM pg_constraint '
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f' "
+        'AND conparentid = 0 ORDER BY conname', [quote(table)]
+    )
+
+
+def drop_foreign_keys(table):
+    for name, _, _ in foreign_keys(table):
+        execute(f'ALTER TABLE {quote(table)} DROP CONSTRAINT {quote(name)}')
+
+
+def dependents(model):
+    """Модели и столбцы ссылок, удаляемые каскадом вместе с model."""
+    return [
+        (relation.related_model, relation.field.column)
+        for relation in model._meta.related_objects
+        if relation.on_delete is CASCADE
+    ]
+
+
+def export(query, path):
+    """Выгружает результат query в сжатый CSV {path}.tmp."""
+    with connection.cursor() as cursor, \
+            gzip.open(f'{path}.tmp', 'wb') as file:
+        with cursor.copy(
+            f'COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)'
+        ) as copy:
+            for data in copy:
+                file.write(data)
+    return path
+
+
+def references(table):
+    """Внешние ключи других таблиц на table: имя, определение, таблица."""
+    return execute(
+        'SELECT conname, pg_get_constraintdef(oid), '
+        'conrelid::regclass::text FROM pg_constraint '
+        "WHERE confrelid = to_regclass(%s) AND contype = 'f' "
+        'AND conparentid = 0 ORDER BY conname', [quote(table)]
+    )
+
+
+def keys(table):
+    """Имена первичного ключа и ограничений уникальности table."""
+    return [name for name, in execute(
+        'SELECT conname FROM pg_constraint '
+        "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u') "
+        'ORDER BY conname', [quote(table)]
+    )]
+
+
+def triggers(table):
+    """Имя и определение триггеров table, заведённых миграциями."""
+    return execute(
+        'SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger '
+        'WHERE tgrelid = to_regclass(%s) AND NOT tgisinternal '
+        'ORDER BY tgname', [quote(table)]
+    )
+
+
+def unique_columns(model):
+    return [
+        (constraint.name, [
+            model._meta.get_field(field).column
+            for field in constraint.fields
+        ])
+        for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.fields
+    ]
+
+
+def trigger_name(table, constraint):
+    """Триггер, которым миграция проверяет constraint без pub_date."""
+    return f'{table}_{constraint}'.replace(' ', '_')
+
+
+def partitioned_keys(model):
+    """
+    Ограничения секционированной таблицы вместо ограничений модели:
+    имя первичного ключа и уникальности с pub_date. Первичный ключ -
+    (id, pub_date); если модель объявляет такое ограничение, ключ
+    получает его имя. Ограничения без pub_date PostgreSQL проверить не
+    может: для них у таблицы должен быть триггер из миграции.
+    """
+    table = model._meta.db_table
+    existing = {name for name, _ in triggers(table)}
+    primary, unique = f'{table}_pkey', []
+    for name, columns in unique_columns(model):
+        if sorted(columns) == ['id', 'pub_date']:
+            primary = name
+        elif 'pub_date' in columns:
+            unique.append((name, columns))
+        elif trigger_name(table, name) not in existing:
+            raise ValueError(
+                f'{table}: ограничение «{name}» без pub_date нечем '
+                f'проверить после секционирования, нужен триггер '
+                f'{trigger_name(table, name)}'
+            )
+    return primary, unique
+
+
+def convert(model, months_ahead=3, batch_size=50_000, drop_old=False,
+            log=lambda message: None):
+    """
+    Переводит таблицу model в секционированную. Возвращает False, если
+    она уже секционирована. Прерванный перевод начинается заново.
+    """
+    table = model._meta.db_table
+    if is_partitioned(table):
+        return False
+    primary, unique = partitioned_keys(model)
+    new, old = f'{table}_partitioned', f'{table}_old'
+    sequence = f'{table}_id_seq'
+    started = django_timezone.now()
+    (first, last_id), = execute(
+        f'SELECT min(pub_date), max(id) FROM {quote(table)}'
+    )
+    months = []
+    month = month_start(first or started)
+    horizon = add_months(month_start(started), months_ahead)
+    while month <= horizon:
+        months.append(month)
+        month = next_month(month)
+
+    with transaction.atomic():
+        execute(f'DROP TABLE IF EXISTS {quote(new)} CASCADE')
+        execute(
+            f'CREATE TABLE {quote(new)} (LIKE {quote(table)} '
+            'INCLUDING DEFAULTS INCLUDING STORAGE) '
+            'PARTITION BY RANGE (pub_date)'
+        )
+        for month in months:
+            create_partition(new, table, month, first=month == months[0])
+        execute(
+            f'CREATE TABLE {quote(f"{table}_pmax")} PARTITION OF '
+            f'{quote(new)} FOR VALUES FROM '
+            f'({literal(next_month(months[-1]))}) TO (MAXVALUE)'
+        )
+        execute(f'CREATE SEQUENCE {quote(f"{sequence}_p")} '
+                f'OWNED BY {quote(new)}.id')
+        execute(
+            f'ALTER TABLE {quote(new)} ALTER COLUMN id '
+            f"SET DEFAULT nextval('{sequence}_p')"
+        )
+    log(f'{table}: {len(months) + 1} секций')
+
+    copied = 0
+    while copied < (last_id or 0):
+        execute(
+            f'INSERT INTO {quote(new)} SELECT * FROM {quote(table)} '
+            'WHERE id > %s AND id <= %s', [copied, copied + batch_size]
+        )
+        copied = min(copied + batch_size, last_id)
+        log(f'{table}: скопировано до id {copied}')
+
+    # Индексы строятся после копирования: так быстрее, чем обновлять
+    # их при вставке.
+    renamed = []
+    for name, definition in indexes(table):
+        execute(
+            f'CREATE INDEX {quote(f"{name}_p")} ON {quote(new)} '
+            f'{definition[definition.index(" USING "):]}'
+        )
+        renamed.append(name)
+    execute(
+        f'ALTER TABLE {quote(new)} ADD CONSTRAINT {quote(f"{primary}_p")} '
+        'PRIMARY KEY (id, pub_date)'
+    )
+    for name, columns in unique:
+        execute(
+            f'ALTER TABLE {quote(new)} ADD CONSTRAINT {quote(f"{name}_p")} '
+            f'UNIQUE ({", ".join(quote(column) for column in columns)})'
+        )
+    for name, definition, _ in foreign_keys(table):
+        execute(
+            f'ALTER TABLE {quote(new)} ADD CONSTRAINT {quote(name)} '
+            f'{definition}'
+        )
+    # Секционированную таблицу автоочистка не анализирует, а без
+    # статистики планировщик выбирает обход всех секций.
+    execute(f'ANALYZE {quote(new)}')
+    log(f'{table}: индексы построены')
+
+    unvalidated = []
+    with transaction.atomic():
+        execute(f'LOCK TABLE {quote(table)} IN EXCLUSIVE MODE')
+        # Копия сверяется с таблицей построчно целиком: изменения за
+        # время копирования находятся, даже если их транзакции начались
+        # раньше или не трогали updated_at (QuerySet.update()).
+        execute(
+            f'DELETE FROM {quote(new)} n WHERE NOT EXISTS ('
+            f'SELECT 1 FROM {quote(table)} o WHERE o.id = n.id '
+            'AND ROW(o.*) IS NOT DISTINCT FROM ROW(n.*))'
+        )
+        execute(
+            f'INSERT INTO {quote(new)} SELECT * FROM {quote(table)} o '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {quote(new)} n '
+            'WHERE n.id = o.id)'
+        )
+        (old_sequence,), = execute(
+            'SELECT pg_get_serial_sequence(%s, %s)', [quote(table), 'id']
+        )
+        execute(
+            f"SELECT setval('{sequence}_p', greatest("
+            f'(SELECT last_value FROM {old_sequence}), '
+            f'(SELECT coalesce(max(id), 1) FROM {quote(new)})))'
+        )
+        # Триггеры из миграций (уникальность без pub_date, заполнение
+        # столбцов) ставятся после докопирования строк.
+        for _, definition in triggers(table):
+            execute(re.sub(r' ON \S+ ', f' ON {quote(new)} ', definition, 1))
+        referencing = references(table)
+        for name, _, other in referencing:
+            execute(
+                f'ALTER TABLE {quote(other)} DROP CONSTRAINT {quote(name)}'
+            )
+        execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+        # Прежняя таблица - только копия: её внешние ключи мешали бы
+        # удалять произведения и пользователей.
+        drop_foreign_keys(old)
+        for name in keys(old):
+            execute(
+                f'ALTER TABLE {quote(old)} RENAME CONSTRAINT '
+                f'{quote(name)} TO {quote(f"{name}_old")}'
+            )
+        for name in renamed:
+            execute(f'ALTER INDEX {quote(name)} RENAME TO '
+                    f'{quote(f"{name}_old")}')
+            execute(f'ALTER INDEX {quote(f"{name}_p")} RENAME TO '
+                    f'{quote(name)}')
+        for name in [primary, *(name for name, _ in unique)]:
+            execute(
+                f'ALTER TABLE {quote(new)} RENAME CONSTRAINT '
+                f'{quote(f"{name}_p")} TO {quote(name)}'
+            )
+        execute(f'ALTER SEQUENCE {old_sequence} RENAME TO '
+                f'{quote(f"{sequence}_old")}')
+        execute(f'ALTER SEQUENCE {quote(f"{sequence}_p")} RENAME TO '
+                f'{quote(sequence)}')
+        execute(f'ALTER TABLE {quote(new)} RENAME TO {quote(table)}')
+        # Ссылки переносятся на новую таблицу. Строки обычной таблицы
+        # проверяются уже после снятия замка; для секционированной
+        # PostgreSQL отложить проверку не даёт.
+        for name, definition, other in referencing:
+            later = not is_partitioned(other)
+            execute(
+                f'ALTER TABLE {quote(other)} ADD CONSTRAINT {quote(name)} '
+                f'{definition}' + (' NOT VALID' if later else '')
+            )
+            if later:
+                unvalidated.append((name, other))
+        if drop_old:
+            execute(f'DROP TABLE {quote(old)}')
+    for name, other in unvalidated:
+        execute(f'ALTER TABLE {quote(other)} VALIDATE CONSTRAINT '
+                f'{quote(name)}')
+    log(f'{table}: секционирована'
+        + ('' if drop_old else f', прежняя таблица - {old}'))
+    return True
+
+
+def extend(model, months_ahead=3):
+    """
+    Добавляет помесячные секции до months_ahead месяцев вперёд,
+    отделяя их от {table}_pmax. Возвращает имена новых секций.
+    """
+    table = model._meta.db_table
+    if not is_partitioned(table):
+        return []
+    partitions = monthly_partitions(table)
+    last = f'{table}_pmax'
+    current = month_start(django_timezone.now())
+    horizon = add_months(current, months_ahead)
+    # Все помесячные секции могли уйти в архив: тогда с текущего месяца.
+    month = next_month(max(partitions)) if partitions else current
+    created = []
+    while month <= horizon:
+        upper = next_month(month)
+        with transaction.atomic():
+            execute(f'ALTER TABLE {quote(table)} DETACH PARTITION '
+                    f'{quote(last)}')
+            create_partition(table, table, month)
+            # Строки с датой в будущем (сбитые часы) переезжают в
+            # новую секцию.
+            execute(
+                f'INSERT INTO {quote(table)} SELECT * FROM {quote(last)} '
+                'WHERE pub_date < %s', [upper]
+            )
+            execute(f'DELETE FROM {quote(last)} WHERE pub_date < %s',
+                    [upper])
+            execute(
+                f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(last)} '
+                f'FOR VALUES FROM ({literal(upper)}) TO (MAXVALUE)'
+            )
+        created.append(f'{table}_p{month:%Y%m}')
+        month = upper
+    return created
+
+
+def archive(model, before, directory=None, affected=None):
+    """
+    Отсоединяет помесячные секции, целиком лежащие раньше before.
+    С directory секция сначала выгружается в {directory}/{секция}.csv.gz
+    (CSV с заголовком) и затем удаляется; без него остаётся отдельной
+    таблицей вне запросов приложения, без внешних ключей.
+
+    Зависимые строки (комментарии к отзывам секции) лежат в секциях по
+    своей дате, поэтому переносятся вместе с секцией: в таблицу
+    {секция}_{таблица} или в файл {секция}_{таблица}.csv.gz.
+    affected - пара (столбец, функция), как у api.deletion.delete_rows:
+    функции в той же транзакции передаются значения столбца убранных
+    строк, чтобы обновить даты изменения и кеши зависимых объектов.
+    Возвращает имена секций.
+    """
+    table = model._meta.db_table
+    if not is_partitioned(table):
+        return []
+    archived = []
+    for month, name in sorted(monthly_partitions(table).items()):
+        if next_month(month) > before:
+            break
+        files = []
+        with transaction.atomic():
+            if affected is not None:
+                column, touch = affected
+                touch({value for value, in execute(
+                    f'SELECT DISTINCT {quote(column)} FROM {quote(name)}'
+                )})
+            if directory is not None:
+                files.append(export(
+                    f'SELECT * FROM {quote(name)}',
+                    os.path.join(directory, f'{name}.csv.gz')
+                ))
+            for related, column in dependents(model):
+                related_table = related._meta.db_table
+                condition = (
+                    f'{quote(column)} IN (SELECT id FROM {quote(name)})'
+                )
+                rows = (
+                    f'SELECT * FROM {quote(related_table)} WHERE {condition}'
+                )
+                copy_name = f'{name}_{related_table}'
+                if directory is None:
+                    execute(f'CREATE TABLE {quote(copy_name)} AS {rows}')
+                else:
+                    files.append(export(
+                        rows, os.path.join(directory, f'{copy_name}.csv.gz')
+                    ))
+                execute(
+                    f'DELETE FROM {quote(related_table)} WHERE {condition}'
+                )
+            execute(f'ALTER TABLE {quote(table)} DETACH PARTITION '
+                    f'{quote(name)}')
+            if directory is None:
+                drop_foreign_keys(name)
+            else:
+                execute(f'DROP TABLE {quote(name)}')
+        for path in files:
+            os.replace(f'{path}.tmp', path)
+        archived.append(name)
+    return archived
@@ -0,0 +1,163 @@
+import json
+import sys
+import threading
+import uuid
+from collections import Counter
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .queries import short_path
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+class SamplingProfiler:
+    """
+    Статистический профилировщик одного потока: отдельный поток
+    с заданным интервалом снимает стек через sys._current_frames().
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.samples = []
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.started = perf_counter()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.sampler.join()
+        self.duration = perf_counter() - self.started
+
+    def run(self):
+        previous = perf_counter()
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    (code.co_name, short_path(code.co_filename),
+                     code.co_firstlineno)
+                )
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append((tuple(stack), now - previous))
+            previous = now
+
+    def collapsed(self):
+        """
+        Стеки в формате collapsed для flamegraph.pl и speedscope,
+        вес стека - время в микросекундах.
+        """
+        weights = Counter()
+        for stack, weight in self.samples:
+            weights[';'.join(
+                f'{name} ({path}:{line})' for name, path, line in stack
+            )] += weight
+        return '\n'.join(
+            f'{stack} {round(weight * 1e6)}'
+            for stack, weight in weights.most_common()
+        )
+
+    def speedscope(self, name):
+        frames = {}
+        samples = []
+        for stack, _ in self.samples:
+            samples.append([
+                frames.setdefault(frame, len(frames)) for frame in stack
+            ])
+        weights = [round(weight * 1000, 3) for _, weight in self.samples]
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'opiniosync',
+            'activeProfileIndex': 0,
+            'shared': {'frames': [
+                {'name': function, 'file': path, 'line': line}
+                for function, path, line in frames
+            ]},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(self.duration * 1000, 3),
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+
+
+class SQLTrace:
+    """Все SQL-запросы профилируемого запроса с длительностью."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'duration_ms': round((perf_counter() - started) * 1000, 3),
+            })
+
+
+def staff_user(request):
+    """Сотрудник из сессии или из токена DRF, иначе None."""
+    user = request.user
+    if not user.is_authenticated:
+        try:
+            authenticated = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        user = authenticated[0] if authenticated else None
+    return user if user is not None and user.is_staff else None
+
+
+def profile_request(get_response, request, output):
+    """Выполняет запрос под профилировщиком и возвращает отчёт."""
+    trace = SQLTrace()
+    interval = settings.PROFILING_INTERVAL_MS / 1000
+    with SamplingProfiler(interval) as profiler:
+        with connection.execute_wrapper(trace):
+            response = get_response(request)
+    name = f'{request.method} {request.get_full_path()}'
+    report = {
+        'request': name,
+        'status': response.status_code,
+        'duration_ms': round(profiler.duration * 1000, 3),
+        'interval_ms': settings.PROFILING_INTERVAL_MS,
+        'samples': len(profiler.samples),
+        'sql': trace.queries,
+    }
+    if output == 'speedscope':
+        report['speedscope'] = profiler.speedscope(name)
+    else:
+        report['collapsed'] = profiler.collapsed()
+    return report
+
+
+def store_profile(report):
+    """Сохраняет отчёт на диск и возвращает его идентификатор."""
+    profile_id = uuid.uuid4()
+    directory = settings.PROFILES_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f'{profile_id}.json', 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False)
+    return profile_id
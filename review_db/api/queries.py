@@ -0,0 +1,122 @@
+import logging
+import os
+import random
+import re
+import traceback
+from collections import Counter
+from time import perf_counter
+
+from django.conf import settings
+
+logger = logging.getLogger('api.sql')
+
+IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)', re.IGNORECASE)
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+SPACES = re.compile(r'\s+')
+STACK_DEPTH = 8
+PROJECT_DEPTH = 3
+ORM_PATH = os.path.join('django', 'db', '')
+INTERNAL_FILES = {
+    __file__,
+    os.path.join(os.path.dirname(__file__), 'middleware.py'),
+}
+
+
+class NPlusOneError(Exception):
+    """Повторяющиеся однотипные запросы в рамках одного запроса к API."""
+
+
+def normalize_sql(sql):
+    """
+    Приводит запрос к общему виду: литералы и списки IN заменяются
+    заглушками, чтобы запросы одной формы совпадали.
+    """
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = IN_LIST.sub('IN (...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def short_path(filename):
+    base_dir = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base_dir):
+        return filename[len(base_dir):]
+    _, _, library_path = filename.rpartition(f'site-packages{os.sep}')
+    return library_path
+
+
+def call_site():
+    """
+    Ближайшие к запросу кадры стека без слоя ORM и самого инспектора,
+    а также последние кадры кода проекта, если они глубже в стеке.
+    """
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if ORM_PATH not in frame.filename
+        and frame.filename not in INTERNAL_FILES
+    ]
+    nearest = frames[-STACK_DEPTH:]
+    project = [
+        frame for frame in frames[:-STACK_DEPTH]
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+    ][-PROJECT_DEPTH:]
+    return [
+        f'{short_path(frame.filename)}:{frame.lineno} in {frame.name}'
+        for frame in project + nearest
+    ]
+
+
+class QueryInspector:
+    """
+    Следит за SQL одного запроса: пишет в лог медленные запросы,
+    а в отобранных запросах ищет повторы одной формы (N+1).
+    """
+
+    def __init__(self, endpoint, sampled):
+        self.endpoint = endpoint
+        self.sampled = sampled
+        self.slow_threshold = settings.SQL_SLOW_QUERY_MS / 1000
+        self.repeat_threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+        self.shapes = Counter()
+        self.repeated = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - started
+            if self.sampled:
+                self.count(sql)
+            if elapsed >= self.slow_threshold:
+                logger.warning(
+                    'Медленный запрос %.1f мс на %s: %s\n%s',
+                    elapsed * 1000, self.endpoint, normalize_sql(sql),
+                    '\n'.join(call_site())
+                )
+
+    def count(self, sql):
+        shape = normalize_sql(sql)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.repeat_threshold:
+            self.repeated[shape] = call_site()
+
+    def report(self):
+        """Пишет в лог найденные N+1 и возвращает их описание."""
+        problems = []
+        for shape, stack in self.repeated.items():
+            problem = (
+                f'N+1 на {self.endpoint}: {self.shapes[shape]} запросов '
+                f'вида {shape}\n' + '\n'.join(stack)
+            )
+            logger.warning(problem)
+            problems.append(problem)
+        return problems
+
+
+def should_sample():
+    rate = settings.SQL_INSPECTION_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
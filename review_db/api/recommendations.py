@@ -0,0 +1,255 @@
+"""
+Персональные рекомендации по матричной факторизации оценок.
+
+Оценка пользователя u произведению i приближается как mean + U[u]·V[i].
+Матрицы U и V обучаются командой train_recommendations методом
+чередующихся наименьших квадратов (ALS) с регуляризацией, растущей с
+числом оценок (ALS-WR). Каждая половина шага решает системы всех строк
+сразу несколькими шагами сопряжённых градиентов на разреженных матрицах,
+без цикла по пользователям.
+
+Модель хранится каталогом .npy-файлов и открывается через mmap: воркеры
+делят страницы с кешем ОС, а не держат копию. Каждое обучение пишет
+новый каталог версии, и ссылка current переключается на него атомарно.
+Пользователь, которого нет в модели или который оценил что-то после
+обучения, подставляется в модель (fold-in) решением одной системы размера
+factors по его оценкам.
+"""
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+ARRAYS = ('user_ids', 'title_ids', 'user_factors', 'title_factors')
+META_FILE = 'meta.json'
+CURRENT = 'current'
+VERSION_PREFIX = 'model-'
+CHUNK_SIZE = 1_000_000
+
+
+class FactorModel:
+    """Обученные факторы; массивы - numpy или открытые через mmap."""
+
+    def __init__(self, user_ids, title_ids, user_factors, title_factors,
+                 mean, regularization, trained_at=None):
+        self.user_ids = user_ids
+        self.title_ids = title_ids
+        self.user_factors = user_factors
+        self.title_factors = title_factors
+        self.mean = mean
+        self.regularization = regularization
+        self.trained_at = trained_at or time.time()
+
+    def user_vector(self, user_id):
+        position = np.searchsorted(self.user_ids, user_id)
+        if (position < len(self.user_ids)
+                and self.user_ids[position] == user_id):
+            return np.asarray(self.user_factors[position])
+        return None
+
+    def fold_in(self, title_ids, scores):
+        """
+        Вектор пользователя по его оценкам при неизменных факторах
+        произведений: та же задача, что решает ALS для строки U.
+        """
+        title_ids = np.asarray(title_ids, dtype=np.int64)
+        positions = np.searchsorted(self.title_ids, title_ids)
+        positions = np.minimum(positions, len(self.title_ids) - 1)
+        known = self.title_ids[positions] == title_ids
+        if not known.any():
+            return None
+        factors = np.asarray(self.title_factors[positions[known]],
+                             dtype=np.float64)
+        ratings = np.asarray(scores, dtype=np.float64)[known] - self.mean
+        system = factors.T @ factors + (
+            self.regularization * known.sum() * np.eye(factors.shape[1])
+        )
+        return np.linalg.solve(system, factors.T @ ratings).astype(np.float32)
+
+    def recommend(self, vector, exclude, limit):
+        """
+        limit произведений с наибольшей предсказанной оценкой без exclude:
+        одно умножение матрицы факторов на вектор.
+        Возвращает пары (id произведения, оценка).
+        """
+        predicted = self.title_factors @ vector + self.mean
+        exclude = np.fromiter(exclude, dtype=np.int64)
+        positions = np.searchsorted(self.title_ids, exclude)
+        inside = positions < len(self.title_ids)
+        positions, exclude = positions[inside], exclude[inside]
+        positions = positions[self.title_ids[positions] == exclude]
+        predicted[positions] = -np.inf
+        limit = min(limit, len(predicted) - len(positions))
+        if limit <= 0:
+            return []
+        best = np.argpartition(-predicted, limit - 1)[:limit]
+        best = best[np.lexsort((self.title_ids[best], -predicted[best]))]
+        return [
+            (int(self.title_ids[i]), float(np.clip(predicted[i], 1, 10)))
+            for i in best
+        ]
+
+
+def solve(ratings, fixed, current, regularization, steps):
+    """
+    Половина шага ALS: строки current при неизменных fixed. Для каждой
+    строки r решается (F_r^T F_r + λ n_r I) x = F_r^T ratings_r, где F_r -
+    строки fixed по ненулевым столбцам r. Сопряжённые градиенты идут по
+    всем строкам сразу, начиная с текущего решения.
+    """
+    counts = np.diff(ratings.indptr)
+    rows = np.repeat(np.arange(ratings.shape[0]), counts)
+    columns = ratings.indices
+    penalty = (regularization * np.maximum(counts, 1))[:, None]
+
+    def product(x):
+        weights = np.empty(len(columns), dtype=np.float32)
+        for start in range(0, len(columns), CHUNK_SIZE):
+            stop = start + CHUNK_SIZE
+            weights[start:stop] = np.einsum(
+                'ij,ij->i', fixed[columns[start:stop]], x[rows[start:stop]]
+            )
+        weighted = sparse.csr_matrix(
+            (weights, columns, ratings.indptr), shape=ratings.shape
+        )
+        return weighted @ fixed + penalty * x
+
+    def ratio(numerator, denominator):
+        return np.divide(
+            numerator, denominator,
+            out=np.zeros_like(numerator), where=denominator > 0
+        )[:, None]
+
+    x = current.copy()
+    residual = ratings @ fixed - product(x)
+    direction = residual.copy()
+    norm = (residual * residual).sum(axis=1)
+    for _ in range(steps):
+        applied = product(direction)
+        alpha = ratio(norm, (direction * applied).sum(axis=1))
+        x += alpha * direction
+        residual -= alpha * applied
+        new_norm = (residual * residual).sum(axis=1)
+        direction = residual + ratio(new_norm, norm) * direction
+        norm = new_norm
+    return x
+
+
+def train(scores, title_ids, factors=32, regularization=0.05, iterations=10,
+          steps=3, seed=0):
+    """Обучает модель по оценкам в формате similarity.SCORE_ROW."""
+    scores = scores[np.isin(scores['title'], title_ids)]
+    user_ids, users = np.unique(scores['user'], return_inverse=True)
+    titles = np.searchsorted(title_ids, scores['title'])
+    mean = float(scores['score'].mean()) if len(scores) else 0.0
+    ratings = sparse.csr_matrix(
+        ((scores['score'] - mean).astype(np.float32), (users, titles)),
+        shape=(len(user_ids), len(title_ids))
+    )
+    transposed = ratings.T.tocsr()
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(
+        0, 0.1, (len(user_ids), factors)
+    ).astype(np.float32)
+    title_factors = rng.normal(
+        0, 0.1, (len(title_ids), factors)
+    ).astype(np.float32)
+    for _ in range(iterations):
+        user_factors = solve(
+            ratings, title_factors, user_factors, regularization, steps
+        )
+        title_factors = solve(
+            transposed, user_factors, title_factors, regularization, steps
+        )
+    return FactorModel(
+        user_ids, np.asarray(title_ids, dtype=np.int64), user_factors,
+        title_factors, mean, regularization
+    )
+
+
+def save(model, path=None):
+    """
+    Записывает модель в новый каталог версии внутри path и переключает на
+    него ссылку current одной заменой os.replace. Сам path не
+    переименовывается: это может быть точка монтирования тома. Воркеры,
+    открывшие старые файлы, дочитывают их до перезагрузки.
+    """
+    path = str(path or settings.RECOMMENDATIONS_DIR)
+    version = f'{VERSION_PREFIX}{time.time_ns()}'
+    directory = os.path.join(path, version)
+    os.makedirs(directory)
+    for name in ARRAYS:
+        np.save(os.path.join(directory, f'{name}.npy'), getattr(model, name))
+    with open(os.path.join(directory, META_FILE), 'w') as file:
+        json.dump({
+            'mean': model.mean,
+            'regularization': model.regularization,
+            'trained_at': model.trained_at,
+        }, file)
+    link = os.path.join(path, f'{CURRENT}.new')
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(version, link)
+    os.replace(link, os.path.join(path, CURRENT))
+    for name in os.listdir(path):
+        if name.startswith(VERSION_PREFIX) and name != version:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def load(path):
+    """Модель, на которую указывает ссылка current в каталоге path."""
+    path = os.path.join(path, os.readlink(os.path.join(path, CURRENT)))
+    with open(os.path.join(path, META_FILE)) as file:
+        meta = json.load(file)
+    arrays = {
+        name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        for name in ARRAYS
+    }
+    return FactorModel(**arrays, **meta)
+
+
+loaded = {}
+
+
+def current_model():
+    """
+    Модель из RECOMMENDATIONS_DIR, перечитывается после переобучения.
+    Проверка свежести - один readlink() ссылки current на запрос.
+    """
+    path = str(settings.RECOMMENDATIONS_DIR)
+    try:
+        version = (path, os.readlink(os.path.join(path, CURRENT)))
+    except FileNotFoundError:
+        return None
+    if loaded.get('version') != version:
+        loaded.update(version=version, model=load(path))
+    return loaded['model']
+
+
+def recommend(user_id, reviews, limit):
+    """
+    Рекомендации пользователю по его отзывам reviews - тройкам
+    (id произведения, оценка, дата изменения). Вектор из модели берётся,
+    только если ни один отзыв не менялся после обучения, иначе
+    пересчитывается по оценкам. None, если модели нет или пользователь
+    ничего не оценил из известного модели.
+    """
+    model = current_model()
+    if model is None:
+        return None
+    vector = None
+    if all(changed.timestamp() <= model.trained_at
+           for _, _, changed in reviews):
+        vector = model.user_vector(user_id)
+    if vector is None and reviews:
+        title_ids, scores, _ = zip(*reviews)
+        vector = model.fold_in(title_ids, scores)
+    if vector is None:
+        return None
+    return model.recommend(
+        vector, (title_id for title_id, _, _ in reviews), limit
+    )
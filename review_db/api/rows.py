@@ -0,0 +1,119 @@
+"""
+Быстрая сериализация списков только для чтения: строки берутся через
+values_list() с явными соединениями и превращаются в словари того же
+вида, что дают TitleSerializer, ReviewSerializer и CommentSerializer,
+без создания моделей и полей DRF. Порядок ключей и типы значений
+должны совпадать с сериализаторами побайтно (см. tests/test_rows.py).
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from reviews.models import GenreTitle, Title
+from .serializers import PUB_DATE_FORMAT
+
+TITLE_COLUMNS = (
+    'id', 'category__name', 'category__slug', 'rating', 'photo', 'name',
+    'year', 'description',
+)
+REVIEW_COLUMNS = ('id', 'author__username', 'title_id', 'score', 'pub_date',
+                  'text')
+COMMENT_COLUMNS = ('id', 'review_id', 'text', 'author__username', 'pub_date')
+SIMILAR_COLUMNS = ('similar_id', 'similar__name', 'similar__year', 'score',
+                   'source')
+
+
+def pub_date(value):
+    """Как DateTimeField(format=PUB_DATE_FORMAT) в текущем часовом поясе."""
+    if not value:
+        return None
+    return timezone.localtime(value).strftime(PUB_DATE_FORMAT)
+
+
+def photo_url(name):
+    """Как TitleSerializer.get_photo."""
+    if not name:
+        return None
+    storage = Title._meta.get_field('photo').storage
+    return f'{settings.HOST_URL}{storage.url(name)}'
+
+
+def title_genres(title_ids):
+    """
+    Жанры произведений одним запросом, в порядке Genre.Meta.ordering,
+    как при prefetch_related('genre').
+    """
+    genres = {title_id: [] for title_id in title_ids}
+    links = GenreTitle.objects.filter(
+        title_id__in=title_ids, genre__isnull=False
+    ).order_by('genre__name').values_list(
+        'title_id', 'genre__name', 'genre__slug'
+    )
+    for title_id, name, slug in links:
+        genres[title_id].append({'name': name, 'slug': slug})
+    return genres
+
+
+def title_rows(values):
+    """Строки TITLE_COLUMNS в вид TitleSerializer."""
+    values = list(values)
+    genres = title_genres([row[0] for row in values])
+    return [
+        {
+            'id': pk,
+            'genre': genres[pk],
+            'category': None if category_slug is None else {
+                'name': category_name,
+                'slug': category_slug,
+            },
+            'rating': None if rating is None else int(rating),
+            'photo': photo_url(photo),
+            'name': name,
+            'year': year,
+            'description': description,
+        }
+        for (pk, category_name, category_slug, rating, photo, name, year,
+             description) in values
+    ]
+
+
+def review_rows(values):
+    """Строки REVIEW_COLUMNS в вид ReviewSerializer."""
+    return [
+        {
+            'id': pk,
+            'author': author,
+            'title': title_id,
+            'score': score,
+            'pub_date': pub_date(published),
+            'text': text,
+        }
+        for pk, author, title_id, score, published, text in values
+    ]
+
+
+def comment_rows(values):
+    """Строки COMMENT_COLUMNS в вид CommentSerializer."""
+    return [
+        {
+            'id': pk,
+            'review': review_id,
+            'text': text,
+            'author': author,
+            'pub_date': pub_date(published),
+        }
+        for pk, review_id, text, author, published in values
+    ]
+
+
+def similar_rows(values):
+    """Строки SIMILAR_COLUMNS для /titles/{id}/similar/."""
+    return [
+        {
+            'id': pk,
+            'name': name,
+            'year': year,
+            'score': score,
+            'source': source,
+        }
+        for pk, name, year, score, source in values
+    ]
@@ -18,6 +18,8 @@ from reviews.models import (
     Comment,
 )
 
+PUB_DATE_FORMAT = '%d.%m.%Y %H:%M'
+
 
 class CustomUserCreateSerializer(UserCreatePasswordRetypeSerializer):
 
@@ -106,7 +108,7 @@ class TitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('updated_at', 'deleted_at')
         read_only_fields = (
             'id',
             'name',
@@ -143,11 +145,11 @@ class ReviewSerializer(serializers.ModelSerializer):
             MaxValueValidator(10)
         ]
     )
-    pub_date = serializers.DateTimeField(format='%d.%m.%Y %H:%M', read_only=True)
+    pub_date = serializers.DateTimeField(format=PUB_DATE_FORMAT, read_only=True)
 
     class Meta:
         model = Review
-        fields = '__all__'
+        exclude = ('updated_at',)
 
     def validate(self, data):
         """Можно оставить только один отзыв."""
@@ -160,6 +162,19 @@ class ReviewSerializer(serializers.ModelSerializer):
         return data
 
 
+class RecentReviewSerializer(ReviewSerializer):
+    """
+    Отзыв в ленте последних отзывов: с названием произведения.
+    """
+    title_name = serializers.CharField(source='title.name', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = (
+            'id', 'author', 'title', 'title_name', 'score', 'pub_date', 'text'
+        )
+
+
 class CommentSerializer(serializers.ModelSerializer):
     """
     Сериализует/десериализует данные модели Comment.
@@ -172,8 +187,25 @@ class CommentSerializer(serializers.ModelSerializer):
         slug_field='username',
         read_only=True
     )
-    pub_date = serializers.DateTimeField(format='%d.%m.%Y %H:%M', read_only=True)
+    pub_date = serializers.DateTimeField(format=PUB_DATE_FORMAT, read_only=True)
 
     class Meta:
         fields = ('id', 'review', 'text', 'author', 'pub_date')
         model = Comment
+
+
+class UserCommentSerializer(CommentSerializer):
+    """
+    Комментарий в истории пользователя: с произведением отзыва.
+    """
+    title = serializers.IntegerField(source='review.title_id', read_only=True)
+    title_name = serializers.CharField(
+        source='review.title.name', read_only=True
+    )
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id', 'review', 'title', 'title_name', 'text', 'author',
+            'pub_date'
+        )
@@ -0,0 +1,91 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from reviews.models import Category, Genre, GenreTitle, Review, Title
+from users.models import CustomUser
+from . import autocomplete
+from .caching import purge
+
+
+def purge_with_titles(titles, *keys):
+    """Сбрасывает ключи keys и страницы произведений titles."""
+    purge(*keys, *(
+        f'title-{title_id}'
+        for title_id in titles.values_list('pk', flat=True)
+    ))
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_changed(sender, instance, **kwargs):
+    purge('titles', f'title-{instance.pk}', *autocomplete.KEYS)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, **kwargs):
+    autocomplete.title_saved(instance)
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    autocomplete.title_deleted(instance)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """Отзывы меняют рейтинг произведения."""
+    purge('titles', f'title-{instance.title_id}')
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def genre_link_changed(sender, instance, **kwargs):
+    purge('titles', f'title-{instance.title_id}')
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # Удаление категории обнуляет ссылку у произведений без сигналов,
+    # поэтому их список собирается до удаления.
+    purge_with_titles(instance.titles.all(), 'categories', 'titles')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    purge_with_titles(
+        Title.objects.filter(genre=instance), 'genres', 'titles'
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Профиль /users/me/: почта, имя, фото, пароль, правки в админке.
+    Вход по токену обновляет только last_login, профиль не меняется.
+    """
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    purge(f'user-{instance.pk}')
+
+
+@receiver(pre_save, sender=CustomUser)
+def username_changed(sender, instance, update_fields, **kwargs):
+    """
+    Имя автора входит в представление отзывов и комментариев. Вместо
+    перезаписи их строк меняется версия ключа usernames, входящая
+    в их ETag.
+    """
+    if instance.pk is None or (
+            update_fields is not None and 'username' not in update_fields):
+        return
+    old_username = CustomUser.objects.filter(pk=instance.pk).values_list(
+        'username', flat=True
+    ).first()
+    if old_username not in (None, instance.username):
+        purge('usernames')
@@ -0,0 +1,216 @@
+"""
+Похожие произведения («оценившие это оценили и...») по разреженной
+матрице оценок пользователь × произведение.
+
+Сходство двух произведений — косинус их столбцов после вычитания из
+оценок среднего пользователя (adjusted cosine): пользователь, ставящий
+всем высокие оценки, не делает все произведения похожими. Произведение
+произведений матрицы считается блоками строк, поэтому память ограничена
+размером блока, а не квадратом числа произведений. Произведениям без
+достаточного числа соседей по оценкам недостающие места добираются по
+сходству жанров (коэффициент Жаккара).
+"""
+import numpy as np
+from django.db import connection, transaction
+from scipy import sparse
+
+from reviews.models import GenreTitle, Review, SimilarTitle, Title
+
+SCORE_ROW = np.dtype([
+    ('user', np.int64), ('title', np.int64), ('score', np.float32)
+])
+GENRE_ROW = np.dtype([('title', np.int64), ('genre', np.int64)])
+
+
+def load_scores(chunk_size=100_000):
+    """Оценки всех отзывов одним проходом серверного курсора."""
+    rows = Review.objects.order_by().values_list(
+        'author_id', 'title_id', 'score'
+    ).iterator(chunk_size=chunk_size)
+    return np.fromiter(rows, dtype=SCORE_ROW)
+
+
+def load_genres(chunk_size=100_000):
+    rows = GenreTitle.objects.order_by().filter(
+        genre__isnull=False
+    ).values_list('title_id', 'genre_id').iterator(chunk_size=chunk_size)
+    return np.fromiter(rows, dtype=GENRE_ROW)
+
+
+def load_title_ids():
+    return np.fromiter(
+        Title.objects.order_by('pk').values_list('pk', flat=True).iterator(),
+        dtype=np.int64
+    )
+
+
+def centered_matrix(scores, title_ids):
+    """
+    Матрица пользователь × произведение из оценок за вычетом среднего
+    пользователя и матрица из единиц на тех же местах.
+    """
+    _, users = np.unique(scores['user'], return_inverse=True)
+    titles = np.searchsorted(title_ids, scores['title'])
+    values = scores['score'].astype(np.float64)
+    means = np.bincount(users, weights=values) / np.bincount(users)
+    shape = (users.max() + 1 if len(users) else 0, len(title_ids))
+    centered = sparse.csr_matrix(
+        ((values - means[users]).astype(np.float32), (users, titles)),
+        shape=shape
+    )
+    reviewed = sparse.csr_matrix(
+        (np.ones(len(users), dtype=np.float32), (users, titles)), shape=shape
+    )
+    return centered, reviewed
+
+
+def normalized_columns(matrix):
+    """Столбцы единичной длины; нулевые столбцы остаются нулевыми."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    inverse = np.divide(
+        1, norms, out=np.zeros_like(norms), where=norms > 0
+    )
+    return (matrix @ sparse.diags(inverse.astype(np.float32))).tocsc()
+
+
+def best(columns, values, k):
+    """k наибольших значений строки по убыванию, при равенстве — по столбцу."""
+    if len(values) > k:
+        keep = np.argpartition(-values, k - 1)[:k]
+        columns, values = columns[keep], values[keep]
+    order = np.lexsort((columns, -values))
+    return columns[order], values[order]
+
+
+def review_neighbors(centered, reviewed, k, min_common, block_size):
+    """
+    Для каждого произведения до k соседей по косинусу не ниже нуля,
+    оценённых вместе хотя бы min_common пользователями.
+    Возвращает списки (столбцы, сходства) по номерам произведений.
+    """
+    normalized = normalized_columns(centered)
+    transposed = normalized.T.tocsr()
+    reviewed_transposed = reviewed.T.tocsr()
+    reviewed = reviewed.tocsc()
+    count = centered.shape[1]
+    neighbors = [None] * count
+    for start in range(0, count, block_size):
+        stop = min(start + block_size, count)
+        similarity = (transposed[start:stop] @ normalized).tocsr()
+        common = (reviewed_transposed[start:stop] @ reviewed).tocsr()
+        similarity = similarity.multiply(common >= min_common).tocsr()
+        for row in range(stop - start):
+            low, high = similarity.indptr[row], similarity.indptr[row + 1]
+            columns = similarity.indices[low:high]
+            values = similarity.data[low:high]
+            mask = (values > 0) & (columns != start + row)
+            neighbors[start + row] = best(columns[mask], values[mask], k)
+    return neighbors
+
+
+def genre_neighbors(genres, title_ids, rows, k, exclude):
+    """
+    До k соседей по коэффициенту Жаккара жанров для произведений с
+    номерами rows, без номеров из exclude[row]. Жаккар считается между
+    различными наборами жанров, которых намного меньше, чем произведений:
+    соседи набора - произведения наборов по убыванию сходства. Общие
+    жанры считаются разреженным произведением только для наборов из
+    rows, поэтому память не растёт с квадратом числа наборов.
+    """
+    titles = np.searchsorted(title_ids, genres['title'])
+    _, genre_index = np.unique(genres['genre'], return_inverse=True)
+    matrix = np.zeros(
+        (len(title_ids), genre_index.max() + 1 if len(titles) else 0),
+        dtype=bool
+    )
+    matrix[titles, genre_index] = True
+    sets, set_of = np.unique(matrix, axis=0, return_inverse=True)
+    set_of = set_of.ravel()
+    sizes = sets.sum(axis=1)
+    sets = sparse.csr_matrix(sets, dtype=np.int32)
+    transposed = sets.T.tocsc()
+    by_set = np.argsort(set_of, kind='stable')
+    bounds = np.searchsorted(set_of[by_set], np.arange(sets.shape[0] + 1))
+    candidates = {}
+    result = {}
+    for row in rows:
+        own = set_of[row]
+        if not sizes[own]:
+            continue
+        if own not in candidates:
+            # Произведения по убыванию сходства, при равенстве - по номеру.
+            shared = (sets[own] @ transposed).tocsr()
+            similar, common = shared.indices, shared.data
+            jaccard = common / (sizes[own] + sizes[similar] - common)
+            members = [by_set[bounds[i]:bounds[i + 1]] for i in similar]
+            columns = np.concatenate(members)
+            values = np.repeat(jaccard, [len(m) for m in members])
+            order = np.lexsort((columns, -values))
+            candidates[own] = columns[order], values[order]
+        columns, values = candidates[own]
+        taken = []
+        for position, column in enumerate(columns):
+            if column != row and column not in exclude[row]:
+                taken.append(position)
+                if len(taken) == k:
+                    break
+        result[row] = columns[taken], values[taken]
+    return result
+
+
+def similar_titles(scores, genres, title_ids, k=10, min_common=2,
+                   block_size=2048):
+    """
+    Строки таблицы SimilarTitle: (произведение, похожее, место,
+    сходство, источник), сначала соседи по оценкам, затем по жанрам.
+    Оценки и жанры произведений не из title_ids (добавленных после
+    выборки списка) пропускаются.
+    """
+    scores = scores[np.isin(scores['title'], title_ids)]
+    genres = genres[np.isin(genres['title'], title_ids)]
+    centered, reviewed = centered_matrix(scores, title_ids)
+    neighbors = review_neighbors(
+        centered, reviewed, k, min_common, block_size
+    )
+    cold = [row for row, (columns, _) in enumerate(neighbors)
+            if len(columns) < k]
+    fallback = genre_neighbors(
+        genres, title_ids, cold, k,
+        exclude={row: set(neighbors[row][0].tolist()) for row in cold}
+    )
+    for row, (columns, values) in enumerate(neighbors):
+        ranked = [
+            (column, value, SimilarTitle.REVIEWS)
+            for column, value in zip(columns, values)
+        ]
+        if row in fallback:
+            extra_columns, extra_values = fallback[row]
+            ranked += [
+                (column, value, SimilarTitle.GENRES)
+                for column, value in zip(extra_columns, extra_values)
+            ][:k - len(ranked)]
+        for rank, (column, value, source) in enumerate(ranked, start=1):
+            yield (
+                int(title_ids[row]), int(title_ids[column]), rank,
+                round(float(value), 6), source
+            )
+
+
+def store(rows):
+    """
+    Заменяет содержимое SimilarTitle строками rows через COPY в одной
+    транзакции: до фиксации запросы видят прежних соседей.
+    Возвращает число записанных строк.
+    """
+    table = SimilarTitle._meta.db_table
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table}')
+        with cursor.copy(
+            f'COPY {table} (title_id, similar_id, rank, score, source) '
+            'FROM STDIN'
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+    return count
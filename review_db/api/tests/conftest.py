@@ -1,6 +1,7 @@
 import datetime as dt
 
 import pytest
+from django.core.cache import cache
 from django.core.management import call_command
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
@@ -12,6 +13,19 @@ from reviews.models import Review, Title, Comment
 pytestmark = pytest.mark.django_db
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def cache_seconds(settings):
+    # Тесты идут в одном процессе, и кеш в его памяти общий для всех
+    # запросов, поэтому кеши ответов и профилей включены.
+    settings.RESPONSE_CACHE_SECONDS = 30
+    settings.PROFILE_CACHE_SECONDS = 600
+
+
 @pytest.fixture(scope='session')
 def user_client():
     client = APIClient()
@@ -66,6 +80,13 @@ def create_comment():
     )
 
 
+@pytest.fixture
+def fail_on_n_plus_one(settings):
+    settings.SQL_INSPECTION_SAMPLE_RATE = 1.0
+    settings.SQL_N_PLUS_ONE_THRESHOLD = 3
+    settings.SQL_N_PLUS_ONE_RAISE = True
+
+
 @pytest.fixture
 def create_test_user_data():
     return {
@@ -0,0 +1,117 @@
+import pytest
+from django.contrib import admin
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import constants
+from reviews.models import Comment, Review, Title
+from users.models import CustomUser
+
+REVIEWS_URL = '/admin/reviews/review/'
+COMMENTS_URL = '/admin/reviews/comment/'
+
+
+@pytest.fixture
+def staff_client(fill_db_categories, fill_db_genres, fill_db_titles,
+                 fill_db_users, fill_db_reviews, fill_db_comments):
+    user = CustomUser.objects.create_superuser(
+        id=10_000, username='root', email='root@example.com',
+        password=constants.TEST_PASSWORD
+    )
+    Comment.objects.bulk_create([
+        Comment(id=10_000 + review_id, review_id=review_id, text='Да',
+                author_id=user.pk)
+        for review_id in Review.objects.values_list('pk', flat=True)[:30]
+    ])
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def get(client, url, **params):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == 200
+    return response, [query['sql'] for query in queries]
+
+
+@pytest.mark.django_db
+class TestLargeTableAdmin:
+    @pytest.mark.parametrize('model, url', [
+        (Review, REVIEWS_URL), (Comment, COMMENTS_URL)
+    ])
+    def test_no_queries_per_row(self, staff_client, model, url):
+        response, queries = get(staff_client, url)
+
+        assert len(response.context['cl'].result_list) == model.objects.count()
+        assert len(queries) < 20
+        assert not any('DISTINCT' in sql for sql in queries)
+
+    def test_estimated_count(self, staff_client, settings):
+        settings.ADMIN_EXACT_COUNT_LIMIT = 0
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE reviews_review')
+
+        response, queries = get(staff_client, REVIEWS_URL)
+
+        assert not any('COUNT(*)' in sql for sql in queries)
+        assert response.context['cl'].result_count == pytest.approx(
+            Review.objects.count(), rel=0.1
+        )
+
+    def test_exact_count_for_small_lists(self, staff_client):
+        response, queries = get(staff_client, REVIEWS_URL, score=10)
+
+        assert response.context['cl'].result_count == Review.objects.filter(
+            score=10
+        ).count()
+        assert sum('COUNT(*)' in sql for sql in queries) == 1
+
+    def test_search_by_each_field(self, staff_client):
+        review = Review.objects.exclude(title__name__startswith='Побег').get(
+            pk=10
+        )
+        word = max(review.text.split(), key=len).strip('.,!?')
+        model_admin = admin.site._registry[Review]
+
+        response, queries = get(staff_client, REVIEWS_URL, q='Побег')
+        by_text, _ = model_admin.get_search_results(
+            None, Review.objects.all(), word
+        )
+
+        found = response.context['cl'].result_list
+        assert found
+        assert all(item.title.name.startswith('Побег') for item in found)
+        assert any('UNION' in sql for sql in queries)
+        assert by_text.filter(pk=review.pk).exists()
+
+    @pytest.mark.parametrize('model, term, index', [
+        (Review, 'звёзды', 'review_text_search_idx'),
+        (Title, 'Побег', 'title_name_prefix_idx'),
+        (Comment, 'звёзды', 'comment_text_search_idx'),
+        (CustomUser, 'adm', 'user_username_prefix_idx'),
+    ])
+    def test_search_uses_index(self, model, term, index):
+        queryset, _ = admin.site._registry[model].get_search_results(
+            None, model.objects.all(), term
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+
+        assert index in plan
+
+    def test_author_autocomplete(self, staff_client):
+        user = CustomUser.objects.exclude(pk=10_000).last()
+
+        response = staff_client.get('/admin/autocomplete/', {
+            'app_label': 'reviews', 'model_name': 'review',
+            'field_name': 'author', 'term': user.username[:3].upper(),
+        })
+
+        assert response.status_code == 200
+        assert str(user.pk) in [
+            item['id'] for item in response.json()['results']
+        ]
@@ -0,0 +1,143 @@
+import pytest
+from django.db.models import Count
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api import autocomplete
+from api.caching import invalidate
+from reviews.models import Title
+
+AUTOCOMPLETE_URL = '/api/v1/titles/autocomplete/'
+
+
+@pytest.fixture(autouse=True)
+def reset_index():
+    yield
+    autocomplete.state.update(index=None, checked=0.0, building=False)
+
+
+@pytest.fixture
+def catalog(fill_db_categories, fill_db_titles, fill_db_users,
+            fill_db_reviews):
+    return autocomplete.build()
+
+
+def expected(prefix, limit=10):
+    titles = Title.objects.annotate(
+        popularity=Count('reviews')
+    ).order_by('-popularity', 'id').values('id', 'name', 'year')
+    return [
+        title for title in titles
+        if autocomplete.normalize(title['name']).startswith(prefix)
+    ][:limit]
+
+
+def ids(titles):
+    return [title['id'] for title in titles]
+
+
+class TestPrefixIndex:
+    def test_normalize(self):
+        assert autocomplete.normalize('  Ёжик  В\tТУМАНЕ ') == 'ежик в тумане'
+
+    def test_search_by_popularity(self):
+        index = autocomplete.PrefixIndex.from_rows(
+            [(3, 'Матрица', 1999), (1, 'Мастер', 2005),
+             (2, 'Маугли', 1967), (4, 'Аватар', 2009)],
+            version=(0,)
+        )
+
+        assert ids(index.search('ма', 10)) == [3, 1, 2]
+        assert ids(index.search('ма', 2)) == [3, 1]
+        assert ids(index.search('мат', 10)) == [3]
+        assert index.search('я', 10) == []
+
+    def test_changes_return_copies(self):
+        index = autocomplete.PrefixIndex.from_rows(
+            [(1, 'Матрица', 1999), (2, 'Маугли', 1967)], version=(0,)
+        )
+
+        changed = index.with_title(2, 'Ёлка', 2010).with_title(
+            5, 'Мастер', 2005
+        ).without_title(1)
+
+        assert ids(index.search('м', 10)) == [1, 2]
+        assert changed.search('е', 10) == [
+            {'id': 2, 'name': 'Ёлка', 'year': 2010}
+        ]
+        assert ids(changed.search('м', 10)) == [5]
+
+
+@pytest.mark.django_db
+class TestAutocompleteEndpoint:
+    @pytest.mark.parametrize('query, prefix', (
+        ('власт', 'власт'),
+        ('ЗВЕЗДН', 'звездн'),
+        ('звёздн', 'звездн'),
+        ('к', 'к'),
+    ))
+    def test_matches_database(self, catalog, query, prefix):
+        response = APIClient().get(f'{AUTOCOMPLETE_URL}?q={query}')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data
+        assert response.data == expected(prefix)
+
+    def test_no_queries(self, catalog, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            response = APIClient().get(f'{AUTOCOMPLETE_URL}?q=к&limit=2')
+
+        assert response.data == expected('к', 2)
+
+    def test_empty_query(self, catalog):
+        response = APIClient().get(f'{AUTOCOMPLETE_URL}?q=%20')
+
+        assert response.data == []
+
+    def test_database_fallback(self, catalog, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            autocomplete, 'build_in_background', lambda: calls.append(1)
+        )
+        autocomplete.state['index'] = None
+
+        response = APIClient().get(f'{AUTOCOMPLETE_URL}?q=Звездн')
+
+        assert response.data == expected('звездн')
+        assert calls == [1]
+
+    def test_database_collapses_spaces(self, catalog):
+        Title.objects.create(id=10_000, name=' Звёздные \t  войны ', year=1977)
+
+        found = autocomplete.search_database('звездные войны', 50)
+
+        assert 10_000 in ids(found)
+        assert ids(found) == ids(expected('звездные войны', 50))
+
+    def test_title_writes(self, catalog, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            title = Title.objects.create(
+                id=10_000, name='Ёжик в тумане', year=1975
+            )
+        assert ids(APIClient().get(f'{AUTOCOMPLETE_URL}?q=еж').data) == [
+            10_000
+        ]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            title.delete()
+        assert APIClient().get(f'{AUTOCOMPLETE_URL}?q=еж').data == []
+
+    def test_stale_version_rebuilds(self, catalog, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            autocomplete, 'build_in_background', lambda: calls.append(1)
+        )
+        autocomplete.current_index()
+        assert calls == []
+
+        invalidate(autocomplete.KEYS)
+        autocomplete.state['checked'] = 0.0
+        index = autocomplete.current_index()
+
+        assert index is catalog
+        assert calls == [1]
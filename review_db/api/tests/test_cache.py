@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api import caching, checks
+from api.tests import constants
+
+TITLE_URL = f'/api/v1/titles/{constants.TEST_TITLE_ID}/'
+
+
+@pytest.fixture
+def refreshed(settings, monkeypatch):
+    """Адреса, которые приложение перезапросило бы через nginx."""
+    settings.PROXY_CACHE_SECONDS = 10
+    settings.PROXY_CACHE_PURGE_URL = 'http://nginx'
+    paths = []
+    monkeypatch.setattr(
+        caching,
+        'refresh_path',
+        lambda *variant: paths.append(variant)
+    )
+    monkeypatch.setattr(
+        caching.executor, 'submit', lambda function, *args: function(*args)
+    )
+    return paths
+
+
+@pytest.mark.django_db
+class TestProxyCache:
+    def test_anonymous_response_is_cacheable(self, refreshed, create_title):
+        response = APIClient().get(TITLE_URL)
+
+        assert 'public' in response['Cache-Control']
+        assert 's-maxage=10' in response['Cache-Control']
+        assert response['X-Accel-Expires'] == '10'
+        assert response['Surrogate-Key'] == f'title-{constants.TEST_TITLE_ID}'
+
+    def test_authenticated_response_is_not_cached(
+        self, refreshed, user_client, create_user, create_title
+    ):
+        response = user_client.get(TITLE_URL)
+
+        assert 'Surrogate-Key' not in response
+        assert 'X-Accel-Expires' not in response
+
+    def test_review_purges_title(
+        self,
+        refreshed,
+        django_capture_on_commit_callbacks,
+        user_client,
+        create_user,
+        create_title,
+        create_test_review_data
+    ):
+        client = APIClient()
+        client.get(TITLE_URL)
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/genres/')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user_client.post(
+                f'{TITLE_URL}reviews/', data=create_test_review_data
+            )
+
+        assert refreshed == [
+            ('/api/v1/titles/', 'application/json', 'identity'),
+            (TITLE_URL, 'application/json', 'identity'),
+        ]
+
+    def test_category_purges_its_titles(
+        self, refreshed, django_capture_on_commit_callbacks, create_title
+    ):
+        client = APIClient()
+        client.get(TITLE_URL)
+        client.get('/api/v1/categories/')
+        category = create_title.category
+
+        with django_capture_on_commit_callbacks(execute=True):
+            category.name = 'renamed'
+            category.save()
+
+        assert refreshed == [
+            ('/api/v1/categories/', 'application/json', 'identity'),
+            (TITLE_URL, 'application/json', 'identity'),
+        ]
+
+
+class TestSingleFlight:
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        def request():
+            results.append(
+                caching.single_flight('key', compute, ('titles',), 30, 300)
+            )
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [('value', True)] * 8
+
+    def test_stale_while_revalidate(self):
+        caching.single_flight('key', lambda: 'old', ('title-1',), 30, 300)
+        caching.invalidate(('title-1',))
+        cache.add(f'{caching.LOCK_PREFIX}key', 1)
+
+        assert caching.single_flight(
+            'key', lambda: 'new', ('title-1',), 30, 300
+        ) == ('old', False)
+
+        cache.delete(f'{caching.LOCK_PREFIX}key')
+        assert caching.single_flight(
+            'key', lambda: 'new', ('title-1',), 30, 300
+        ) == ('new', True)
+
+    def test_keeps_lock_of_other_worker(self):
+        lock = f'{caching.LOCK_PREFIX}key'
+
+        def compute():
+            # Блокировка истекла, и её взял другой воркер.
+            cache.set(lock, 'other')
+            return 'value'
+
+        caching.single_flight('key', compute, ('titles',), 30, 300)
+
+        assert cache.get(lock) == 'other'
+
+
+@pytest.mark.django_db
+def test_title_detail_refreshed_after_review(
+    django_capture_on_commit_callbacks,
+    user_client,
+    create_user,
+    create_title,
+    create_test_review_data
+):
+    client = APIClient()
+    assert client.get(TITLE_URL).data['rating'] is None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.post(f'{TITLE_URL}reviews/', data=create_test_review_data)
+
+    response = client.get(TITLE_URL)
+    assert response.data['rating'] == create_test_review_data['score']
+    assert 'ETag' in response
+
+
+def test_local_cache_check(settings):
+    settings.PROFILE_CACHE_SECONDS = 0
+
+    assert [error.id for error in checks.shared_cache(None)] == ['api.E001']
+
+    settings.RESPONSE_CACHE_SECONDS = 0
+    assert checks.shared_cache(None) == []
+
+    settings.RESPONSE_CACHE_SECONDS = 30
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/0',
+    }}
+    assert checks.shared_cache(None) == []
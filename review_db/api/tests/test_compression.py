@@ -0,0 +1,94 @@
+import gzip
+
+import brotli
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api import compression
+from api.tests import constants
+
+REVIEWS_URL = f'/api/v1/titles/{constants.TEST_TITLE_ID}/reviews/'
+
+
+@pytest.fixture
+def compressed(monkeypatch):
+    """Тела, которые действительно пришлось сжать."""
+    bodies = []
+    compress = compression.compress
+
+    def counting(body, encoding):
+        bodies.append(body)
+        return compress(body, encoding)
+
+    monkeypatch.setattr(compression, 'compress', counting)
+    return bodies
+
+
+@pytest.mark.django_db
+class TestCompression:
+    @pytest.mark.parametrize('accept, decompress', (
+        ('gzip, deflate, br', brotli.decompress),
+        ('gzip', gzip.decompress),
+        ('br;q=0, gzip', gzip.decompress),
+    ))
+    def test_large_response_is_compressed(
+        self, settings, accept, decompress, create_user, create_title,
+        create_review
+    ):
+        settings.COMPRESSION_MIN_BYTES = 100
+        plain = APIClient().get(REVIEWS_URL)
+        response = APIClient().get(REVIEWS_URL, HTTP_ACCEPT_ENCODING=accept)
+
+        assert 'Content-Encoding' not in plain
+        assert response['Content-Encoding'] in accept
+        assert response['Vary'].endswith('Accept-Encoding')
+        assert decompress(response.content) == plain.content
+        assert response['ETag'] == 'W/' + plain['ETag']
+
+    def test_small_response_is_not_compressed(self, create_title):
+        response = APIClient().get(
+            '/api/v1/categories/', HTTP_ACCEPT_ENCODING='br'
+        )
+
+        assert 'Content-Encoding' not in response
+        assert 'Accept-Encoding' in response['Vary']
+
+    def test_weak_etag_still_matches(
+        self, settings, create_user, create_title, create_review
+    ):
+        settings.COMPRESSION_MIN_BYTES = 100
+        client = APIClient(HTTP_ACCEPT_ENCODING='br')
+        etag = client.get(REVIEWS_URL)['ETag']
+
+        response = client.get(REVIEWS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_cached_body_is_compressed_once(
+        self, settings, compressed, fill_db_categories, fill_db_genres,
+        fill_db_titles, add_genres_to_titles
+    ):
+        settings.COMPRESSION_MIN_BYTES = 100
+        client = APIClient(HTTP_ACCEPT_ENCODING='gzip')
+
+        first = client.get('/api/v1/titles/')
+        second = client.get('/api/v1/titles/')
+
+        assert first['Content-Encoding'] == 'gzip'
+        assert second.content == first.content
+        assert len(compressed) == 1
+
+    def test_different_urls_get_their_own_body(
+        self, settings, create_user, create_title, create_review
+    ):
+        settings.COMPRESSION_MIN_BYTES = 100
+        client = APIClient(HTTP_ACCEPT_ENCODING='br')
+        title_url = f'/api/v1/titles/{constants.TEST_TITLE_ID}/'
+
+        client.get(title_url)
+        response = client.get(REVIEWS_URL)
+
+        assert brotli.decompress(
+            response.content
+        ) == APIClient().get(REVIEWS_URL).content
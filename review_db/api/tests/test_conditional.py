@@ -0,0 +1,142 @@
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.tests import constants
+from reviews.models import Category, Genre, GenreTitle, Review
+
+TITLE_URL = f'/api/v1/titles/{constants.TEST_TITLE_ID}/'
+REVIEWS_URL = f'{TITLE_URL}reviews/'
+REVIEW_URL = f'{REVIEWS_URL}{constants.TEST_REVIEW_ID}/'
+COMMENTS_URL = f'{REVIEW_URL}comments/'
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    @pytest.mark.parametrize('url', (
+        TITLE_URL, REVIEWS_URL, REVIEW_URL, COMMENTS_URL
+    ))
+    def test_not_modified(
+        self,
+        url,
+        django_assert_max_num_queries,
+        create_user,
+        create_title,
+        create_review,
+        create_comment
+    ):
+        client = APIClient()
+        response = client.get(url)
+        etag = response['ETag']
+
+        with django_assert_max_num_queries(1):
+            not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        by_date = client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified['ETag'] == etag
+        assert not not_modified.content
+        assert by_date.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_new_review_changes_title_etag(
+        self,
+        user_client,
+        create_user,
+        create_title,
+        create_test_review_data
+    ):
+        client = APIClient()
+        title_etag = client.get(TITLE_URL)['ETag']
+        reviews_etag = client.get(REVIEWS_URL)['ETag']
+
+        user_client.post(REVIEWS_URL, data=create_test_review_data)
+
+        assert client.get(TITLE_URL)['ETag'] != title_etag
+        response = client.get(REVIEWS_URL, HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 1
+
+    def test_comment_update_changes_etags(
+        self,
+        user_client,
+        create_user,
+        create_title,
+        create_review,
+        create_comment,
+        patch_test_comment_data
+    ):
+        client = APIClient()
+        comments_etag = client.get(COMMENTS_URL)['ETag']
+        comment_id = client.get(COMMENTS_URL).data[0]['id']
+        comment_url = f'{COMMENTS_URL}{comment_id}/'
+        comment_etag = client.get(comment_url)['ETag']
+
+        user_client.patch(comment_url, data=patch_test_comment_data)
+
+        assert client.get(COMMENTS_URL)['ETag'] != comments_etag
+        response = client.get(comment_url, HTTP_IF_NONE_MATCH=comment_etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['text'] == patch_test_comment_data['text']
+
+    def test_etag_identifies_resource(
+        self, create_user, create_title, create_review, create_comment
+    ):
+        client = APIClient()
+
+        etags = [client.get(url)['ETag'] for url in (
+            TITLE_URL, REVIEWS_URL, REVIEW_URL, COMMENTS_URL,
+            f'{REVIEWS_URL}?page=1'
+        )]
+
+        assert len(set(etags)) == len(etags)
+
+    def test_username_change_changes_etags(
+        self,
+        django_capture_on_commit_callbacks,
+        create_user,
+        create_title,
+        create_review,
+        create_comment
+    ):
+        client = APIClient()
+        urls = (REVIEWS_URL, REVIEW_URL, COMMENTS_URL)
+        etags = [client.get(url)['ETag'] for url in urls]
+        updated = Review.objects.values_list('updated_at', flat=True).get(
+            pk=constants.TEST_REVIEW_ID
+        )
+        author = Review.objects.get(pk=constants.TEST_REVIEW_ID).author
+
+        with django_capture_on_commit_callbacks(execute=True):
+            author.username = 'renamed'
+            author.save()
+
+        for url, etag in zip(urls, etags):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_200_OK
+        assert Review.objects.values_list('updated_at', flat=True).get(
+            pk=constants.TEST_REVIEW_ID
+        ) == updated
+
+    @pytest.mark.parametrize('model', (Category, Genre))
+    def test_deleting_link_changes_title_etag(
+        self, model, fill_db_genres, create_title
+    ):
+        GenreTitle.objects.create(
+            id=10_000, title_id=constants.TEST_TITLE_ID, genre_id=1
+        )
+        client = APIClient()
+        etag = client.get(TITLE_URL)['ETag']
+
+        model.objects.get(pk=1).delete()
+
+        response = client.get(TITLE_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_titles_list_without_etag(self, create_title):
+        response = APIClient().get('/api/v1/titles/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'ETag' not in response
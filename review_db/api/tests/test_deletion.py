@@ -0,0 +1,182 @@
+import pytest
+from django.contrib import admin
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api import deletion
+from api.tests import constants
+from reviews.models import Comment, GenreTitle, Review, Title
+from users.models import CustomUser
+
+TITLE_ID = 1
+
+
+@pytest.fixture
+def dataset(settings, fill_db_categories, fill_db_genres, fill_db_titles,
+            add_genres_to_titles, fill_db_users, fill_db_reviews,
+            create_user, create_title, create_review, create_comment):
+    settings.RESPONSE_CACHE_SECONDS = 0
+    # Комментарии тестового пользователя к чужим отзывам.
+    Comment.objects.bulk_create([
+        Comment(id=10_000 + review_id, review_id=review_id, text='Да',
+                author_id=constants.TEST_USER_ID)
+        for review_id in Review.objects.filter(
+            title_id=TITLE_ID
+        ).values_list('pk', flat=True)
+    ])
+
+
+def hide_title(title_id):
+    admin.site._registry[Title].delete_queryset(
+        None, Title.objects.filter(pk=title_id)
+    )
+
+
+@pytest.mark.django_db
+class TestTitleDeletion:
+    def test_hidden_immediately(self, dataset):
+        reviews = Review.objects.filter(title_id=TITLE_ID).count()
+
+        hide_title(TITLE_ID)
+
+        client = APIClient()
+        assert reviews
+        assert client.get(
+            f'/api/v1/titles/{TITLE_ID}/'
+        ).status_code == status.HTTP_404_NOT_FOUND
+        assert client.get(
+            f'/api/v1/titles/{TITLE_ID}/reviews/'
+        ).status_code == status.HTTP_404_NOT_FOUND
+        assert TITLE_ID not in [
+            title['id'] for title in client.get('/api/v1/titles/').data
+        ]
+        assert TITLE_ID not in [
+            title['id'] for title in client.get(
+                '/api/v1/titles/autocomplete/?q=побег'
+            ).data
+        ]
+        assert all(
+            review['title'] != TITLE_ID
+            for review in client.get('/api/v1/reviews/recent/').data[
+                'results'
+            ]
+        )
+        assert Review.objects.filter(title_id=TITLE_ID).count() == reviews
+
+    def test_purge_in_batches(self, dataset, monkeypatch):
+        comments = Comment.objects.filter(review__title_id=TITLE_ID).count()
+        others = Review.objects.exclude(title_id=TITLE_ID).count()
+        hide_title(TITLE_ID)
+        loaded = []
+        for model in (Review, Comment):
+            monkeypatch.setattr(model, 'from_db', classmethod(
+                lambda cls, *args: loaded.append(cls)
+            ))
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('purge_deleted', '--batch-size', '2')
+        monkeypatch.undo()
+
+        deletes = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('DELETE FROM "reviews_comment"')
+        ]
+        assert len(deletes) == (comments + 1) // 2
+        assert not loaded
+        assert not Title.all_objects.filter(pk=TITLE_ID).exists()
+        assert not Review.objects.filter(title_id=TITLE_ID).exists()
+        assert not GenreTitle.objects.filter(title_id=TITLE_ID).exists()
+        assert not Comment.objects.filter(
+            review__title_id=TITLE_ID
+        ).exists()
+        assert Review.objects.count() == others
+
+
+@pytest.mark.django_db
+class TestUserDeletion:
+    def test_delete_me(self, dataset, user_client):
+        response = user_client.delete(
+            '/api/v1/users/me/',
+            {'current_password': constants.TEST_PASSWORD},
+            format='json'
+        )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert user_client.get(
+            '/api/v1/users/me/'
+        ).status_code == status.HTTP_401_UNAUTHORIZED
+        assert APIClient().get(
+            f'/api/v1/users/{constants.TEST_USER_ID}/reviews/'
+        ).status_code == status.HTTP_404_NOT_FOUND
+        assert CustomUser.objects.filter(pk=constants.TEST_USER_ID).exists()
+
+    def test_hidden_author_not_public(self, dataset):
+        user = CustomUser.objects.get(pk=constants.TEST_USER_ID)
+        review_id = Review.objects.filter(title_id=TITLE_ID).exclude(
+            author=user
+        ).values_list('pk', flat=True).first()
+        title_url = f'/api/v1/titles/{constants.TEST_TITLE_ID}/'
+        comments_url = (
+            f'/api/v1/titles/{TITLE_ID}/reviews/{review_id}/comments/'
+        )
+        client = APIClient()
+        etag = client.get(title_url)['ETag']
+        assert client.get(title_url).data['rating'] == 5
+
+        admin.site._registry[CustomUser].delete_model(None, user)
+
+        response = client.get(title_url)
+        assert response['ETag'] != etag
+        assert response.data['rating'] is None
+        assert not client.get(f'{title_url}reviews/').data
+        assert client.get(
+            f'{title_url}reviews/{constants.TEST_REVIEW_ID}/comments/'
+        ).status_code == status.HTTP_404_NOT_FOUND
+        assert all(
+            comment['author'] != user.username
+            for comment in client.get(comments_url).data
+        )
+        assert all(
+            review['author'] != user.username
+            for review in client.get('/api/v1/reviews/recent/').data[
+                'results'
+            ]
+        )
+        assert Review.objects.filter(author=user).exists()
+
+    def test_purge_touches_titles(self, dataset):
+        user = CustomUser.objects.get(pk=constants.TEST_USER_ID)
+        admin.site._registry[CustomUser].delete_model(None, user)
+        commented = set(Comment.objects.filter(
+            author=user
+        ).values_list('review_id', flat=True))
+        before = dict(Review.objects.filter(
+            pk__in=commented
+        ).values_list('pk', 'updated_at'))
+        title_before = Title.objects.get(
+            pk=constants.TEST_TITLE_ID
+        ).updated_at
+
+        assert deletion.purge_deleted(batch_size=2) == (0, 1)
+
+        assert not CustomUser.objects.filter(
+            pk=constants.TEST_USER_ID
+        ).exists()
+        assert not Review.objects.filter(
+            author_id=constants.TEST_USER_ID
+        ).exists()
+        assert not Comment.objects.filter(
+            author_id=constants.TEST_USER_ID
+        ).exists()
+        remaining = Review.objects.filter(pk__in=commented)
+        assert remaining.exists()
+        assert all(
+            updated_at > before[pk]
+            for pk, updated_at in remaining.values_list('pk', 'updated_at')
+        )
+        assert Title.objects.get(
+            pk=constants.TEST_TITLE_ID
+        ).updated_at > title_before
@@ -0,0 +1,95 @@
+from collections import Counter
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from reviews.models import Category, GenreTitle, Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+@pytest.fixture
+def catalog(
+    settings,
+    fill_db_categories,
+    fill_db_genres,
+    fill_db_titles,
+    add_genres_to_titles
+):
+    settings.RESPONSE_CACHE_SECONDS = 0
+    Title.objects.create(id=10_000, name='Без категории', year=1987)
+
+
+def expected_facets(title_ids):
+    titles = Title.objects.filter(pk__in=title_ids)
+    genres = Counter(slug for slug, _ in set(GenreTitle.objects.filter(
+        title_id__in=title_ids, genre__isnull=False
+    ).values_list('genre__slug', 'title_id')))
+    categories = Counter(titles.filter(
+        category__isnull=False
+    ).values_list('category__slug', flat=True))
+    decades = Counter(year // 10 * 10 for year in titles.values_list(
+        'year', flat=True
+    ))
+    return {'genre': genres, 'category': categories, 'year': decades}
+
+
+def counts(facets):
+    return {
+        name: Counter({value['value']: value['count'] for value in values})
+        for name, values in facets.items()
+    }
+
+
+@pytest.mark.django_db
+class TestFacets:
+    @pytest.mark.parametrize('query', (
+        '', 'category=movie', 'genre=drama,comedy', 'year=1994',
+        'name=а&genre=drama,comedy&genre_match=all',
+    ))
+    def test_counts_follow_filters(self, catalog, query):
+        plain = APIClient().get(f'{TITLES_URL}?{query}')
+
+        response = APIClient().get(
+            f'{TITLES_URL}?{query}&facets=genre,category,year'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == plain.data
+        assert counts(response.data['facets']) == expected_facets(
+            [title['id'] for title in plain.data]
+        )
+
+    def test_selected_facets_and_labels(self, catalog):
+        response = APIClient().get(f'{TITLES_URL}?facets=category')
+
+        facets = response.data['facets']
+        assert list(facets) == ['category']
+        assert {
+            value['value']: value['name'] for value in facets['category']
+        } == dict(Category.objects.filter(
+            slug__in=[value['value'] for value in facets['category']]
+        ).values_list('slug', 'name'))
+        assert [value['count'] for value in facets['category']] == sorted(
+            (value['count'] for value in facets['category']), reverse=True
+        )
+
+    def test_one_query_for_all_facets(self, catalog):
+        with CaptureQueriesContext(connection) as plain:
+            APIClient().get(TITLES_URL)
+        with CaptureQueriesContext(connection) as faceted:
+            APIClient().get(f'{TITLES_URL}?facets=genre,category,year')
+
+        assert len(faceted) == len(plain) + 1
+        assert 'GROUPING SETS' in faceted[-1]['sql']
+
+    def test_unknown_facet(self, catalog):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(f'{TITLES_URL}?facets=genre,author')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not any('reviews_title' in query['sql'] for query in queries)
+        assert 'author' in str(response.data['facets'])
@@ -0,0 +1,99 @@
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from reviews.models import Genre, GenreTitle, Review, Title
+from users.models import CustomUser
+
+TITLES_URL = '/api/v1/titles/'
+
+
+@pytest.fixture
+def catalog(
+    settings,
+    fill_db_categories,
+    fill_db_genres,
+    fill_db_titles,
+    add_genres_to_titles,
+    fill_db_users,
+    fill_db_reviews
+):
+    settings.RESPONSE_CACHE_SECONDS = 0
+    # Произведение со связью с каждым жанром дважды: соединение через
+    # GenreTitle умножило бы его отзывы.
+    title = Title.objects.create(id=10_000, name='Много жанров', year=2001)
+    drama, comedy = Genre.objects.filter(slug__in=('drama', 'comedy'))
+    GenreTitle.objects.bulk_create([
+        GenreTitle(id=10_000 + i, title=title, genre=genre)
+        for i, genre in enumerate((drama, comedy, drama, comedy))
+    ])
+    authors = CustomUser.objects.values_list('pk', flat=True)[:3]
+    Review.objects.bulk_create([
+        Review(id=10_000 + author, title=title, author_id=author,
+               score=score, text='Отзыв')
+        for author, score in zip(authors, (10, 4, 7))
+    ])
+    return title
+
+
+def titles_with(*slugs, match):
+    titles = Title.objects.all()
+    if match == 'all':
+        for slug in slugs:
+            titles = titles.filter(
+                pk__in=GenreTitle.objects.filter(
+                    genre__slug=slug
+                ).values('title_id')
+            )
+        return set(titles.values_list('pk', flat=True))
+    return set(GenreTitle.objects.filter(
+        genre__slug__in=slugs
+    ).values_list('title_id', flat=True))
+
+
+def ids(response):
+    return [title['id'] for title in response.data]
+
+
+@pytest.mark.django_db
+class TestGenreFilter:
+    @pytest.mark.parametrize('query, match', (
+        ('genre=drama,comedy', 'any'),
+        ('genre=drama,comedy&genre_match=any', 'any'),
+        ('genre=drama,comedy&genre_match=all', 'all'),
+        ('genre=comedy,thriller,sci-fi&genre_match=all', 'all'),
+    ))
+    def test_semantics(self, catalog, query, match):
+        response = APIClient().get(f'{TITLES_URL}?{query}')
+
+        slugs = query.split('&')[0].split('=')[1].split(',')
+        assert response.status_code == status.HTTP_200_OK
+        assert len(ids(response)) == len(set(ids(response)))
+        assert set(ids(response)) == titles_with(*slugs, match=match)
+
+    def test_single_genre_unchanged(self, catalog):
+        response = APIClient().get(f'{TITLES_URL}?genre=drama,')
+
+        assert set(ids(response)) == titles_with('drama', match='any')
+
+    @pytest.mark.parametrize('query', (
+        'genre=drama,comedy', 'genre=drama,comedy&genre_match=all',
+    ))
+    def test_ratings_unchanged(self, catalog, query):
+        unfiltered = {
+            title['id']: title['rating']
+            for title in APIClient().get(TITLES_URL).data
+        }
+
+        response = APIClient().get(f'{TITLES_URL}?{query}')
+
+        assert catalog.id in ids(response)
+        assert {
+            title['id']: title['rating'] for title in response.data
+        } == {pk: unfiltered[pk] for pk in ids(response)}
+        assert unfiltered[catalog.id] == 7
+
+    def test_invalid_match(self, catalog):
+        response = APIClient().get(f'{TITLES_URL}?genre=drama&genre_match=x')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
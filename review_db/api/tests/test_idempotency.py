@@ -0,0 +1,130 @@
+import hashlib
+
+import pytest
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import mixins
+from api.tests import constants
+from api.tests.factories import CustomUserFactory
+from api.views import ReviewViewSet
+from reviews.models import Comment, Review
+
+REVIEWS_URL = f'/api/v1/titles/{constants.TEST_TITLE_ID}/reviews/'
+COMMENTS_URL = f'{REVIEWS_URL}{constants.TEST_REVIEW_ID}/comments/'
+REVIEW = {'text': 'Отличный фильм', 'score': 9}
+
+
+def post(client, url, data, key):
+    return client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+
+@pytest.fixture
+def other_client():
+    user = CustomUserFactory.create(id=constants.TEST_USER_ID + 1)
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key
+    )
+    return client
+
+
+@pytest.mark.django_db
+class TestIdempotentReviews:
+    def test_retry_replays_response(self, create_user, create_title,
+                                    user_client):
+        first = post(user_client, REVIEWS_URL, REVIEW, 'k1')
+
+        retry = post(user_client, REVIEWS_URL, REVIEW, 'k1')
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert retry.status_code == status.HTTP_201_CREATED
+        assert retry.data == first.data
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert not first.has_header('Idempotent-Replayed')
+        assert Review.objects.count() == 1
+
+    def test_without_key_validates_again(self, create_user, create_title,
+                                         user_client):
+        user_client.post(REVIEWS_URL, REVIEW, format='json')
+
+        retry = user_client.post(REVIEWS_URL, REVIEW, format='json')
+
+        assert retry.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_errors_are_replayed(self, create_user, create_title,
+                                 user_client):
+        invalid = {**REVIEW, 'score': 11}
+        first = post(user_client, REVIEWS_URL, invalid, 'k1')
+
+        retry = post(user_client, REVIEWS_URL, invalid, 'k1')
+
+        assert first.status_code == status.HTTP_400_BAD_REQUEST
+        assert retry.status_code == status.HTTP_400_BAD_REQUEST
+        assert retry.data == first.data
+        assert retry['Idempotent-Replayed'] == 'true'
+
+    def test_key_reused_for_other_body(self, create_user, create_title,
+                                       user_client):
+        post(user_client, REVIEWS_URL, REVIEW, 'k1')
+
+        response = post(user_client, REVIEWS_URL, {**REVIEW, 'score': 3}, 'k1')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Review.objects.get().score == REVIEW['score']
+
+    def test_keys_are_per_user(self, create_user, create_title, user_client,
+                               other_client):
+        post(user_client, REVIEWS_URL, REVIEW, 'k1')
+
+        response = post(other_client, REVIEWS_URL, REVIEW, 'k1')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert not response.has_header('Idempotent-Replayed')
+        assert Review.objects.count() == 2
+
+    def test_in_flight_duplicate(self, create_user, create_title,
+                                 user_client, monkeypatch):
+        monkeypatch.setattr(mixins, 'LOCK_TIMEOUT', 0.1)
+        key = hashlib.sha256(b'k1').hexdigest()
+        cache.add(
+            f'lock:idempotency:{constants.TEST_USER_ID}:{key}', 1, 10
+        )
+
+        response = post(user_client, REVIEWS_URL, REVIEW, 'k1')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Review.objects.exists()
+
+    def test_keeps_lock_of_other_request(self, create_user, create_title,
+                                         user_client, monkeypatch):
+        key = hashlib.sha256(b'k1').hexdigest()
+        lock = f'lock:idempotency:{constants.TEST_USER_ID}:{key}'
+        perform_create = ReviewViewSet.perform_create
+
+        def lock_expired(view, serializer):
+            # Блокировка истекла, и её взял повтор того же запроса.
+            cache.set(lock, 'other')
+            perform_create(view, serializer)
+
+        monkeypatch.setattr(ReviewViewSet, 'perform_create', lock_expired)
+        response = post(user_client, REVIEWS_URL, REVIEW, 'k1')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert cache.get(lock) == 'other'
+
+
+@pytest.mark.django_db
+class TestIdempotentComments:
+    def test_retry_creates_one_comment(self, create_user, create_title,
+                                       create_review, user_client):
+        first = post(user_client, COMMENTS_URL, {'text': 'Согласен'}, 'c1')
+
+        retry = post(user_client, COMMENTS_URL, {'text': 'Согласен'}, 'c1')
+        other = post(user_client, COMMENTS_URL, {'text': 'Согласен'}, 'c2')
+
+        assert retry.data == first.data
+        assert other.data['id'] != first.data['id']
+        assert Comment.objects.filter(text='Согласен').count() == 2
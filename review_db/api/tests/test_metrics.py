@@ -0,0 +1,26 @@
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+class TestRequestTiming:
+    def test_server_timing_header(self, fill_db_categories):
+        response = APIClient().get('/api/v1/categories/')
+
+        header = response['Server-Timing']
+        assert response.status_code == status.HTTP_200_OK
+        assert 'queries"' in header
+        for metric in ('db;dur=', 'view;dur=', 'serialize;dur=', 'total;dur='):
+            assert metric in header
+
+    def test_metrics_labelled_by_viewset_action(self, fill_db_categories):
+        APIClient().get('/api/v1/categories/')
+
+        response = APIClient().get('/metrics/')
+
+        body = response.content.decode()
+        assert response.status_code == status.HTTP_200_OK
+        assert 'api_request_duration_seconds_bucket' in body
+        assert 'view="CategoriesViewSet.list"' in body
+        assert 'api_db_queries_count' in body
@@ -0,0 +1,282 @@
+import csv
+import gzip
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from rest_framework.test import APIClient
+
+from api import checks, deletion, partitions
+from api.tests import constants
+from reviews.models import Comment, Review, Title
+from users.models import CustomUser
+
+OLD_DATE = datetime(2019, 9, 24, tzinfo=timezone.utc)
+
+
+def prepare():
+    # Загрузка фикстур ставит pub_date = now: часть отзывов переносится
+    # в прошлое, чтобы было что архивировать.
+    Review.objects.filter(pk__lte=500).update(pub_date=OLD_DATE)
+    with connection.cursor() as cursor:
+        # Отложенные проверки внешних ключей мешают менять таблицы в
+        # транзакции теста.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+@pytest.fixture
+def partitioned(settings, fill_db_categories, fill_db_genres, fill_db_titles,
+                fill_db_users, fill_db_reviews, fill_db_comments,
+                create_user, create_title, create_review):
+    settings.RESPONSE_CACHE_SECONDS = 0
+    prepare()
+    call_command('partition_tables', '--batch-size', '7', '--drop-old')
+
+
+def months(table):
+    return sorted(partitions.monthly_partitions(table))
+
+
+def comment_old_review(before):
+    """Новый комментарий к отзыву из архивируемой секции."""
+    review = Review.objects.filter(pub_date__lt=before).first()
+    Comment.objects.create(
+        id=10_000, review=review, text='Поздний комментарий',
+        author_id=constants.TEST_USER_ID
+    )
+    return review
+
+
+@pytest.mark.django_db
+class TestPartitions:
+    def test_convert_keeps_rows(self, fill_db_categories, fill_db_genres,
+                                fill_db_titles, fill_db_users,
+                                fill_db_reviews, fill_db_comments,
+                                create_user, create_title, create_review):
+        prepare()
+        assert not checks.partitioned_tables(None, databases=['default'])
+        reviews = sorted(Review.objects.values_list('pk', 'pub_date'))
+        comments = sorted(Comment.objects.values_list('pk', 'review_id'))
+
+        call_command('partition_tables', '--batch-size', '7')
+
+        assert partitions.is_partitioned('reviews_review')
+        assert partitions.is_partitioned('reviews_comment')
+        assert sorted(Review.objects.values_list('pk', 'pub_date')) == reviews
+        assert sorted(
+            Comment.objects.values_list('pk', 'review_id')
+        ) == comments
+        assert months('reviews_review')[0] == OLD_DATE.replace(day=1)
+        assert months('reviews_review')[-1] == partitions.add_months(
+            partitions.month_start(datetime.now(timezone.utc)), 3
+        )
+        # Прежняя таблица не мешает удалять произведения и пользователей.
+        deletion.purge_title(constants.TEST_TITLE_ID, 100)
+        deletion.purge_user(constants.TEST_USER_ID, 100)
+        assert not Title.all_objects.filter(
+            pk=constants.TEST_TITLE_ID
+        ).exists()
+        assert not CustomUser.objects.filter(
+            pk=constants.TEST_USER_ID
+        ).exists()
+
+    def test_convert_catches_up_changes(
+        self, fill_db_categories, fill_db_titles, fill_db_users,
+        fill_db_reviews, create_user, create_title, create_review
+    ):
+        prepare()
+        first, second = Review.objects.exclude(
+            pk=constants.TEST_REVIEW_ID
+        ).values_list('pk', flat=True)[:2]
+        expected = []
+
+        def rows():
+            return sorted(Review.objects.values_list(
+                'pk', 'text', 'score', 'pub_date', 'updated_at'
+            ))
+
+        def write_during_copy(message):
+            if message.endswith('индексы построены'):
+                # update() не меняет updated_at.
+                Review.objects.filter(pk=first).update(text='Исправлен')
+                Review.objects.filter(pk=second).delete()
+                expected.extend(rows())
+
+        partitions.convert(Review, batch_size=7, log=write_during_copy)
+
+        assert partitions.is_partitioned('reviews_review')
+        assert rows() == expected
+        assert Review.objects.get(pk=first).text == 'Исправлен'
+        assert not Review.objects.filter(pk=second).exists()
+
+    def test_keys_after_convert(self, partitioned):
+        review = Review.objects.filter(comments__isnull=False).first()
+        moved = partitions.next_month(OLD_DATE)
+
+        Review.objects.filter(pk=review.pk).update(pub_date=moved)
+
+        assert set(Comment.objects.filter(review=review).values_list(
+            'review_pub_date', flat=True
+        )) == {moved}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE contype = 'p' "
+                "AND conrelid = 'reviews_review'::regclass"
+            )
+            assert cursor.fetchone()[0] == 'review_id_pub_date_key'
+            with pytest.raises(IntegrityError), transaction.atomic():
+                cursor.execute(
+                    'DELETE FROM reviews_review WHERE id = %s', [review.pk]
+                )
+        assert [
+            warning.obj for warning in checks.partitioned_tables(
+                None, databases=['default']
+            )
+        ] == [Review, Comment]
+
+    def test_writes_after_convert(self, partitioned, user_client):
+        response = user_client.post(
+            '/api/v1/titles/2/reviews/',
+            {'text': 'Новый отзыв', 'score': 7}, format='json'
+        )
+        review = Review.objects.get(pk=response.data['id'])
+
+        assert review.pk > max(
+            Review.objects.exclude(pk=review.pk).values_list('pk', flat=True)
+        )
+        review.score = 8
+        review.save()
+        assert Review.objects.get(pk=review.pk).score == 8
+        assert APIClient().get(
+            '/api/v1/reviews/recent/'
+        ).data['results'][0]['id'] == review.pk
+
+    def test_review_stays_unique(self, partitioned):
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Review.objects.create(
+                title_id=constants.TEST_TITLE_ID,
+                author_id=constants.TEST_USER_ID, score=1, text='Повтор'
+            )
+
+        other = Review.objects.exclude(
+            title_id=constants.TEST_TITLE_ID
+        ).exclude(author_id=constants.TEST_USER_ID).first()
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Review.objects.filter(pk=other.pk).update(
+                title_id=constants.TEST_TITLE_ID,
+                author_id=constants.TEST_USER_ID
+            )
+
+    def test_recent_reads_recent_partitions(self, partitioned):
+        month = partitions.month_start(datetime.now(timezone.utc))
+
+        plan = Review.objects.filter(
+            pub_date__gte=month
+        ).order_by('-pub_date', '-id').explain()
+
+        assert f'reviews_review_p{month:%Y%m}' in plan
+        for old in months('reviews_review')[:-4]:
+            assert f'reviews_review_p{old:%Y%m}' not in plan
+
+    def test_extend_moves_future_rows(self, partitioned):
+        last = months('reviews_review')[-1]
+        future = partitions.next_month(last) + timedelta(days=3)
+        Review.objects.filter(pk=constants.TEST_REVIEW_ID).update(
+            pub_date=future
+        )
+
+        created = partitions.extend(Review, months_ahead=5)
+
+        assert created == [
+            f'reviews_review_p{partitions.next_month(last):%Y%m}',
+            f'reviews_review_p{partitions.add_months(last, 2):%Y%m}',
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tableoid::regclass::text FROM reviews_review '
+                'WHERE id = %s', [constants.TEST_REVIEW_ID]
+            )
+            assert cursor.fetchone()[0] == created[0]
+        assert partitions.extend(Review, months_ahead=5) == []
+
+    def test_extend_without_monthly_partitions(self, partitioned):
+        current = partitions.month_start(datetime.now(timezone.utc))
+        Comment.objects.all().delete()
+        for name in partitions.monthly_partitions('reviews_comment').values():
+            partitions.execute(f'DROP TABLE {name}')
+
+        created = partitions.extend(Comment, months_ahead=1)
+
+        assert created == [
+            f'reviews_comment_p{current:%Y%m}',
+            f'reviews_comment_p{partitions.next_month(current):%Y%m}',
+        ]
+        Comment.objects.create(
+            review_id=constants.TEST_REVIEW_ID, text='После архива',
+            author_id=constants.TEST_USER_ID
+        )
+
+    def test_archive_export(self, partitioned, tmp_path):
+        first = months('reviews_review')[0]
+        before = partitions.next_month(first)
+        name = f'reviews_review_p{first:%Y%m}'
+        comment_old_review(before)
+        archived = Review.objects.filter(pub_date__lt=before).count()
+        comments = Comment.objects.filter(
+            review__pub_date__lt=before
+        ).count()
+
+        call_command(
+            'archive_partitions', '--before', f'{before:%Y-%m}',
+            '--export', str(tmp_path)
+        )
+
+        with gzip.open(tmp_path / f'{name}.csv.gz', 'rt') as file:
+            header, *rows = csv.reader(file)
+        with gzip.open(
+            tmp_path / f'{name}_reviews_comment.csv.gz', 'rt'
+        ) as file:
+            _, *comment_rows = csv.reader(file)
+        assert archived
+        assert len(rows) == archived
+        assert 'pub_date' in header
+        assert len(comment_rows) == comments
+        assert not Review.objects.filter(pub_date__lt=before).exists()
+        assert not Comment.objects.filter(pk=10_000).exists()
+        assert months('reviews_review')[0] == before
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            assert cursor.fetchone()[0] is None
+
+    def test_archive_detach(self, partitioned, monkeypatch):
+        first = months('reviews_review')[0]
+        before = partitions.next_month(first)
+        name = f'reviews_review_p{first:%Y%m}'
+        review = comment_old_review(before)
+        archived = Review.objects.filter(pub_date__lt=before).count()
+        title_url = f'/api/v1/titles/{review.title_id}/'
+        etag = APIClient().get(title_url)['ETag']
+        purged = []
+        monkeypatch.setattr(deletion, 'purge', lambda *keys: purged.extend(
+            keys
+        ))
+
+        call_command('archive_partitions', '--before', f'{before:%Y-%m}')
+
+        assert APIClient().get(title_url)['ETag'] != etag
+        assert f'title-{review.title_id}' in purged
+
+        assert not Review.objects.filter(pub_date__lt=before).exists()
+        assert not Comment.objects.filter(pk=10_000).exists()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {name}')
+            assert cursor.fetchone()[0] == archived
+            cursor.execute(
+                f'SELECT count(*) FROM {name}_reviews_comment WHERE id = %s',
+                [10_000]
+            )
+            assert cursor.fetchone()[0] == 1
+        # Отсоединённая секция не ссылается на произведения.
+        deletion.purge_title(review.title_id, 100)
+        assert not Title.all_objects.filter(pk=review.title_id).exists()
@@ -0,0 +1,64 @@
+import pytest
+from rest_framework import status
+
+from api.tests import constants
+from users.models import CustomUser
+
+ME_URL = '/api/v1/users/me/'
+
+
+@pytest.mark.django_db
+class TestProfileCache:
+    def test_cached_profile_needs_only_authentication(
+        self, create_user, user_client, django_assert_num_queries
+    ):
+        first = user_client.get(ME_URL)
+
+        # Только поиск токена вместе с пользователем.
+        with django_assert_num_queries(1):
+            second = user_client.get(ME_URL)
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.data == first.data
+        assert second.data['id'] == constants.TEST_USER_ID
+
+    @pytest.mark.parametrize('url, data, field', (
+        ('/api/v1/users/set_email/', {'new_email': 'new@mail.ru'}, 'email'),
+        ('/api/v1/users/set_username/', {'new_username': 'new_name'},
+         'username'),
+    ))
+    def test_profile_change_invalidates(
+        self, create_user, user_client, django_capture_on_commit_callbacks,
+        url, data, field
+    ):
+        user_client.get(ME_URL)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = user_client.post(url, data=data, format='json')
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert user_client.get(ME_URL).data[field] == next(iter(data.values()))
+
+    def test_admin_edit_invalidates(
+        self, create_user, user_client, django_capture_on_commit_callbacks
+    ):
+        user_client.get(ME_URL)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user = CustomUser.objects.get(pk=constants.TEST_USER_ID)
+            user.photo = 'users/images/avatar.jpg'
+            user.save()
+
+        assert user_client.get(ME_URL).data['photo'].endswith(
+            '/users/images/avatar.jpg'
+        )
+
+    def test_last_login_keeps_profile(
+        self, create_user, django_capture_on_commit_callbacks
+    ):
+        user = CustomUser.objects.get(pk=constants.TEST_USER_ID)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            user.save(update_fields=['last_login'])
+
+        assert callbacks == []
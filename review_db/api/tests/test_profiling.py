@@ -0,0 +1,62 @@
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.tests import constants
+from users.models import CustomUser
+
+
+@pytest.fixture
+def staff_client(create_user, user_client, settings, tmp_path):
+    settings.PROFILES_DIR = tmp_path
+    CustomUser.objects.filter(id=constants.TEST_USER_ID).update(is_staff=True)
+    return user_client
+
+
+@pytest.mark.django_db
+class TestProfiling:
+    def test_collapsed_profile_with_sql(self, fill_db_categories, staff_client):
+        response = staff_client.get('/api/v1/categories/?_profile=1')
+
+        report = response.json()
+        assert response.status_code == status.HTTP_200_OK
+        assert report['status'] == status.HTTP_200_OK
+        assert 'collapsed' in report
+        assert any(
+            'reviews_category' in query['sql'] for query in report['sql']
+        )
+
+    def test_speedscope_profile_by_header(
+        self, fill_db_categories, staff_client
+    ):
+        response = staff_client.get(
+            '/api/v1/categories/', HTTP_X_PROFILE='speedscope'
+        )
+
+        profile = response.json()['speedscope']
+        assert profile['profiles'][0]['type'] == 'sampled'
+        assert len(profile['profiles'][0]['samples']) == len(
+            profile['profiles'][0]['weights']
+        )
+
+    def test_stored_profile_download(self, fill_db_categories, staff_client):
+        response = staff_client.get(
+            '/api/v1/categories/?_profile=1&_profile_store=1'
+        )
+        download = response.json()['download']
+
+        stored = staff_client.get(download)
+
+        assert stored.status_code == status.HTTP_200_OK
+        assert b'collapsed' in b''.join(stored.streaming_content)
+        assert APIClient().get(download).status_code in (
+            status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN
+        )
+
+    def test_ignored_for_regular_users(
+        self, fill_db_categories, create_user, user_client
+    ):
+        response = user_client.get('/api/v1/categories/?_profile=1')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert isinstance(response.data, list)
@@ -0,0 +1,82 @@
+import pytest
+from django.db.models import Avg, Count
+from rest_framework import status
+from rest_framework.mixins import ListModelMixin
+from rest_framework.test import APIClient
+
+from api.queries import NPlusOneError, normalize_sql
+from api.views import TitlesViewSet
+from reviews.models import Comment, Review, Title
+
+
+def test_normalize_sql_merges_same_shape():
+    first = normalize_sql(
+        'SELECT * FROM "users_customuser" WHERE "id" = 5 AND "name" = \'a\''
+    )
+    second = normalize_sql(
+        'SELECT *  FROM "users_customuser" WHERE "id" = 77 AND "name" = \'b\''
+    )
+
+    assert first == second
+    assert normalize_sql('WHERE "id" IN (%s, %s, %s)') == 'WHERE "id" IN (...)'
+
+
+@pytest.mark.django_db
+class TestNPlusOne:
+    def test_titles_list(
+        self,
+        fill_db_categories,
+        fill_db_genres,
+        fill_db_titles,
+        add_genres_to_titles,
+        fill_db_users,
+        fill_db_reviews,
+        fail_on_n_plus_one
+    ):
+        response = APIClient().get('/api/v1/titles/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) >= 5
+
+    def test_reviews_and_comments_lists(
+        self,
+        fill_db_categories,
+        fill_db_titles,
+        fill_db_users,
+        fill_db_reviews,
+        fill_db_comments,
+        fail_on_n_plus_one
+    ):
+        title_id = Review.objects.values('title_id').annotate(
+            count=Count('id')
+        ).order_by('-count').first()['title_id']
+        review = Comment.objects.first().review
+
+        reviews = APIClient().get(f'/api/v1/titles/{title_id}/reviews/')
+        comments = APIClient().get(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/comments/'
+        )
+
+        assert reviews.status_code == status.HTTP_200_OK
+        assert comments.status_code == status.HTTP_200_OK
+
+    def test_detects_n_plus_one(
+        self,
+        monkeypatch,
+        fill_db_categories,
+        fill_db_genres,
+        fill_db_titles,
+        add_genres_to_titles,
+        fail_on_n_plus_one
+    ):
+        monkeypatch.setattr(
+            TitlesViewSet,
+            'queryset',
+            Title.objects.annotate(rating=Avg('reviews__score'))
+        )
+        # Быстрый путь списка не создаёт моделей, N+1 возможен
+        # только через сериализатор.
+        monkeypatch.setattr(TitlesViewSet, 'list', ListModelMixin.list)
+
+        with pytest.raises(NPlusOneError):
+            APIClient().get('/api/v1/titles/')
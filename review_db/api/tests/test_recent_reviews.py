@@ -0,0 +1,83 @@
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.views import RecentReviewsViewSet
+from reviews.models import Review
+
+RECENT_URL = '/api/v1/reviews/recent/'
+
+
+@pytest.fixture
+def reviews(
+    monkeypatch,
+    fill_db_categories,
+    fill_db_genres,
+    fill_db_titles,
+    add_genres_to_titles,
+    fill_db_users,
+    fill_db_reviews
+):
+    # Обход ленты мелкими страницами упирается в ограничение частоты.
+    monkeypatch.setattr(RecentReviewsViewSet, 'throttle_classes', ())
+    return Review.objects.order_by('-pub_date', '-id')
+
+
+def walk(url):
+    """Все отзывы ленты, страница за страницей."""
+    client = APIClient()
+    results = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        results += response.data['results']
+        url = response.data['next']
+    return results
+
+
+@pytest.mark.django_db
+class TestRecentReviews:
+    def test_newest_first_with_title_and_author(self, reviews):
+        response = APIClient().get(RECENT_URL)
+
+        newest = reviews.select_related('title', 'author').first()
+        first = response.data['results'][0]
+        assert response.status_code == status.HTTP_200_OK
+        assert first['id'] == newest.id
+        assert first['title'] == newest.title_id
+        assert first['title_name'] == newest.title.name
+        assert first['author'] == newest.author.username
+
+    def test_pages_cover_feed_once(self, reviews):
+        results = walk(f'{RECENT_URL}?limit=3')
+
+        assert [review['id'] for review in results] == list(
+            reviews.values_list('id', flat=True)
+        )
+
+    @pytest.mark.parametrize('query, lookup', (
+        ('genre=drama', {'title__genre__slug': 'drama'}),
+        ('category=movie', {'title__category__slug': 'movie'}),
+    ))
+    def test_filters(self, reviews, query, lookup):
+        results = walk(f'{RECENT_URL}?{query}&limit=2')
+
+        expected = list(
+            reviews.filter(**lookup).distinct().values_list('id', flat=True)
+        )
+        assert expected
+        assert [review['id'] for review in results] == expected
+
+    def test_page_queries(self, reviews, django_assert_num_queries):
+        # Одна страница - один запрос с соединениями.
+        with django_assert_num_queries(1):
+            APIClient().get(RECENT_URL)
+
+    def test_read_only(self, reviews):
+        response = APIClient().post(RECENT_URL, {'text': 'x', 'score': 5})
+
+        assert response.status_code in (
+            status.HTTP_401_UNAUTHORIZED,
+            status.HTTP_403_FORBIDDEN,
+            status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
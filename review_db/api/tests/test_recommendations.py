@@ -0,0 +1,204 @@
+import os
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from scipy import sparse
+
+from api import recommendations, similarity
+from api.tests import constants
+from reviews.models import Review, Title
+
+RECOMMENDATIONS_URL = '/api/v1/users/me/recommendations/'
+
+
+def low_rank_scores(seed=3, users=200, titles=40, rank=3, density=0.4):
+    rnd = np.random.default_rng(seed)
+    taste = rnd.normal(size=(users, rank)) @ rnd.normal(size=(rank, titles))
+    reviewed = rnd.random((users, titles)) < density
+    user, title = np.nonzero(reviewed)
+    scores = np.zeros(len(user), dtype=similarity.SCORE_ROW)
+    scores['user'] = user + 1
+    scores['title'] = title + 1
+    scores['score'] = np.clip(np.round(5.5 + taste[user, title]), 1, 10)
+    return scores, np.arange(1, titles + 1)
+
+
+def rmse(model, scores):
+    users = np.searchsorted(model.user_ids, scores['user'])
+    titles = np.searchsorted(model.title_ids, scores['title'])
+    predicted = np.einsum(
+        'ij,ij->i', model.user_factors[users], model.title_factors[titles]
+    ) + model.mean
+    return np.sqrt(np.mean((predicted - scores['score']) ** 2))
+
+
+class TestFactorModel:
+    def test_training_beats_mean(self):
+        scores, title_ids = low_rank_scores()
+
+        model = recommendations.train(scores, title_ids, factors=8)
+
+        baseline = np.sqrt(np.mean((scores['score'] - model.mean) ** 2))
+        assert rmse(model, scores) < baseline * 0.5
+
+    def test_fold_in_solves_user_step(self):
+        scores, title_ids = low_rank_scores()
+        model = recommendations.train(scores, title_ids, factors=8)
+        user = scores[scores['user'] == 7]
+
+        folded = model.fold_in(user['title'], user['score'])
+
+        ratings = np.zeros((1, len(title_ids)), dtype=np.float32)
+        ratings[0, user['title'] - 1] = user['score'] - model.mean
+        exact = recommendations.solve(
+            sparse.csr_matrix(ratings), model.title_factors,
+            np.zeros((1, 8), dtype=np.float32), model.regularization,
+            steps=16
+        )[0]
+        np.testing.assert_allclose(folded, exact, rtol=1e-3, atol=1e-4)
+
+    def test_recommend_skips_reviewed(self):
+        scores, title_ids = low_rank_scores()
+        model = recommendations.train(scores, title_ids, factors=8)
+        reviewed = scores['title'][scores['user'] == 7].tolist()
+
+        result = model.recommend(model.user_vector(7), reviewed, 5)
+
+        predicted = [score for _, score in result]
+        assert len(result) == 5
+        assert not set(reviewed) & {title for title, _ in result}
+        assert predicted == sorted(predicted, reverse=True)
+
+    def test_saved_model_is_memory_mapped(self, tmp_path):
+        scores, title_ids = low_rank_scores()
+        model = recommendations.train(scores, title_ids, factors=4)
+
+        recommendations.save(model, tmp_path / 'model')
+        recommendations.save(model, tmp_path / 'model')
+        loaded = recommendations.load(tmp_path / 'model')
+
+        assert isinstance(loaded.title_factors, np.memmap)
+        np.testing.assert_array_equal(
+            loaded.user_factors, model.user_factors
+        )
+        assert loaded.mean == model.mean
+
+    def test_save_keeps_mounted_directory(self, tmp_path, settings):
+        scores, title_ids = low_rank_scores()
+        model = recommendations.train(scores, title_ids, factors=4)
+        settings.RECOMMENDATIONS_DIR = tmp_path / 'volume'
+        settings.RECOMMENDATIONS_DIR.mkdir()
+        inode = settings.RECOMMENDATIONS_DIR.stat().st_ino
+
+        recommendations.save(model)
+        first = recommendations.current_model()
+        model.mean += 1
+        recommendations.save(model)
+        second = recommendations.current_model()
+
+        assert settings.RECOMMENDATIONS_DIR.stat().st_ino == inode
+        assert second.mean == first.mean + 1
+        version = os.readlink(settings.RECOMMENDATIONS_DIR / 'current')
+        assert sorted(
+            path.name for path in settings.RECOMMENDATIONS_DIR.iterdir()
+        ) == ['current', version]
+
+
+@pytest.mark.django_db
+class TestRecommendationsEndpoint:
+    @pytest.fixture
+    def dataset(
+        self,
+        settings,
+        tmp_path,
+        fill_db_categories,
+        fill_db_titles,
+        fill_db_users,
+        fill_db_reviews,
+        create_user,
+        create_title,
+        create_review
+    ):
+        settings.RECOMMENDATIONS_DIR = tmp_path / 'model'
+
+    def test_popular_without_model(self, dataset, user_client):
+        response = user_client.get(RECOMMENDATIONS_URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data
+        assert constants.TEST_TITLE_ID not in [
+            title['id'] for title in response.data
+        ]
+
+    def test_model_recommendations(
+        self, dataset, user_client, django_assert_num_queries
+    ):
+        call_command('train_recommendations', '--factors', '4')
+
+        # Токен, отзывы пользователя и названия произведений.
+        with django_assert_num_queries(3):
+            response = user_client.get(f'{RECOMMENDATIONS_URL}?limit=3')
+
+        scores = [title['score'] for title in response.data]
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 3
+        assert scores == sorted(scores, reverse=True)
+        assert constants.TEST_TITLE_ID not in [
+            title['id'] for title in response.data
+        ]
+
+    def test_new_review_is_folded_in(self, dataset, user_client):
+        call_command('train_recommendations', '--factors', '4')
+        title_id = user_client.get(RECOMMENDATIONS_URL).data[0]['id']
+        Review.objects.create(
+            id=constants.TEST_REVIEW_ID + 1,
+            title_id=title_id,
+            author_id=constants.TEST_USER_ID,
+            score=1,
+            text='Не понравилось'
+        )
+
+        response = user_client.get(RECOMMENDATIONS_URL)
+
+        assert title_id not in [title['id'] for title in response.data]
+
+    def test_edited_review_is_folded_in(
+        self, dataset, user_client, monkeypatch
+    ):
+        call_command('train_recommendations', '--factors', '4')
+        folded = []
+        fold_in = recommendations.FactorModel.fold_in
+        monkeypatch.setattr(
+            recommendations.FactorModel, 'fold_in',
+            lambda model, title_ids, scores: folded.append(scores)
+            or fold_in(model, title_ids, scores)
+        )
+        user_client.get(RECOMMENDATIONS_URL)
+        review = Review.objects.get(pk=constants.TEST_REVIEW_ID)
+        review.score = 1
+        review.save()
+
+        user_client.get(RECOMMENDATIONS_URL)
+
+        assert folded == [(1,)]
+
+    def test_hidden_titles_keep_limit(self, dataset, user_client):
+        call_command('train_recommendations', '--factors', '4')
+        best = user_client.get(f'{RECOMMENDATIONS_URL}?limit=3').data
+        Title.objects.filter(pk__in=[
+            title['id'] for title in best[:2]
+        ]).update(deleted_at=timezone.now())
+
+        response = user_client.get(f'{RECOMMENDATIONS_URL}?limit=3')
+
+        ids = [title['id'] for title in response.data]
+        assert len(ids) == 3
+        assert not {title['id'] for title in best[:2]} & set(ids)
+
+    def test_requires_authentication(self, dataset, client):
+        response = client.get(RECOMMENDATIONS_URL)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,93 @@
+import io
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import msgpack
+import pytest
+from django.utils.timezone import localtime
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.parsers import MessagePackParser, ORJSONParser
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.tests import constants
+
+
+@pytest.mark.parametrize('data', (
+    {'pub_date': datetime(2023, 5, 1, 12, 30, 15, 123456, timezone.utc)},
+    {'date': date(2023, 5, 1), 'naive': datetime(2023, 5, 1, 12, 30)},
+    {'rating': Decimal('7.25'), 'id': uuid.UUID(int=42)},
+    {'detail': gettext_lazy('Not found.'), 'ids': {1, 2}},
+    {'text': 'ёлка\u2028строка\u2029"кавычки"', 1: None},
+    [{'score': 1.5, 'nested': [True, None, 2 ** 70]}],
+    None,
+))
+def test_renderer_matches_drf(data):
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_renderer_indent_falls_back():
+    data = {'name': 'произведение'}
+    media_type = 'application/json; indent=4'
+
+    assert ORJSONRenderer().render(data, media_type) == (
+        JSONRenderer().render(data, media_type)
+    )
+
+
+def test_parser_matches_drf():
+    body = '{"text": "ёлка", "score": 5, "items": [1.5, null]}'.encode()
+
+    assert ORJSONParser().parse(io.BytesIO(body)) == (
+        JSONParser().parse(io.BytesIO(body))
+    )
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b'{"score": NaN}'))
+
+
+@pytest.mark.django_db
+def test_api_response_is_unchanged(
+    create_user, create_title, create_review
+):
+    response = APIClient().get(
+        f'/api/v1/titles/{constants.TEST_TITLE_ID}/reviews/'
+    )
+
+    assert response.content == JSONRenderer().render(response.data)
+    create_review.refresh_from_db()
+    assert response.json()[0]['pub_date'] == (
+        localtime(create_review.pub_date).strftime('%d.%m.%Y %H:%M')
+    )
+
+
+def test_msgpack_parser_round_trip():
+    data = {'text': 'ёлка', 'score': 5, 'items': [1.5, None]}
+    body = MessagePackRenderer().render(data)
+
+    assert MessagePackParser().parse(io.BytesIO(body)) == data
+    with pytest.raises(ParseError):
+        MessagePackParser().parse(io.BytesIO(b'\xc1'))
+
+
+@pytest.mark.django_db
+def test_msgpack_matches_json(
+    user_client, create_user, create_title, create_review
+):
+    url = f'/api/v1/titles/{constants.TEST_TITLE_ID}/reviews/'
+    response = APIClient().get(url, HTTP_ACCEPT='application/msgpack')
+    created = user_client.post(
+        f'/api/v1/titles/{constants.TEST_TITLE_ID}/reviews/'
+        f'{constants.TEST_REVIEW_ID}/comments/',
+        data=MessagePackRenderer().render({'text': 'комментарий'}),
+        content_type='application/msgpack',
+        HTTP_ACCEPT='application/msgpack'
+    )
+
+    assert response['Content-Type'] == 'application/msgpack'
+    assert msgpack.unpackb(response.content) == APIClient().get(url).json()
+    assert created.status_code == 201
+    assert msgpack.unpackb(created.content)['text'] == 'комментарий'
@@ -0,0 +1,67 @@
+import pytest
+from rest_framework import mixins
+from rest_framework.test import APIClient
+
+from api.mixins import FastListMixin
+from reviews.models import Comment, Review, Title
+
+
+@pytest.fixture
+def dataset(
+    settings,
+    fill_db_categories,
+    fill_db_genres,
+    fill_db_titles,
+    add_genres_to_titles,
+    fill_db_users,
+    fill_db_reviews,
+    fill_db_comments
+):
+    settings.RESPONSE_CACHE_SECONDS = 0
+    Title.objects.create(
+        id=10_000,
+        name='Без категории',
+        year=2001,
+        photo='titles/images/обложка 1.jpg',
+    )
+    review = Comment.objects.values('review_id').first()['review_id']
+    title = Review.objects.get(pk=review).title_id
+    return title, review
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', (
+    '/api/v1/titles/',
+    '/api/v1/titles/?genre=drama',
+    '/api/v1/titles/?category=movie&year=1994',
+    '/api/v1/titles/?name=а',
+    '/api/v1/titles/{title}/reviews/',
+    '/api/v1/titles/{title}/reviews/{review}/comments/',
+))
+@pytest.mark.parametrize('accept', ('application/json', 'application/msgpack'))
+def test_fast_list_matches_serializers(monkeypatch, dataset, url, accept):
+    title, review = dataset
+    url = url.format(title=title, review=review)
+
+    response = APIClient().get(url, HTTP_ACCEPT=accept)
+
+    assert response.status_code == 200
+    assert len(response.content) > 2
+    with monkeypatch.context() as patch:
+        patch.setattr(FastListMixin, 'list', mixins.ListModelMixin.list)
+        expected = APIClient().get(url, HTTP_ACCEPT=accept)
+    assert response.content == expected.content
+
+
+@pytest.mark.django_db
+def test_fast_list_skips_model_instances(
+    dataset, django_assert_max_num_queries
+):
+    title, review = dataset
+
+    # Произведения и их жанры.
+    with django_assert_max_num_queries(2):
+        APIClient().get('/api/v1/titles/')
+    # Дата изменения, проверка произведения и сами отзывы.
+    with django_assert_max_num_queries(3):
+        APIClient().get(f'/api/v1/titles/{title}/reviews/')
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api import similarity
+from reviews.models import SimilarTitle
+
+
+def random_scores(seed=7, users=60, titles=25, density=0.3):
+    rnd = np.random.default_rng(seed)
+    reviewed = rnd.random((users, titles)) < density
+    user, title = np.nonzero(reviewed)
+    scores = np.zeros(len(user), dtype=similarity.SCORE_ROW)
+    scores['user'] = user + 100
+    scores['title'] = title * 3 + 1
+    scores['score'] = rnd.integers(1, 11, len(user))
+    return scores, np.arange(titles) * 3 + 1
+
+
+def dense_neighbors(scores, title_ids, k, min_common):
+    """Эталон: плотные матрицы и полный перебор."""
+    users = np.unique(scores['user'])
+    matrix = np.zeros((len(users), len(title_ids)))
+    mask = np.zeros_like(matrix, dtype=bool)
+    rows = np.searchsorted(users, scores['user'])
+    columns = np.searchsorted(title_ids, scores['title'])
+    mask[rows, columns] = True
+    matrix[rows, columns] = scores['score']
+    means = matrix.sum(axis=1) / mask.sum(axis=1)
+    matrix = np.where(mask, matrix - means[:, None], 0)
+    norms = np.linalg.norm(matrix, axis=0)
+    normalized = matrix / np.where(norms > 0, norms, 1)
+    cosine = normalized.T @ normalized
+    common = mask.T.astype(int) @ mask.astype(int)
+    result = {}
+    for row in range(len(title_ids)):
+        candidates = [
+            (-cosine[row, column], column)
+            for column in range(len(title_ids))
+            if column != row and cosine[row, column] > 1e-6
+            and common[row, column] >= min_common
+        ]
+        result[int(title_ids[row])] = [
+            int(title_ids[column]) for _, column in sorted(candidates)[:k]
+        ]
+    return result
+
+
+def test_review_neighbors_match_dense_computation():
+    scores, title_ids = random_scores()
+    genres = np.zeros(0, dtype=similarity.GENRE_ROW)
+
+    rows = list(similarity.similar_titles(
+        scores, genres, title_ids, k=5, min_common=2, block_size=4
+    ))
+
+    computed = {}
+    for title, similar, rank, score, source in rows:
+        assert source == SimilarTitle.REVIEWS
+        assert rank == len(computed.setdefault(title, [])) + 1
+        computed[title].append(similar)
+    expected = dense_neighbors(scores, title_ids, k=5, min_common=2)
+    assert computed == {
+        title: similar for title, similar in expected.items() if similar
+    }
+
+
+def test_cold_titles_fall_back_to_genres():
+    scores, title_ids = random_scores()
+    title_ids = np.append(title_ids, [1000, 1001, 1002])
+    genres = np.array(
+        [(1000, 1), (1000, 2), (1001, 1), (1001, 2), (1002, 2), (1002, 3)],
+        dtype=similarity.GENRE_ROW
+    )
+
+    rows = [
+        row for row in similarity.similar_titles(
+            scores, genres, title_ids, k=5
+        )
+        if row[0] == 1000
+    ]
+
+    assert rows == [
+        (1000, 1001, 1, 1.0, SimilarTitle.GENRES),
+        (1000, 1002, 2, round(1 / 3, 6), SimilarTitle.GENRES),
+    ]
+
+
+@pytest.mark.django_db
+class TestSimilarEndpoint:
+    @pytest.fixture
+    def computed(
+        self,
+        fill_db_categories,
+        fill_db_genres,
+        fill_db_titles,
+        add_genres_to_titles,
+        fill_db_users,
+        fill_db_reviews
+    ):
+        call_command('compute_similar_titles', '--min-common', '1')
+        return SimilarTitle.objects.values_list('title_id', flat=True).first()
+
+    def test_similar_titles(self, computed, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = APIClient().get(f'/api/v1/titles/{computed}/similar/')
+
+        expected = SimilarTitle.objects.filter(
+            title_id=computed
+        ).select_related('similar').order_by('rank')
+        assert response.status_code == status.HTTP_200_OK
+        assert [title['id'] for title in response.data] == [
+            neighbor.similar_id for neighbor in expected
+        ]
+        assert response.data[0]['name'] == expected[0].similar.name
+        assert computed not in [title['id'] for title in response.data]
+
+    def test_recompute_replaces_rows(self, computed):
+        count = SimilarTitle.objects.count()
+
+        call_command('compute_similar_titles', '--min-common', '1')
+
+        assert SimilarTitle.objects.count() == count
+
+    @pytest.mark.parametrize('pk', ('987654', 'abc'))
+    def test_unknown_title(self, computed, pk):
+        response = APIClient().get(f'/api/v1/titles/{pk}/similar/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
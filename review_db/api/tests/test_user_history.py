@@ -0,0 +1,84 @@
+import pytest
+from django.db.models import Count
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.views import UserCommentsViewSet, UserReviewsViewSet
+from reviews.models import Comment, Review
+
+
+@pytest.fixture
+def history(
+    monkeypatch,
+    fill_db_categories,
+    fill_db_titles,
+    fill_db_users,
+    fill_db_reviews,
+    fill_db_comments
+):
+    # Обход истории мелкими страницами упирается в ограничение частоты.
+    for viewset in (UserReviewsViewSet, UserCommentsViewSet):
+        monkeypatch.setattr(viewset, 'throttle_classes', ())
+
+
+def most_active(model):
+    return model.objects.values('author_id').annotate(
+        count=Count('id')
+    ).order_by('-count').first()['author_id']
+
+
+def walk(url):
+    client = APIClient()
+    results = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        results += response.data['results']
+        url = response.data['next']
+    return results
+
+
+@pytest.mark.django_db
+class TestUserHistory:
+    def test_reviews(self, history):
+        author_id = most_active(Review)
+
+        results = walk(f'/api/v1/users/{author_id}/reviews/?limit=2')
+
+        reviews = Review.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-id'
+        ).select_related('title', 'author')
+        assert [review['id'] for review in results] == [
+            review.id for review in reviews
+        ]
+        assert results[0]['title_name'] == reviews[0].title.name
+        assert {review['author'] for review in results} == {
+            reviews[0].author.username
+        }
+
+    def test_comments(self, history):
+        author_id = most_active(Comment)
+
+        results = walk(f'/api/v1/users/{author_id}/comments/?limit=2')
+
+        comments = Comment.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-id'
+        ).select_related('review__title')
+        assert [comment['id'] for comment in results] == [
+            comment.id for comment in comments
+        ]
+        assert results[0]['review'] == comments[0].review_id
+        assert results[0]['title'] == comments[0].review.title_id
+        assert results[0]['title_name'] == comments[0].review.title.name
+
+    def test_page_queries(self, history, django_assert_num_queries):
+        author_id = most_active(Comment)
+
+        # Проверка пользователя и одна выборка страницы.
+        with django_assert_num_queries(2):
+            APIClient().get(f'/api/v1/users/{author_id}/comments/')
+
+    def test_unknown_user(self, history):
+        response = APIClient().get('/api/v1/users/987654/reviews/')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api import metrics, warmup
+
+
+@pytest.fixture
+def cold(monkeypatch):
+    monkeypatch.setattr(warmup, 'warmed_up', warmup.threading.Event())
+    monkeypatch.setattr(warmup, 'report', {})
+
+
+def observed_requests():
+    return sum(
+        sample.value
+        for metric in metrics.REQUEST_DURATION.collect()
+        for sample in metric.samples
+        if sample.name.endswith('_count')
+    )
+
+
+@pytest.mark.django_db
+class TestWarmUp:
+    def test_not_ready_before_warm_up(self, cold):
+        response = APIClient().get('/ready/')
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json() == {'ready': False}
+
+    def test_ready_after_warm_up(
+        self,
+        cold,
+        django_assert_num_queries,
+        fill_db_categories,
+        fill_db_genres,
+        fill_db_titles,
+        fill_db_users,
+        fill_db_reviews,
+        fill_db_comments
+    ):
+        call_command('warmup', stdout=io.StringIO())
+
+        response = APIClient().get('/ready/')
+        routes = response.json()['warm_up']['routes']['result']
+        assert response.status_code == status.HTTP_200_OK
+        assert len(routes) == 7
+        assert set(routes.values()) == {status.HTTP_200_OK}
+        # Кеши категорий и жанров уже наполнены.
+        with django_assert_num_queries(0):
+            APIClient().get('/api/v1/categories/')
+            APIClient().get('/api/v1/genres/')
+
+    def test_not_observed(self, cold, fill_db_categories, fill_db_genres):
+        before = observed_requests()
+
+        call_command('warmup', stdout=io.StringIO())
+
+        assert observed_requests() == before
+        APIClient().get('/api/v1/categories/')
+        assert observed_requests() == before + 1
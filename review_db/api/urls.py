@@ -7,14 +7,31 @@ from .views import (
     TitlesViewSet,
     CustomUserViewSet,
     ReviewViewSet,
+    RecentReviewsViewSet,
+    UserCommentsViewSet,
+    UserReviewsViewSet,
     CommentViewSet,
+    ProfileDownloadView,
 )
 
 router_v1 = DefaultRouter()
 router_v1.register('users', CustomUserViewSet)
+router_v1.register(
+    r'users/(?P<user_id>\d+)/reviews',
+    UserReviewsViewSet,
+    basename='user-reviews'
+)
+router_v1.register(
+    r'users/(?P<user_id>\d+)/comments',
+    UserCommentsViewSet,
+    basename='user-comments'
+)
 router_v1.register(r'categories', CategoriesViewSet, basename='categories')
 router_v1.register(r'genres', GenresViewSet, basename='genres')
 router_v1.register(r'titles', TitlesViewSet, basename='titles')
+router_v1.register(
+    r'reviews/recent', RecentReviewsViewSet, basename='recent-reviews'
+)
 router_v1.register(
     r'titles/(?P<title_id>\d+)/reviews',
     ReviewViewSet,
@@ -27,6 +44,11 @@ router_v1.register(
 
 urlpatterns = [
     path('v1/auth/', include('djoser.urls.authtoken')),
+    path(
+        'v1/profiles/<uuid:profile_id>/',
+        ProfileDownloadView.as_view(),
+        name='profile-download'
+    ),
     path('v1/', include(router_v1.urls)),
     path('v1/', include('djoser.urls.base')),
 ]
@@ -1,19 +1,42 @@
-from django.db.models import Avg
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, F, Q
+from django.http import FileResponse, Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from djoser import permissions
+from djoser.conf import settings as djoser_settings
 from djoser.views import UserViewSet
 from rest_framework import filters, status, viewsets, mixins
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from reviews.models import (
     Category,
     Genre,
     Title,
     Review,
+    Comment,
+    SimilarTitle,
 )
 from users.models import CustomUser
+from .mixins import (
+    CachedListMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    FacetsMixin,
+    FastListMixin,
+    IdempotentCreateMixin,
+    SurrogateKeyMixin,
+)
+from . import rows
+from .autocomplete import suggest
+from .deletion import hide_title, hide_user
+from .facets import title_facets
+from .caching import versions
 from .permissions import (
     ReadOnlyPermission,
     CreateAndUpdatePermission,
@@ -28,9 +51,20 @@ from .serializers import (
     CustomPasswordSerializer,
     SetEmailSerializer,
     CommentSerializer,
-    CustomSetUsernameSerializer
+    CustomSetUsernameSerializer,
+    RecentReviewSerializer,
+    UserCommentSerializer,
 )
-from .filters import TitlesFilter
+from .filters import RecentReviewsFilter, TitlesFilter
+from .pagination import PubDateCursorPagination
+from .recommendations import recommend
+
+
+def rating():
+    """Средняя оценка произведения без отзывов скрытых пользователей."""
+    return Avg('reviews__score', filter=Q(
+        reviews__author__deleted_at__isnull=True
+    ))
 
 
 class CustomUserViewSet(UserViewSet):
@@ -44,6 +78,9 @@ class CustomUserViewSet(UserViewSet):
             return CustomSetUsernameSerializer
         elif self.action == 'set_email':
             return SetEmailSerializer
+        elif self.action == 'destroy' or (
+                self.action == 'me' and self.request.method == 'DELETE'):
+            return djoser_settings.SERIALIZERS.user_delete
         return CustomUserSerializer
 
     def get_permissions(self):
@@ -52,7 +89,74 @@ class CustomUserViewSet(UserViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
-        return CustomUser.objects.all()
+        return CustomUser.objects.filter(deleted_at__isnull=True)
+
+    def perform_destroy(self, instance):
+        hide_user(instance)
+
+    @action(['get', 'put', 'patch', 'delete'], detail=False)
+    def me(self, request, *args, **kwargs):
+        """
+        Профиль текущего пользователя. GET отдаётся из кеша: запись
+        привязана к версии ключа user-{pk}, которую сбрасывает любое
+        сохранение пользователя (api/signals.py). Адрес сайта входит
+        в имя записи, потому что ссылка на фото абсолютная.
+        """
+        if request.method != 'GET':
+            return super().me(request, *args, **kwargs)
+        key = f'user-{request.user.pk}'
+        name = 'profile:{}:{}:{}'.format(
+            request.user.pk, *versions((key,)), request.build_absolute_uri('/')
+        )
+        data = cache.get(name)
+        if data is None:
+            data = super().me(request, *args, **kwargs).data
+            cache.set(name, data, settings.PROFILE_CACHE_SECONDS)
+        return Response(data)
+
+    @action(['get'], detail=False, url_path='me/recommendations',
+            permission_classes=[IsAuthenticated])
+    def recommendations(self, request, *args, **kwargs):
+        """
+        Произведения, которые пользователь вероятно оценит высоко, кроме
+        уже оценённых. Без модели или без оценок пользователя - лучшие
+        по среднему рейтингу.
+        """
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число.'})
+        limit = max(1, min(limit, 100))
+        reviews = list(Review.objects.filter(author=request.user).values_list(
+            'title_id', 'score', 'updated_at'
+        ))
+        predicted = recommend(request.user.pk, reviews, limit)
+        if predicted is None:
+            reviewed = [title_id for title_id, _, _ in reviews]
+            titles = Title.objects.annotate(
+                score=rating()
+            ).exclude(pk__in=reviewed).order_by(
+                F('score').desc(nulls_last=True), 'id'
+            ).values('id', 'name', 'year', 'score')[:limit]
+            return Response(list(titles))
+        # Скрытые и удалённые после обучения произведения отбрасываются;
+        # чтобы их места заняли следующие, модель спрашивается с запасом.
+        wanted = limit
+        while True:
+            scores = dict(predicted)
+            titles = list(Title.objects.filter(pk__in=scores).values(
+                'id', 'name', 'year'
+            ))
+            if len(titles) >= limit or len(predicted) < wanted:
+                break
+            wanted *= 2
+            predicted = recommend(request.user.pk, reviews, wanted)
+        titles = sorted(titles, key=lambda title: (-scores[title['id']],
+                                                   title['id']))[:limit]
+        return Response([
+            {**title, 'score': round(scores[title['id']], 2)}
+            for title in titles
+        ])
 
     @action(['post'], detail=False, url_path='set_email')
     def set_email(self, request, *args, **kwargs):
@@ -68,6 +172,8 @@ class CustomUserViewSet(UserViewSet):
 
 
 class CategoriesGenresBaseViewSet(
+    SurrogateKeyMixin,
+    CachedListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -81,6 +187,10 @@ class CategoriesGenresBaseViewSet(
     search_fields = ('name',)
     lookup_field = 'slug'
     lookup_url_kwarg = 'slug'
+    surrogate_key = None
+
+    def get_surrogate_keys(self):
+        return (self.surrogate_key,) if self.action == 'list' else ()
 
 
 class CategoriesViewSet(CategoriesGenresBaseViewSet):
@@ -92,6 +202,7 @@ class CategoriesViewSet(CategoriesGenresBaseViewSet):
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    surrogate_key = 'categories'
 
 
 class GenresViewSet(CategoriesGenresBaseViewSet):
@@ -103,33 +214,116 @@ class GenresViewSet(CategoriesGenresBaseViewSet):
     """
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    surrogate_key = 'genres'
 
 
-class TitlesViewSet(viewsets.ModelViewSet):
+class TitlesViewSet(
+    SurrogateKeyMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    FacetsMixin,
+    FastListMixin,
+    viewsets.ModelViewSet
+):
     """
     Реализует основные операции с моделью произведений:
-    - возвращает список всех произведений
+    - возвращает список всех произведений (?facets=genre,category,year
+      добавляет счётчики по жанрам, категориям и десятилетиям)
+    - подсказки по началу названия (autocomplete/?q=)
     - добавление нового произведения
     - возвращает информацию о произведении
     - обновляет информацию о произведении
     - удаляет произведение
     """
-    queryset = Title.objects.annotate(rating=Avg('reviews__score')).order_by('-rating')
+    queryset = Title.objects.annotate(
+        rating=rating()
+    ).select_related('category').prefetch_related('genre').order_by(
+        '-rating', 'id'
+    )
     serializer_class = TitleSerializer
     permission_classes = (ReadOnlyPermission,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitlesFilter
+    list_columns = rows.TITLE_COLUMNS
+    list_rows = staticmethod(rows.title_rows)
+    facets = ('genre', 'category', 'year')
+    facet_counts = staticmethod(title_facets)
+
+    def perform_destroy(self, instance):
+        hide_title(instance)
+
+    def get_last_modified(self):
+        if self.action != 'retrieve':
+            return None
+        return Title.objects.filter(pk=self.kwargs['pk']).values_list(
+            'updated_at', flat=True
+        ).first()
+
+    @action(['get'], detail=False)
+    def autocomplete(self, request):
+        """
+        Подсказки по началу названия ?q= без учёта регистра и ё/е:
+        до ?limit= самых обсуждаемых произведений из индекса в памяти.
+        """
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число.'})
+        limit = max(1, min(limit, 50))
+        return Response(suggest(request.query_params.get('q', ''), limit))
 
+    @action(['get'], detail=True)
+    def similar(self, request, pk=None):
+        """
+        Похожие произведения из таблицы SimilarTitle одним запросом по
+        индексу (title, rank). Таблицу заполняет compute_similar_titles.
+        """
+        if not pk.isdigit():
+            raise Http404
+        values = list(SimilarTitle.objects.filter(
+            title_id=pk, similar__deleted_at__isnull=True
+        ).order_by('rank').values_list(*rows.SIMILAR_COLUMNS))
+        if not values and not Title.objects.filter(pk=pk).exists():
+            raise Http404
+        return Response(rows.similar_rows(values))
 
+    def get_surrogate_keys(self):
+        if self.action == 'list':
+            return ('titles',)
+        if self.action == 'retrieve':
+            return (f'title-{self.kwargs["pk"]}',)
+        return ()
 
-class ReviewViewSet(viewsets.ModelViewSet):
+
+class ReviewViewSet(
+    IdempotentCreateMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = ReviewSerializer
     permission_classes = (ReadOnlyPermission | CreateAndUpdatePermission,)
+    list_columns = rows.REVIEW_COLUMNS
+    list_rows = staticmethod(rows.review_rows)
+    version_keys = ('usernames',)
+
+    def get_last_modified(self):
+        # Изменение отзыва обновляет и дату произведения (reviews.signals).
+        title_id = self.kwargs.get('title_id')
+        if self.action == 'list':
+            queryset = Title.objects.filter(pk=title_id)
+        else:
+            queryset = Review.objects.filter(
+                title_id=title_id, pk=self.kwargs['pk']
+            )
+        return queryset.values_list('updated_at', flat=True).first()
 
     def get_queryset(self):
         title_id = self.kwargs.get('title_id')
         title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all()
+        return title.reviews.filter(
+            author__deleted_at__isnull=True
+        ).select_related('author')
 
     def perform_create(self, serializer):
         title_id = self.kwargs.get('title_id')
@@ -137,16 +331,116 @@ class ReviewViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user, title=title)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class RecentReviewsViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Лента последних отзывов по всем произведениям, от новых к старым,
+    с фильтрами по жанру и категории произведения.
+    """
+    queryset = Review.objects.select_related('title', 'author').filter(
+        title__deleted_at__isnull=True,
+        author__deleted_at__isnull=True
+    ).only(
+        'id', 'score', 'pub_date', 'text', 'title__name', 'author__username'
+    )
+    serializer_class = RecentReviewSerializer
+    permission_classes = (ReadOnlyPermission,)
+    pagination_class = PubDateCursorPagination
+    filterset_class = RecentReviewsFilter
+
+
+class UserHistoryViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Базовый класс истории пользователя: его записи от новых к старым.
+    """
+    permission_classes = (ReadOnlyPermission,)
+    pagination_class = PubDateCursorPagination
+
+    def get_queryset(self):
+        user = get_object_or_404(
+            CustomUser, pk=self.kwargs.get('user_id'), deleted_at__isnull=True
+        )
+        return self.queryset.filter(author=user)
+
+
+class UserReviewsViewSet(UserHistoryViewSet):
+    """
+    Отзывы пользователя с названиями произведений.
+    """
+    queryset = Review.objects.select_related('title', 'author').filter(
+        title__deleted_at__isnull=True
+    ).only(
+        'id', 'score', 'pub_date', 'text', 'title__name', 'author__username'
+    )
+    serializer_class = RecentReviewSerializer
+
+
+class UserCommentsViewSet(UserHistoryViewSet):
+    """
+    Комментарии пользователя с отзывом и произведением.
+    """
+    queryset = Comment.objects.select_related(
+        'review__title', 'author'
+    ).filter(
+        review__title__deleted_at__isnull=True,
+        review__author__deleted_at__isnull=True
+    ).only(
+        'id', 'text', 'pub_date', 'review__title__name', 'author__username'
+    )
+    serializer_class = UserCommentSerializer
+
+
+class CommentViewSet(
+    IdempotentCreateMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = CommentSerializer
     permission_classes = (ReadOnlyPermission | CreateAndUpdatePermission,)
+    list_columns = rows.COMMENT_COLUMNS
+    list_rows = staticmethod(rows.comment_rows)
+    version_keys = ('usernames',)
+
+    def get_last_modified(self):
+        # Изменение комментария обновляет и дату отзыва (reviews.signals).
+        review_id = self.kwargs.get('review_id')
+        if self.action == 'list':
+            queryset = Review.objects.filter(pk=review_id)
+        else:
+            queryset = Comment.objects.filter(
+                review_id=review_id, pk=self.kwargs['pk']
+            )
+        return queryset.values_list('updated_at', flat=True).first()
 
     def get_queryset(self):
         review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        return review.comments.all()
+        review = get_object_or_404(
+            Review, id=review_id, author__deleted_at__isnull=True
+        )
+        return review.comments.filter(
+            author__deleted_at__isnull=True
+        ).select_related('author')
 
     def perform_create(self, serializer):
         review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
+        review = get_object_or_404(
+            Review, id=review_id, author__deleted_at__isnull=True
+        )
         serializer.save(author=self.request.user, review=review)
+
+
+class ProfileDownloadView(APIView):
+    """
+    Отдаёт сотрудникам сохранённый профиль запроса.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, profile_id):
+        path = settings.PROFILES_DIR / f'{profile_id}.json'
+        if not path.exists():
+            raise Http404
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=f'profile-{profile_id}.json'
+        )
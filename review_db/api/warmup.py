@@ -0,0 +1,165 @@
+import io
+import logging
+import threading
+from importlib import import_module
+from time import perf_counter
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import get_resolver
+
+from reviews.models import Comment, Title
+from . import autocomplete
+
+logger = logging.getLogger('api.warmup')
+
+HOT_MODULES = (
+    'api.views',
+    'api.serializers',
+    'api.rows',
+    'api.renderers',
+    'api.parsers',
+    'api.compression',
+    'djoser.views',
+    'rest_framework.authtoken.models',
+)
+
+# Ключ окружения WSGI, которым помечены запросы прогрева. Клиент не
+# может его передать: заголовки попадают в окружение с префиксом HTTP_.
+WARM_UP_KEY = 'api.warm_up'
+
+warmed_up = threading.Event()
+report = {}
+
+
+def is_warm_up(request):
+    """Запрос прогрева: метрики и инспекция SQL его не учитывают."""
+    return request.META.get(WARM_UP_KEY, False)
+
+
+def open_connections():
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def import_hot_modules():
+    for name in HOT_MODULES:
+        import_module(name)
+
+
+def compile_urls():
+    # Заполняет reverse_dict и компилирует регулярные выражения маршрутов.
+    get_resolver().reverse_dict
+
+
+def build_autocomplete():
+    return {'titles': len(autocomplete.build().keys)}
+
+
+def get(handler, host, path):
+    """
+    GET через промежуточные слои обработчика WSGI. Сигналы начала и
+    конца запроса не отправляются, поэтому соединения с базой остаются
+    открытыми.
+    """
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'HTTP_HOST': host,
+        'HTTP_ACCEPT_ENCODING': 'br, gzip',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        WARM_UP_KEY: True,
+    }
+    return handler.get_response(WSGIRequest(environ)).status_code
+
+
+def warm_routes():
+    """
+    Основные маршруты api/urls.py запросами внутри процесса: строит
+    сериализаторы, наполняет кеши категорий, жанров и произведений.
+    Ответы не важны, ошибки маршрутов не прерывают прогрев.
+    """
+    paths = [
+        '/api/v1/categories/', '/api/v1/genres/', '/api/v1/titles/',
+        '/api/v1/reviews/recent/',
+    ]
+    title_id = Title.objects.values_list('pk', flat=True).first()
+    if title_id is not None:
+        paths += [
+            f'/api/v1/titles/{title_id}/',
+            f'/api/v1/titles/{title_id}/reviews/',
+        ]
+    comment = Comment.objects.values_list(
+        'review__title_id', 'review_id'
+    ).first()
+    if comment is not None:
+        title_id, review_id = comment
+        paths.append(
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+        )
+    host = next(
+        (h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'),
+        'localhost'
+    )
+    handler = WSGIHandler()
+    return {path: get(handler, host, path) for path in paths}
+
+
+# Соединения открываются последними: к ним относятся и базы, которых
+# не касались запросы прогрева.
+STEPS = (
+    ('modules', import_hot_modules),
+    ('urls', compile_urls),
+    ('autocomplete', build_autocomplete),
+    ('routes', warm_routes),
+    ('connections', open_connections),
+)
+
+
+def warm_up():
+    """
+    Готовит процесс к обслуживанию запросов и отмечает его готовым.
+    Ошибка шага пишется в лог и в отчёт, остальные шаги выполняются.
+    """
+    started = perf_counter()
+    for name, step in STEPS:
+        step_started = perf_counter()
+        try:
+            result = step()
+        except Exception as error:
+            logger.exception('Шаг прогрева %s завершился ошибкой', name)
+            result = {'error': str(error)}
+        report[name] = {
+            'duration_ms': round((perf_counter() - step_started) * 1000, 3),
+            **({'result': result} if result is not None else {}),
+        }
+    report['total_ms'] = round((perf_counter() - started) * 1000, 3)
+    warmed_up.set()
+    logger.info('Прогрев завершён за %.1f мс', report['total_ms'])
+    return report
+
+
+def warm_up_in_background():
+    """
+    Прогрев в отдельном потоке для серверов без хука запуска воркера.
+    Соединения этого потока запросам не достаются и закрываются.
+    """
+    def run():
+        try:
+            warm_up()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name='warm-up', daemon=True).start()
+
+
+def readiness_view(request):
+    """Готовность процесса: 200 после прогрева, до него 503."""
+    if not warmed_up.is_set():
+        return JsonResponse({'ready': False}, status=503)
+    return JsonResponse({'ready': True, 'warm_up': report})
@@ -0,0 +1,9 @@
+def post_worker_init(worker):
+    """
+    Прогревает воркер до того, как он начнёт принимать запросы:
+    первые запросы после деплоя и перезапуска воркера не платят
+    за пустые кеши, сборку маршрутов и соединение с базой.
+    """
+    from api.warmup import warm_up
+
+    warm_up()
@@ -26,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -36,10 +37,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.RequestTimingMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.QueryInspectionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,13 +79,75 @@ DATABASES = {
         'USER': os.getenv('PG_USER', default='postgres'),
         'PASSWORD': os.getenv('PG_PASSWORD', default='postgres'),
         'HOST': 'reviewdb-pg-db',
-        'PORT': 5432
+        'PORT': 5432,
+        'CONN_MAX_AGE': int(os.getenv('PG_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
 
+# Cache
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# Кеш nginx для анонимных чтений: время жизни ответа и адрес nginx,
+# через который сбрасываются устаревшие ответы (пустой - не сбрасывать).
+PROXY_CACHE_SECONDS = int(os.getenv('PROXY_CACHE_SECONDS', default=10))
+PROXY_CACHE_PURGE_URL = os.getenv('PROXY_CACHE_PURGE_URL', default='')
+
+# Кеш ответов в приложении: сколько ответ считается свежим и сколько
+# ещё может отдаваться устаревшим, пока один воркер его обновляет.
+# Без Redis версии ключей живут в памяти процесса и сброс в одном
+# воркере не виден остальным, поэтому по умолчанию кеш выключен.
+RESPONSE_CACHE_SECONDS = int(os.getenv(
+    'RESPONSE_CACHE_SECONDS', default=30 if os.getenv('REDIS_URL') else 0
+))
+RESPONSE_CACHE_STALE_SECONDS = int(
+    os.getenv('RESPONSE_CACHE_STALE_SECONDS', default=300)
+)
+
+# Кеш профиля /users/me/, сбрасывается при сохранении пользователя.
+PROFILE_CACHE_SECONDS = int(os.getenv(
+    'PROFILE_CACHE_SECONDS', default=600 if os.getenv('REDIS_URL') else 0
+))
+
+# Сколько хранится ответ на создание отзыва или комментария с заголовком
+# Idempotency-Key для повторов клиента.
+IDEMPOTENCY_KEY_SECONDS = int(
+    os.getenv('IDEMPOTENCY_KEY_SECONDS', default=24 * 60 * 60)
+)
+# Сколько держится блокировка выполняемого запроса с Idempotency-Key:
+# с запасом больше таймаута воркера, чтобы не истечь посреди запроса.
+IDEMPOTENCY_LOCK_SECONDS = int(
+    os.getenv('IDEMPOTENCY_LOCK_SECONDS', default=120)
+)
+
+# Удаление произведений и пользователей (api/deletion.py): размер части
+# и дочистка в фоновом потоке сразу после скрытия.
+DELETION_BATCH_SIZE = int(os.getenv('DELETION_BATCH_SIZE', default=1000))
+DELETION_IN_BACKGROUND = (
+    os.getenv('DELETION_IN_BACKGROUND', default='1') == '1'
+)
+
+# На сколько месяцев вперёд partition_tables заводит секции отзывов и
+# комментариев.
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', default=3))
+
+# До скольких строк списки админки считаются точным COUNT(*), больше -
+# по оценке из статистики PostgreSQL.
+ADMIN_EXACT_COUNT_LIMIT = int(
+    os.getenv('ADMIN_EXACT_COUNT_LIMIT', default=10_000)
+)
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -120,6 +187,72 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# SQL inspection
+
+SQL_INSPECTION_SAMPLE_RATE = float(
+    os.getenv('SQL_INSPECTION_SAMPLE_RATE', default=1.0 if DEBUG else 0.01)
+)
+SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', default=200))
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', default=5))
+SQL_N_PLUS_ONE_RAISE = False
+
+# Response compression
+
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', default=1024))
+COMPRESSION_CONTENT_TYPES = ('application/json', 'application/msgpack')
+
+# Warm-up
+
+# Прогрев при старте в фоновом потоке для серверов без хука
+# post_worker_init (gunicorn прогревает воркеры сам, см. gunicorn.conf.py).
+WARMUP_IN_BACKGROUND = os.getenv('WARMUP_IN_BACKGROUND', default='') == '1'
+
+# Request profiling
+
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', default=1))
+PROFILES_DIR = BASE_DIR / 'profiles'
+
+# Модель рекомендаций (команда train_recommendations).
+RECOMMENDATIONS_DIR = Path(
+    os.getenv('RECOMMENDATIONS_DIR', default=BASE_DIR / 'recommendations')
+)
+
+# Индекс подсказок по названиям (api/autocomplete.py): как часто
+# сверять версию с общим кешем и перестраивать ради популярности.
+AUTOCOMPLETE_CHECK_SECONDS = float(
+    os.getenv('AUTOCOMPLETE_CHECK_SECONDS', default=5)
+)
+AUTOCOMPLETE_REBUILD_SECONDS = float(
+    os.getenv('AUTOCOMPLETE_REBUILD_SECONDS', default=600)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.sql': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'api.cache': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'api.warmup': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -132,6 +265,17 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'api.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
@@ -2,13 +2,17 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from api.metrics import metrics_view
+from api.warmup import readiness_view
 from . import settings
 
 admin.site.site_header = 'Администрирование OpinioSync'
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include('api.urls'))
+    path('api/', include('api.urls')),
+    path('metrics/', metrics_view),
+    path('ready/', readiness_view),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,8 @@
 from django.contrib import admin
 
+from api.admin import HideOnDeleteAdmin, LargeTableAdmin
+from api.deletion import hide_title
+
 from .models import (
     Category,
     Genre,
@@ -10,6 +13,20 @@ from .models import (
 )
 
 
+class ScoreFilter(admin.SimpleListFilter):
+    """Оценки известны заранее: без SELECT DISTINCT по всем отзывам."""
+    title = 'оценка'
+    parameter_name = 'score'
+
+    def lookups(self, request, model_admin):
+        return [(score, score) for score in range(1, 11)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(score=self.value())
+        return queryset
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug',)
@@ -23,27 +40,33 @@ class GenreAdmin(admin.ModelAdmin):
 
 
 @admin.register(Title)
-class TitleAdmin(admin.ModelAdmin):
-    pass
+class TitleAdmin(HideOnDeleteAdmin, LargeTableAdmin):
     list_display = ('name', 'year', 'category')
-    search_fields = ('name', 'category__name', 'description')
+    list_select_related = ('category',)
+    search_fields = ('^name', '^category__name', '@description')
     list_filter = ('year', 'category')
+    hide = staticmethod(hide_title)
 
 
 @admin.register(GenreTitle)
-class GenreTitleAdmin(admin.ModelAdmin):
-    pass
+class GenreTitleAdmin(LargeTableAdmin):
+    list_select_related = ('genre', 'title')
+    autocomplete_fields = ('title',)
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     list_display = ('author', 'score', 'title')
-    search_fields = ('text', 'title__name')
-    list_filter = ('author', 'score', )
+    list_select_related = ('author', 'title')
+    search_fields = ('@text', '^title__name')
+    list_filter = (ScoreFilter,)
+    autocomplete_fields = ('author', 'title')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('author', 'review', )
-    list_filter = ('author', )
-    search_fields = ('review__text', 'text')
+    list_select_related = ('author', 'review')
+    search_fields = ('@text', '@review__text')
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('review',)
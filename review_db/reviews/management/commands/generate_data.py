@@ -0,0 +1,353 @@
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from reviews.models import (
+    Category,
+    Genre,
+    GenreTitle,
+    Title,
+    Review,
+    Comment
+)
+from users.models import CustomUser
+
+WORDS = (
+    'тень ветер море город дорога звезда песня огонь сердце время '
+    'ночь лес река зима память голос мечта свет небо путь история '
+    'тайна остров война мир дом сад берег камень волна буря'
+).split()
+ADJECTIVES = (
+    'тёмный последний тихий белый долгий забытый северный красный '
+    'старый новый дальний золотой холодный вечный одинокий'
+).split()
+CATEGORY_NAMES = ('Фильмы', 'Книги', 'Музыка', 'Сериалы', 'Игры',
+                  'Комиксы', 'Спектакли', 'Подкасты')
+GENRE_NAMES = ('Драма', 'Комедия', 'Фантастика', 'Детектив', 'Ужасы',
+               'Триллер', 'Мелодрама', 'Фэнтези', 'Приключения',
+               'Документальный', 'Исторический', 'Вестерн', 'Мюзикл',
+               'Рок', 'Джаз', 'Классика', 'Поп', 'Аниме')
+SENTENCES = (
+    'Сильная работа, которую стоит пересмотреть.',
+    'Ожидал большего, но финал удивил.',
+    'Атмосфера передана очень точно.',
+    'Местами затянуто, зато персонажи живые.',
+    'Одно из лучших произведений в своём жанре.',
+    'Сюжет предсказуем, но смотрится легко.',
+    'Рекомендую всем, кто любит неспешные истории.',
+    'Не понравилось, слишком много клише.',
+)
+GOLDEN = (math.sqrt(5) - 1) / 2
+START_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+SPAN_SECONDS = 8 * 365 * 24 * 3600
+TEXT_POOL = 4096
+# Оценки смещены к высоким, как в реальных каталогах.
+SCORES = (1, 2, 3, 4, 4, 5, 5, 5, 6, 6, 6, 6, 7, 7, 7, 7, 7,
+          8, 8, 8, 8, 8, 9, 9, 9, 10, 10)
+
+
+class Zipf:
+    """
+    Генератор рангов с распределением Ципфа на 0..n-1.
+    Обратная функция распределения считается аналитически, поэтому
+    генератору не нужны таблицы весов размером n.
+    """
+
+    def __init__(self, rnd, n, s):
+        self.rnd = rnd
+        self.n = n
+        self.s = s if s != 1 else 1.0001
+        self.top = n ** (1 - self.s) - 1
+
+    def __call__(self):
+        u = self.rnd.random()
+        rank = (self.top * u + 1) ** (1 / (1 - self.s))
+        return min(int(rank) - 1, self.n - 1)
+
+
+class Scramble:
+    """
+    Детерминированная перестановка 0..n-1, чтобы популярные строки
+    не совпадали с первыми id.
+    """
+
+    def __init__(self, rnd, n):
+        self.n = n
+        step = rnd.randrange(n // 2 + 1, n) if n > 2 else 1
+        while math.gcd(step, n) != 1:
+            step += 1
+        self.step = step
+        self.offset = rnd.randrange(n) if n else 0
+
+    def __call__(self, index):
+        return (index * self.step + self.offset) % self.n
+
+
+def spread_date(index, salt=0.0):
+    """Дата публикации из последовательности с низким расхождением."""
+    fraction = (index * GOLDEN + salt) % 1
+    return START_DATE + timedelta(seconds=int(fraction * SPAN_SECONDS))
+
+
+def numbered(names, index):
+    """Название из списка; при повторном проходе добавляется номер."""
+    name = names[index % len(names)]
+    lap = index // len(names)
+    return f'{name} {lap}' if lap else name
+
+
+def texts(rnd, max_sentences):
+    """Пул текстов: выбор готовой строки дешевле сборки на каждую строку."""
+    return [
+        ' '.join(
+            rnd.choice(SENTENCES) for _ in range(rnd.randint(1, max_sentences))
+        )
+        for _ in range(TEXT_POOL)
+    ]
+
+
+def next_id(model):
+    last = model.objects.order_by('-id').values_list('id', flat=True).first()
+    return (last or 0) + 1
+
+
+def reset_sequence(cursor, model):
+    table = model._meta.db_table
+    cursor.execute(
+        f'SELECT setval(pg_get_serial_sequence(%s, %s), '
+        f'(SELECT COALESCE(MAX(id), 1) FROM {table}))',
+        [table, 'id']
+    )
+
+
+def copy_rows(model, columns, rows, stdout):
+    """Записывает строки через COPY FROM STDIN и сообщает скорость."""
+    table = model._meta.db_table
+    started = time.perf_counter()
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        with cursor.copy(
+            f'COPY {table} ({", ".join(columns)}) FROM STDIN'
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+        reset_sequence(cursor, model)
+    elapsed = time.perf_counter() - started
+    stdout.write(
+        f'{table}: {count} строк за {elapsed:.1f} с '
+        f'({count / elapsed * 60 / 1e6 if elapsed else 0:.2f} млн строк/мин)'
+    )
+    return count
+
+
+def review_counts(rnd, users, reviews, titles, s):
+    """
+    Распределяет отзывы по пользователям по закону Ципфа.
+    Один пользователь не может оценить больше половины произведений,
+    излишек уходит наименее активным.
+    """
+    weights = [1 / (rank + 1) ** s for rank in range(users)]
+    total = sum(weights)
+    cap = max(titles // 2, 1)
+    counts = [min(int(reviews * w / total), cap) for w in weights]
+    deficit = reviews - sum(counts)
+    index = users - 1
+    while deficit > 0:
+        if counts[index] < cap:
+            counts[index] += 1
+            deficit -= 1
+        index = index - 1 if index else users - 1
+    order = list(range(users))
+    rnd.shuffle(order)
+    return [counts[rank] for rank in order]
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетические категории, жанры, произведения, '
+        'пользователей, отзывы и комментарии с популярностью по закону '
+        'Ципфа и записывает их через COPY. Результат детерминирован '
+        'для одного и того же --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=8)
+        parser.add_argument('--genres', type=int, default=18)
+        parser.add_argument('--titles', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--reviews', type=int, default=10_000_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--max-genres', type=int, default=3,
+                            help='Наибольшее число жанров произведения.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения популярности.')
+        parser.add_argument(
+            '--skip-fk-checks', action='store_true',
+            help='Не проверять внешние ключи при загрузке (нужны права '
+                 'суперпользователя PostgreSQL). Ссылки корректны '
+                 'по построению, а проверка замедляет COPY в разы.'
+        )
+
+    def handle(self, *args, **options):
+        for name in ('categories', 'genres', 'titles', 'users',
+                     'max_genres'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} должно быть больше 0'
+                )
+        max_reviews = options['users'] * max(options['titles'] // 2, 1)
+        if options['reviews'] > max_reviews:
+            raise CommandError('Отзывов больше, чем допустимых пар '
+                               'автор-произведение')
+        if options['comments'] and not options['reviews']:
+            raise CommandError('Для комментариев нужны отзывы')
+        rnd = random.Random(options['seed'])
+        s = options['zipf']
+        out = self.stdout
+        if options['skip_fk_checks']:
+            with connection.cursor() as cursor:
+                cursor.execute('SET session_replication_role = replica')
+
+        category_start = next_id(Category)
+        copy_rows(Category, ('id', 'name', 'slug'), (
+            (category_start + i, numbered(CATEGORY_NAMES, i),
+             f'category-{category_start + i}')
+            for i in range(options['categories'])
+        ), out)
+
+        genre_start = next_id(Genre)
+        copy_rows(Genre, ('id', 'name', 'slug'), (
+            (genre_start + i, numbered(GENRE_NAMES, i),
+             f'genre-{genre_start + i}')
+            for i in range(options['genres'])
+        ), out)
+
+        title_start = next_id(Title)
+        category_rank = Zipf(rnd, options['categories'], s)
+        this_year = datetime.now().year
+        loaded_at = datetime.now(timezone.utc)
+
+        descriptions = texts(rnd, 4)
+
+        def titles():
+            for i in range(options['titles']):
+                name = (f'{rnd.choice(ADJECTIVES).capitalize()} '
+                        f'{rnd.choice(WORDS)} {rnd.choice(WORDS)}')
+                yield (
+                    title_start + i,
+                    name,
+                    this_year - min(int(rnd.expovariate(1 / 15)), 120),
+                    rnd.choice(descriptions),
+                    None,
+                    category_start + category_rank(),
+                    loaded_at,
+                )
+        copy_rows(Title, ('id', 'name', 'year', 'description', 'photo',
+                          'category_id', 'updated_at'), titles(), out)
+
+        genre_rank = Zipf(rnd, options['genres'], s)
+
+        link_start = next_id(GenreTitle)
+
+        def genre_titles():
+            link_id = link_start
+            for i in range(options['titles']):
+                genres = {
+                    genre_rank()
+                    for _ in range(rnd.randint(1, options['max_genres']))
+                }
+                for genre in sorted(genres):
+                    yield link_id, genre_start + genre, title_start + i
+                    link_id += 1
+        copy_rows(GenreTitle, ('id', 'genre_id', 'title_id'),
+                  genre_titles(), out)
+
+        user_start = next_id(CustomUser)
+        password = make_password(None)
+
+        def users():
+            for i in range(options['users']):
+                username = f'{rnd.choice(WORDS)}_{user_start + i}'
+                yield (
+                    user_start + i, password, None, False, username, '', '',
+                    f'{username}@example.com', False, True,
+                    spread_date(i, 0.5), None,
+                )
+        copy_rows(CustomUser, (
+            'id', 'password', 'last_login', 'is_superuser', 'username',
+            'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+            'date_joined', 'photo'
+        ), users(), out)
+
+        review_start = next_id(Review)
+        title_rank = Zipf(rnd, options['titles'], s)
+        title_order = Scramble(rnd, options['titles'])
+        counts = review_counts(
+            rnd, options['users'], options['reviews'], options['titles'], s
+        )
+
+        review_texts = texts(rnd, 6)
+
+        def reviews():
+            index = 0
+            for user, count in enumerate(counts):
+                seen = set()
+                attempts = count * 4
+                while len(seen) < count and attempts:
+                    seen.add(title_order(title_rank()))
+                    attempts -= 1
+                # Хвост распределения Ципфа почти не выпадает, поэтому
+                # самым активным авторам добираем произведения равномерно.
+                while len(seen) < count:
+                    seen.add(rnd.randrange(options['titles']))
+                for title in seen:
+                    pub_date = spread_date(index)
+                    yield (
+                        review_start + index,
+                        title_start + title,
+                        rnd.choice(review_texts),
+                        user_start + user,
+                        rnd.choice(SCORES),
+                        pub_date,
+                        pub_date,
+                    )
+                    index += 1
+        copy_rows(Review, ('id', 'title_id', 'text', 'author_id', 'score',
+                           'pub_date', 'updated_at'), reviews(), out)
+
+        if options['comments']:
+            comment_start = next_id(Comment)
+            review_rank = Zipf(rnd, options['reviews'], s)
+            review_order = Scramble(rnd, options['reviews'])
+            user_rank = Zipf(rnd, options['users'], s)
+
+            comment_texts = texts(rnd, 3)
+
+            def comments():
+                for i in range(options['comments']):
+                    review = review_order(review_rank())
+                    delay = timedelta(minutes=int(rnd.expovariate(1 / 600)))
+                    pub_date = spread_date(review) + delay
+                    yield (
+                        comment_start + i,
+                        review_start + review,
+                        rnd.choice(comment_texts),
+                        user_start + user_rank(),
+                        pub_date,
+                        pub_date,
+                    )
+            copy_rows(Comment, ('id', 'review_id', 'text', 'author_id',
+                                'pub_date', 'updated_at'), comments(), out)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET session_replication_role = DEFAULT')
+            for model in (Category, Genre, Title, GenreTitle, CustomUser,
+                          Review, Comment):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
@@ -0,0 +1,110 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+FILL_REVIEW_PUB_DATE = '''
+UPDATE reviews_comment c SET review_pub_date = r.pub_date
+FROM reviews_review r WHERE r.id = c.review_id;
+
+CREATE FUNCTION reviews_comment_review_pub_date() RETURNS trigger AS $$
+BEGIN
+    IF NEW.review_pub_date IS NULL
+            OR (TG_OP = 'UPDATE' AND NEW.review_id <> OLD.review_id) THEN
+        NEW.review_pub_date := (
+            SELECT pub_date FROM reviews_review WHERE id = NEW.review_id
+        );
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_comment_review_pub_date
+BEFORE INSERT OR UPDATE OF review_id, review_pub_date ON reviews_comment
+FOR EACH ROW EXECUTE FUNCTION reviews_comment_review_pub_date();
+'''
+
+DROP_FILL_REVIEW_PUB_DATE = '''
+DROP TRIGGER reviews_comment_review_pub_date ON reviews_comment;
+DROP FUNCTION reviews_comment_review_pub_date();
+'''
+
+COMMENT_REVIEW_FK = '''
+ALTER TABLE reviews_comment ADD CONSTRAINT reviews_comment_review_fk
+FOREIGN KEY (review_id, review_pub_date)
+REFERENCES reviews_review (id, pub_date)
+ON UPDATE CASCADE DEFERRABLE INITIALLY DEFERRED;
+'''
+
+DROP_COMMENT_REVIEW_FK = '''
+ALTER TABLE reviews_comment DROP CONSTRAINT reviews_comment_review_fk;
+'''
+
+# Один отзыв пользователя на произведение во всех секциях: вставка и
+# смена пары ждут advisory-замок на неё и проверяют наличие строки.
+# Триггер срабатывает и при COPY.
+UNIQUE_REVIEW = '''
+CREATE FUNCTION reviews_review_unique_review() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(
+        hashtext('reviews_review'),
+        hashtext(concat_ws(':', NEW.author_id, NEW.title_id))
+    );
+    IF EXISTS (
+        SELECT 1 FROM reviews_review WHERE author_id = NEW.author_id
+        AND title_id = NEW.title_id AND id <> NEW.id
+    ) THEN
+        RAISE unique_violation USING
+            CONSTRAINT = 'unique review',
+            MESSAGE = 'duplicate key value violates unique '
+                      'constraint "unique review"';
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_review_unique_review
+BEFORE INSERT OR UPDATE OF author_id, title_id ON reviews_review
+FOR EACH ROW EXECUTE FUNCTION reviews_review_unique_review();
+'''
+
+DROP_UNIQUE_REVIEW = '''
+DROP TRIGGER reviews_review_unique_review ON reviews_review;
+DROP FUNCTION reviews_review_unique_review();
+'''
+
+
+class Migration(migrations.Migration):
+    """
+    Ключи, которые переживают перевод отзывов и комментариев в
+    секционированные таблицы (api.partitions): комментарий ссылается на
+    отзыв составным ключом (id, pub_date), а правило «один отзыв на
+    произведение» проверяет и триггер.
+    """
+
+    dependencies = [
+        ('reviews', '0014_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='review_pub_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата публикации отзыва'),
+        ),
+        migrations.RunSQL(FILL_REVIEW_PUB_DATE, DROP_FILL_REVIEW_PUB_DATE),
+        migrations.AlterField(
+            model_name='comment',
+            name='review_pub_date',
+            field=models.DateTimeField(blank=True, editable=False, verbose_name='Дата публикации отзыва'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('id', 'pub_date'), name='review_id_pub_date_key'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='review',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='reviews.review', verbose_name='Отзыв'),
+        ),
+        migrations.RunSQL(COMMENT_REVIEW_FK, DROP_COMMENT_REVIEW_FK),
+        migrations.RunSQL(UNIQUE_REVIEW, DROP_UNIQUE_REVIEW),
+    ]
@@ -1,6 +1,9 @@
 import datetime as dt
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
 from django.db import models
+from django.db.models.functions import Upper
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 
@@ -51,6 +54,13 @@ class Genre(models.Model):
         return self.slug
 
 
+class VisibleManager(models.Manager):
+    """Менеджер по умолчанию: без объектов, ожидающих удаления."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Title(models.Model):
     """Модель произведений."""
     name = models.TextField(verbose_name='Название')
@@ -82,9 +92,39 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Категория'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    # Скрытое произведение ждёт удаления отзывов частями (api.deletion).
+    deleted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Удалено'
+    )
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ('name',)
+        indexes = [
+            models.Index(
+                fields=['deleted_at'], name='title_deleted_at_idx',
+                condition=models.Q(deleted_at__isnull=False)
+            ),
+            # Поиск в админке (api.admin.LargeTableAdmin): по началу
+            # названия и полнотекстовый по описанию.
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='title_name_prefix_idx'
+            ),
+            GinIndex(
+                SearchVector('description', config='russian'),
+                name='title_description_search_idx'
+            ),
+        ]
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
@@ -101,9 +141,25 @@ class GenreTitle(models.Model):
         Genre,
         on_delete=models.SET_NULL,
         blank=True,
-        null=True
+        null=True,
+        db_index=False
+    )
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, db_index=False
     )
-    title = models.ForeignKey(Title, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Составные индексы заменяют одиночные индексы внешних ключей:
+            # проверка жанров произведения (EXISTS в фильтре) и
+            # произведения жанра читаются только из индекса.
+            models.Index(
+                fields=['title', 'genre'], name='genretitle_title_genre_idx'
+            ),
+            models.Index(
+                fields=['genre', 'title'], name='genretitle_genre_title_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.genre}  ---  {self.title}'
@@ -134,14 +190,45 @@ class Review(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         constraints = [
+            # Индекс проверяет правило только в обычной таблице; в
+            # секционированной (api.partitions) его проверяет триггер
+            # reviews_review_unique_review из миграции 0015, который
+            # стоит на таблице в обоих видах.
             models.UniqueConstraint(
                 fields=['author', 'title'],
                 name='unique review'
-            )
+            ),
+            # Ключ, на который ссылаются комментарии. После перевода в
+            # секционированную таблицу это её первичный ключ: одного id
+            # для него PostgreSQL не позволяет.
+            models.UniqueConstraint(
+                fields=['id', 'pub_date'],
+                name='review_id_pub_date_key'
+            ),
+        ]
+        indexes = [
+            # Лента последних отзывов (/reviews/recent/).
+            models.Index(
+                fields=['-pub_date', '-id'], name='review_pub_date_idx'
+            ),
+            # Отзывы пользователя (/users/{id}/reviews/).
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='review_author_pub_date_idx'
+            ),
+            # Поиск в админке.
+            GinIndex(
+                SearchVector('text', config='russian'),
+                name='review_text_search_idx'
+            ),
         ]
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
@@ -152,11 +239,21 @@ class Review(models.Model):
 
 
 class Comment(models.Model):
+    # Внешний ключ в базе - составной (review_id, review_pub_date) на
+    # ключ отзыва (id, pub_date), см. миграцию 0015: на секционированную
+    # таблицу отзывов иначе не сослаться.
     review = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
         related_name='comments',
         verbose_name='Отзыв',
+        db_constraint=False,
+    )
+    # Заполняет триггер по review_id, меняет каскад внешнего ключа.
+    review_pub_date = models.DateTimeField(
+        blank=True,
+        editable=False,
+        verbose_name='Дата публикации отзыва'
     )
     text = models.TextField(verbose_name='Текст')
     author = models.ForeignKey(
@@ -169,10 +266,73 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            # Комментарии пользователя (/users/{id}/comments/).
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='comment_author_pub_date_idx'
+            ),
+            # Поиск в админке.
+            GinIndex(
+                SearchVector('text', config='russian'),
+                name='comment_text_search_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.id} --- {self.review}'
+
+
+class SimilarTitle(models.Model):
+    """
+    Похожее произведение: заполняется командой compute_similar_titles.
+    """
+    REVIEWS = 'reviews'
+    GENRES = 'genres'
+    SOURCES = (
+        (REVIEWS, 'Совместные оценки'),
+        (GENRES, 'Общие жанры'),
+    )
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Произведение'
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожее произведение'
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name='Место')
+    score = models.FloatField(verbose_name='Сходство')
+    source = models.CharField(
+        max_length=16,
+        choices=SOURCES,
+        verbose_name='Источник'
+    )
+
+    class Meta:
+        ordering = ('title', 'rank')
+        constraints = [
+            # Индекс ответа /titles/{id}/similar/.
+            models.UniqueConstraint(
+                fields=['title', 'rank'],
+                name='unique similar rank'
+            )
+        ]
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+
+    def __str__(self):
+        return f'{self.title_id}  ---  {self.similar_id}'
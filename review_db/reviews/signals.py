@@ -0,0 +1,55 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Category, Comment, Genre, GenreTitle, Review, Title
+
+
+def touch_titles(**lookups):
+    Title.objects.filter(**lookups).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """Отзывы меняют рейтинг и список отзывов произведения."""
+    touch_titles(pk=instance.title_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    Review.objects.filter(pk=instance.review_id).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def genre_link_changed(sender, instance, **kwargs):
+    touch_titles(pk=instance.title_id)
+
+
+@receiver(post_save, sender=Category)
+def category_changed(sender, instance, created, **kwargs):
+    if not created:
+        touch_titles(category=instance)
+
+
+@receiver(post_save, sender=Genre)
+def genre_changed(sender, instance, created, **kwargs):
+    if not created:
+        touch_titles(genre=instance)
+
+
+# Удаление категории или жанра обнуляет ссылки на них обновлением без
+# сигналов, поэтому произведения отмечаются изменёнными до удаления.
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    touch_titles(category=instance)
+
+
+@receiver(pre_delete, sender=Genre)
+def genre_deleted(sender, instance, **kwargs):
+    touch_titles(genre=instance)
+
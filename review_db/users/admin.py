@@ -1,10 +1,16 @@
 from django.contrib import admin
 
+from api.admin import HideOnDeleteAdmin, LargeTableAdmin
+from api.deletion import hide_user
 from .models import CustomUser
 
 
 @admin.register(CustomUser)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(HideOnDeleteAdmin, LargeTableAdmin):
     list_display = ('username', 'email')
-    search_fields = ('username', 'email')
+    search_fields = ('^username', '^email')
     list_filter = ('is_superuser',)
+    hide = staticmethod(hide_user)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(deleted_at__isnull=True)
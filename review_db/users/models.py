@@ -1,5 +1,7 @@
-from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import OpClass
+from django.db import models
+from django.db.models.functions import Upper
 
 
 class CustomUser(AbstractUser):
@@ -15,6 +17,29 @@ class CustomUser(AbstractUser):
         upload_to='users/images/',
         verbose_name='Фото'
     )
+    # Скрытый пользователь ждёт удаления отзывов частями (api.deletion).
+    deleted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Удалён'
+    )
 
     class Meta(AbstractUser.Meta):
         ordering = ('username',)
+        indexes = [
+            models.Index(
+                fields=['deleted_at'], name='user_deleted_at_idx',
+                condition=models.Q(deleted_at__isnull=False)
+            ),
+            # Поиск по началу имени и почты в админке и подсказках
+            # автора в формах отзывов.
+            models.Index(
+                OpClass(Upper('username'), name='text_pattern_ops'),
+                name='user_username_prefix_idx'
+            ),
+            models.Index(
+                OpClass(Upper('email'), name='text_pattern_ops'),
+                name='user_email_prefix_idx'
+            ),
+        ]